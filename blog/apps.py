@@ -5,3 +5,8 @@ from django.apps import AppConfig
 class BlogConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'blog'
+
+    def ready(self):
+        from . import signals  # noqa: F401 注册信号处理
+        from .static_templates import warm_up
+        warm_up()
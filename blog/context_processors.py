@@ -1,4 +1,6 @@
 from datetime import datetime
+from django.utils.functional import SimpleLazyObject
+from .sidebar import get_sidebar_data
 
 
 def static_template_context(request):
@@ -11,4 +13,17 @@ def static_template_context(request):
         'site_name': '我的博客',
         'current_year': year_str1,
         'STATIC_URL': '/static/',  # 确保静态模板中能正确引用静态文件
-    }
\ No newline at end of file
+    }
+
+
+def sidebar_context(request):
+    """
+    侧边栏的分类、标签与热门文章（base.html 的右侧栏使用）
+    数据来自缓存，且只有模板实际用到时才读取
+    """
+    data = SimpleLazyObject(get_sidebar_data)
+    return {
+        'categories': SimpleLazyObject(lambda: data['categories']),
+        'tags': SimpleLazyObject(lambda: data['tags']),
+        'popular_posts': SimpleLazyObject(lambda: data['popular_posts']),
+    }
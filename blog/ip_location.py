@@ -0,0 +1,215 @@
+"""
+IP 归属地表
+离线把客户端 IP 解析为城市，天气按城市而不是按 IP 查询与缓存（见 blog/weather.py 的 client_location）。
+表是按起始地址排序、互不重叠的 IPv4 区间，查询时直接在缓冲区上二分：
+- 二进制文件（build_ip_table 命令生成）以 mmap 只读映射，多个进程共享同一份页缓存，加载不解析文件
+- CSV 文件（每行 起始IP,结束IP,城市，IP 可写成点分或整数）加载时解析并在内存中打包成同样的格式
+
+二进制格式（大端）：头部 魔数(8) 区间数(uint32) 城市数(uint32)；
+之后是区间记录 起始(uint32) 结束(uint32) 城市序号(uint16)；最后是以换行分隔的 UTF-8 城市名
+"""
+
+import csv
+import ipaddress
+import logging
+import mmap
+import os
+import struct
+import threading
+from bisect import bisect_right
+from pathlib import Path
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONFIG = {
+    'PATH': '',  # 表文件路径（相对路径相对于 BASE_DIR），为空时不解析，天气沿用按 IP 查询
+}
+
+MAGIC = b'IPCITY1\n'
+_HEADER = struct.Struct('>8sII')  # 魔数、区间数、城市数
+_RECORD = struct.Struct('>IIH')   # 起始、结束、城市序号
+MAX_CITIES = 0xFFFF + 1
+
+
+def get_config():
+    config = dict(DEFAULT_CONFIG)
+    config.update(getattr(settings, 'IP_LOCATION', {}))
+    return config
+
+
+def table_path():
+    path = get_config()['PATH']
+    return Path(settings.BASE_DIR) / path if path else None
+
+
+def ip_to_int(ip):
+    """IPv4 地址（含 IPv4 映射的 IPv6 地址）转为整数，其他地址或非法输入返回 None"""
+    try:
+        address = ipaddress.ip_address(str(ip).strip())
+    except ValueError:
+        return None
+    if address.version == 6:
+        address = address.ipv4_mapped
+        if address is None:
+            return None
+    return int(address)
+
+
+def _parse_address(value):
+    value = value.strip()
+    if value.isdigit():
+        number = int(value)
+        if number > 0xFFFFFFFF:
+            raise ValueError(f'地址超出 IPv4 范围: {value}')
+        return number
+    return int(ipaddress.IPv4Address(value))
+
+
+def parse_csv(path):
+    """读取 CSV，返回 [(起始, 结束, 城市)]；首行无法解析时视为表头，空行与 # 开头的行忽略"""
+    rows = []
+    with open(path, encoding='utf-8', newline='') as f:
+        for line_no, record in enumerate(csv.reader(f), 1):
+            if not record or not record[0].strip() or record[0].lstrip().startswith('#'):
+                continue
+            try:
+                if len(record) < 3:
+                    raise ValueError('应为 起始IP,结束IP,城市 三列')
+                start, end = _parse_address(record[0]), _parse_address(record[1])
+            except ValueError as e:
+                if line_no == 1:
+                    continue
+                raise ValueError(f'{path} 第 {line_no} 行: {e}')
+            city = record[2].strip()
+            if city:
+                rows.append((start, end, city))
+    return rows
+
+
+def pack(rows):
+    """把 [(起始, 结束, 城市)] 排序并打包成二进制表；区间重叠或城市过多时抛出 ValueError"""
+    rows = sorted(rows)
+    cities = {}
+    records = []
+    previous_end = -1
+    for start, end, city in rows:
+        if start > end:
+            raise ValueError(f'区间起始大于结束: {start}-{end}')
+        if start <= previous_end:
+            raise ValueError(f'区间重叠: {start}-{end}')
+        previous_end = end
+        index = cities.setdefault(city, len(cities))
+        if index >= MAX_CITIES:
+            raise ValueError(f'城市数超过 {MAX_CITIES}')
+        records.append(_RECORD.pack(start, end, index))
+    names = '\n'.join(cities).encode('utf-8')
+    return _HEADER.pack(MAGIC, len(records), len(cities)) + b''.join(records) + names
+
+
+def write(rows, path):
+    """打包并写入二进制表（先写临时文件再替换，正在映射旧文件的进程不受影响）"""
+    data = pack(rows)
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    return _HEADER.unpack_from(data)[1:]
+
+
+class _Starts:
+    """区间起始地址的只读序列视图，bisect 直接在缓冲区上二分，不把整列读入内存"""
+
+    def __init__(self, buffer, count):
+        self._buffer = buffer
+        self._count = count
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        return _RECORD.unpack_from(self._buffer, _HEADER.size + index * _RECORD.size)[0]
+
+
+class IPRangeTable:
+    """基于二进制表缓冲区（bytes 或 mmap）的只读查询，线程安全"""
+
+    def __init__(self, buffer):
+        if len(buffer) < _HEADER.size:
+            raise ValueError('IP 归属地表文件不完整')
+        magic, count, city_count = _HEADER.unpack_from(buffer)
+        if magic != MAGIC:
+            raise ValueError('不是 IP 归属地表文件')
+        names_offset = _HEADER.size + count * _RECORD.size
+        if len(buffer) < names_offset:
+            raise ValueError('IP 归属地表文件不完整')
+        names = bytes(buffer[names_offset:]).decode('utf-8')
+        self.cities = names.split('\n') if city_count else []
+        if len(self.cities) != city_count:
+            raise ValueError('IP 归属地表的城市数与头部不一致')
+        self._buffer = buffer
+        self._starts = _Starts(buffer, count)
+
+    def __len__(self):
+        return len(self._starts)
+
+    def lookup(self, ip):
+        """返回 IP 所在区间的城市，不在任何区间内或无法解析时返回 None"""
+        value = ip_to_int(ip)
+        if value is None:
+            return None
+        index = bisect_right(self._starts, value) - 1
+        if index < 0:
+            return None
+        _, end, city = _RECORD.unpack_from(self._buffer, _HEADER.size + index * _RECORD.size)
+        return self.cities[city] if value <= end else None
+
+
+def load(path):
+    """加载表文件：二进制文件以 mmap 映射，否则按 CSV 解析"""
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) == MAGIC:
+            return IPRangeTable(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+    return IPRangeTable(pack(parse_csv(path)))
+
+
+_table = None
+_loaded = False
+_lock = threading.Lock()
+
+
+def enabled():
+    return table_path() is not None
+
+
+def get_table():
+    """惰性加载配置的表，未配置或加载失败时返回 None（失败只记录一次日志）"""
+    global _table, _loaded
+    if not _loaded:
+        with _lock:
+            if not _loaded:
+                path = table_path()
+                if path is not None:
+                    try:
+                        _table = load(path)
+                        logger.info(f"已加载 IP 归属地表 {path}：{len(_table)} 个区间，{len(_table.cities)} 个城市")
+                    except (OSError, ValueError) as e:
+                        logger.error(f"加载 IP 归属地表 {path} 失败: {e}")
+                _loaded = True
+    return _table
+
+
+def reload():
+    """表文件更新后重新加载（旧映射在不再被引用后释放）"""
+    global _table, _loaded
+    with _lock:
+        _table = None
+        _loaded = False
+    return get_table()
+
+
+def lookup_city(ip):
+    """IP 对应的城市，查不到时返回 None"""
+    table = get_table()
+    return table.lookup(ip) if table is not None else None
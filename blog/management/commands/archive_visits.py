@@ -0,0 +1,28 @@
+# blog/management/commands/archive_visits.py
+from django.core.management.base import BaseCommand
+from blog.rollups import run_rollup
+from blog.visit_archive import archive_visits, archive_dir, get_retention_config
+
+
+class Command(BaseCommand):
+    help = '把超过保留期的访问记录按月归档为 gzip 压缩的 NDJSON 文件并从数据库删除'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None,
+                            help='保留最近多少天的记录，默认使用 VISIT_RETENTION["DAYS"]')
+        parser.add_argument('--chunk-size', type=int, default=5000, help='每批归档条数，默认5000')
+        parser.add_argument('--dry-run', action='store_true', help='只统计待归档条数，不写文件不删除')
+
+    def handle(self, *args, **options):
+        days = options['days'] if options['days'] is not None else get_retention_config()['DAYS']
+
+        if options['dry_run']:
+            # 试运行不汇总也不写文件，统计的条数已包含正式运行时先汇总的记录
+            count = archive_visits(days=days, dry_run=True)
+            self.stdout.write(f'{days} 天前待归档记录: {count} 条')
+            return
+
+        # 先把新记录汇总，确保归档的记录都已计入汇总表
+        run_rollup()
+        count = archive_visits(days=days, chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f'成功归档 {count} 条访问记录到 {archive_dir()}'))
@@ -0,0 +1,55 @@
+# blog/management/commands/benchmark_markdown.py
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from blog.templatetags.markdown_extras import build_renderer, render_markdown
+
+SAMPLES = {
+    '短文本': '一段**简单**的文字，带一个[链接](https://example.com)。',
+    '长文章': (
+        '## 小节标题\n\n正文段落，包含 `行内代码` 和 $x^2$ 公式。\n\n'
+        '```python\ndef add(a, b):\n    return a + b\n```\n\n'
+        '| 列一 | 列二 |\n| --- | --- |\n| 1 | 2 |\n\n'
+    ) * 20,
+}
+
+
+class Command(BaseCommand):
+    help = 'Markdown 渲染微基准：对比每次新建渲染器与使用渲染器池的单次耗时'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=200, help='每项测量的渲染次数，默认200')
+        parser.add_argument('--threads', type=int, default=4, help='并发测量使用的线程数，默认4')
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        threads = options['threads']
+
+        def per_call(render):
+            start = time.perf_counter()
+            for _ in range(iterations):
+                render()
+            return (time.perf_counter() - start) / iterations * 1000
+
+        self.stdout.write(f'每项渲染 {iterations} 次，单位：毫秒/次')
+        for name, text in SAMPLES.items():
+            def construct_each_time():
+                build_renderer().convert(text)
+
+            # 预热（导入 Pygments 词法分析器等一次性开销）
+            render_markdown(text)
+            before = per_call(construct_each_time)
+            after = per_call(lambda: render_markdown(text))
+
+            with ThreadPoolExecutor(max_workers=threads) as executor:
+                start = time.perf_counter()
+                list(executor.map(lambda _: render_markdown(text), range(iterations)))
+                concurrent = (time.perf_counter() - start) / iterations * 1000
+
+            self.stdout.write(
+                f'{name}: 每次新建 {before:.3f}，渲染器池 {after:.3f}，'
+                f'节省 {before - after:.3f}（{threads} 线程并发 {concurrent:.3f}）'
+            )
+
+        self.stdout.write(self.style.SUCCESS('基准测试完成'))
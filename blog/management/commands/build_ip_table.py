@@ -0,0 +1,24 @@
+# blog/management/commands/build_ip_table.py
+from django.core.management.base import BaseCommand, CommandError
+from blog import ip_location
+
+
+class Command(BaseCommand):
+    help = '把 CSV 格式的 IP 归属地表（起始IP,结束IP,城市）编译为可 mmap 加载的二进制表'
+
+    def add_arguments(self, parser):
+        parser.add_argument('source', help='CSV 文件')
+        parser.add_argument('--output', '-o', help="输出文件，默认为 IP_LOCATION['PATH']")
+
+    def handle(self, *args, **options):
+        output = options['output'] or ip_location.table_path()
+        if not output:
+            raise CommandError("请用 --output 指定输出文件，或配置 IP_LOCATION['PATH']")
+        if str(output).lower().endswith('.csv'):
+            raise CommandError('输出文件不能是 CSV 文件')
+
+        try:
+            ranges, cities = ip_location.write(ip_location.parse_csv(options['source']), output)
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(f'成功生成 {output}：{ranges} 个区间，{cities} 个城市'))
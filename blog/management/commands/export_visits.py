@@ -0,0 +1,45 @@
+# blog/management/commands/export_visits.py
+import sys
+from django.core.management.base import BaseCommand, CommandError
+from blog.visit_export import EXPORT_FORMATS, export_queryset, iter_export, parse_date
+
+
+class Command(BaseCommand):
+    help = '以 CSV 或 NDJSON 流式导出访问记录（内存占用恒定，可导出任意时间范围）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=EXPORT_FORMATS, default='csv', help='导出格式，默认csv')
+        parser.add_argument('--start', help='开始日期 YYYY-MM-DD（含）')
+        parser.add_argument('--end', help='结束日期 YYYY-MM-DD（含）')
+        parser.add_argument('--path', help='访问路径，以 * 结尾为前缀匹配')
+        parser.add_argument('--status', type=int, help='状态码')
+        parser.add_argument('--output', '-o', help='输出文件，默认输出到标准输出')
+
+    def handle(self, *args, **options):
+        try:
+            start_date = parse_date(options['start'])
+            end_date = parse_date(options['end'])
+        except ValueError:
+            raise CommandError('日期格式应为 YYYY-MM-DD')
+
+        rows = export_queryset(
+            start_date=start_date,
+            end_date=end_date,
+            path=options['path'],
+            status_code=options['status'],
+        )
+
+        output = open(options['output'], 'w', encoding='utf-8', newline='') if options['output'] else sys.stdout
+        count = 0
+        try:
+            for line in iter_export(rows, options['format']):
+                output.write(line)
+                count += 1
+        finally:
+            if options['output']:
+                output.close()
+
+        if options['output']:
+            if options['format'] == 'csv':
+                count -= 1  # 表头
+            self.stderr.write(self.style.SUCCESS(f'成功导出 {count} 条访问记录到 {options["output"]}'))
@@ -0,0 +1,25 @@
+# blog/management/commands/flush_view_counts.py
+from django.core.management.base import BaseCommand, CommandError
+from blog.models import Post
+from blog import view_counter
+
+
+class Command(BaseCommand):
+    help = '把缓存中累积的文章浏览数增量写回数据库（使用 Redis 等共享缓存时可由定时任务执行）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='每批检查的文章数，默认1000')
+
+    def handle(self, *args, **options):
+        if not view_counter.store.shared:
+            raise CommandError("VIEW_COUNTER['CACHE'] 不是共享缓存，浏览增量保存在各 Web 进程内，"
+                               "由各进程的后台线程写回，本命令无法读取")
+
+        batch_size = options['batch_size']
+        post_ids = list(Post.objects.values_list('id', flat=True).order_by('id'))
+
+        total = 0
+        for start in range(0, len(post_ids), batch_size):
+            total += view_counter.flush(post_ids[start:start + batch_size])
+
+        self.stdout.write(self.style.SUCCESS(f'成功写回 {total} 次浏览'))
@@ -0,0 +1,18 @@
+# blog/management/commands/rebuild_related_posts.py
+from django.core.management.base import BaseCommand
+from blog.related_posts import rebuild
+
+
+class Command(BaseCommand):
+    help = '全量重建相关文章表（按标签加权 Jaccard、同分类与发布时间计算每篇文章的前 K 篇相关文章）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None, help='计算进程数，默认为CPU核数，1 表示在当前进程中计算')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='每个任务包含的文章数，默认1000')
+
+    def handle(self, *args, **options):
+        def progress(done, total):
+            self.stdout.write(f'已处理 {done}/{total} 篇文章')
+
+        total = rebuild(workers=options['workers'], chunk_size=options['chunk_size'], progress=progress)
+        self.stdout.write(self.style.SUCCESS(f'成功重建相关文章，共处理 {total} 篇文章'))
@@ -0,0 +1,20 @@
+# blog/management/commands/rebuild_search_index.py
+from django.core.management.base import BaseCommand
+from blog.search import get_backend, rebuild_index
+
+
+class Command(BaseCommand):
+    help = '清空并重建文章全文检索索引（SQLite 使用 FTS5，其余数据库使用纯 Python 倒排表）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='每批索引的文章数，默认500')
+
+    def handle(self, *args, **options):
+        backend = get_backend()
+        self.stdout.write(f'检索后端: {backend.name}')
+
+        def progress(count):
+            self.stdout.write(f'已索引 {count} 篇文章')
+
+        total = rebuild_index(batch_size=options['batch_size'], progress=progress)
+        self.stdout.write(self.style.SUCCESS(f'成功重建索引，共收录 {total} 篇文章'))
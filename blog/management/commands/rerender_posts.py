@@ -0,0 +1,90 @@
+# blog/management/commands/rerender_posts.py
+import json
+import os
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from blog import post_analysis
+from blog.models import Post
+from blog.post_rendering import rerender
+from blog.templatetags.markdown_extras import renderer_signature
+
+
+def _signature():
+    """断点对应的配置：渲染器与文章分析器的指纹，任一变化都不能续跑"""
+    return f'{renderer_signature()}:{post_analysis.signature()}'
+
+
+class Command(BaseCommand):
+    help = '批量重新渲染文章内容并重新计算派生属性（修改 Markdown 扩展或文章分析器配置、升级 Pygments 后使用；也用于回填新增的分析字段），支持多进程、断点续跑与试运行'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='渲染进程数，默认为CPU核数，1 表示在当前进程中渲染')
+        parser.add_argument('--batch-size', type=int, default=100, help='每批文章数，默认100')
+        parser.add_argument('--force', action='store_true', help='忽略指纹，全部重新渲染')
+        parser.add_argument('--dry-run', action='store_true', help='只统计需要重新渲染的文章数，不渲染也不写库')
+        parser.add_argument('--resume', action='store_true', help='从上次中断的位置继续')
+        parser.add_argument('--checkpoint', default=str(Path(settings.BASE_DIR) / '.rerender_posts.checkpoint'),
+                            help='断点文件路径')
+        parser.add_argument('--progress-interval', type=float, default=5, help='进度输出间隔（秒），默认5')
+
+    def handle(self, *args, **options):
+        checkpoint = Path(options['checkpoint'])
+        start_after = 0
+        if options['resume'] and checkpoint.exists():
+            state = json.loads(checkpoint.read_text(encoding='utf-8'))
+            if state.get('signature') != _signature() or state.get('force') != options['force']:
+                raise CommandError('断点文件对应的渲染配置、分析器配置或参数与本次不同，请去掉 --resume 重新开始')
+            start_after = state['last_id']
+            self.stdout.write(f'从文章ID {start_after} 之后继续')
+
+        total = Post.objects.filter(id__gt=start_after).count()
+        started = time.monotonic()
+        last_report = started
+
+        def save_checkpoint(stats):
+            tmp = checkpoint.with_suffix('.tmp')
+            tmp.write_text(json.dumps({
+                'last_id': stats['last_id'],
+                'signature': _signature(),
+                'force': options['force'],
+            }), encoding='utf-8')
+            os.replace(tmp, checkpoint)
+
+        def report(stats):
+            elapsed = max(time.monotonic() - started, 1e-6)
+            self.stdout.write(
+                f'已扫描 {stats["scanned"]}/{total}，渲染 {stats["rendered"]}，失败 {stats["failed"]}，'
+                f'{stats["rendered"] / elapsed:.1f} 篇/秒，最后ID {stats["last_id"]}'
+            )
+
+        def progress(stats):
+            nonlocal last_report
+            if not options['dry_run']:
+                save_checkpoint(stats)
+            if time.monotonic() - last_report >= options['progress_interval']:
+                last_report = time.monotonic()
+                report(stats)
+
+        stats = rerender(
+            workers=options['workers'],
+            batch_size=options['batch_size'],
+            start_after=start_after,
+            force=options['force'],
+            dry_run=options['dry_run'],
+            progress=progress,
+        )
+        report(stats)
+
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f'试运行：共有 {stats["rendered"]} 篇文章需要重新渲染'))
+            return
+
+        checkpoint.unlink(missing_ok=True)
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'成功重新渲染 {stats["rendered"]} 篇文章，用时 {elapsed:.1f} 秒'
+        ))
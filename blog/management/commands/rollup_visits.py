@@ -0,0 +1,19 @@
+# blog/management/commands/rollup_visits.py
+from django.core.management.base import BaseCommand
+from blog.rollups import run_rollup, reset_rollups
+
+
+class Command(BaseCommand):
+    help = '把新的访问记录增量汇总到小时/每日汇总表（建议每隔几分钟由定时任务执行）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=10000, help='每个事务处理的原始记录ID跨度，默认10000')
+        parser.add_argument('--rebuild', action='store_true', help='清空汇总表并从头重新汇总')
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            reset_rollups()
+            self.stdout.write(self.style.WARNING('已清空汇总表，开始全量重建'))
+
+        processed = run_rollup(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f'成功汇总 {processed} 条访问记录'))
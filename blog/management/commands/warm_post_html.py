@@ -0,0 +1,18 @@
+# blog/management/commands/warm_post_html.py
+from django.core.management.base import BaseCommand
+from blog.post_rendering import warm
+
+
+class Command(BaseCommand):
+    help = '预先渲染文章内容：重新渲染内容或渲染配置已变化的文章，并写回数据库与缓存'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200, help='每批检查的文章数，默认200')
+        parser.add_argument('--force', action='store_true', help='忽略指纹，全部重新渲染')
+
+    def handle(self, *args, **options):
+        def progress(checked, rendered):
+            self.stdout.write(f'已检查 {checked} 篇，重新渲染 {rendered} 篇')
+
+        total = warm(batch_size=options['batch_size'], force=options['force'], progress=progress)
+        self.stdout.write(self.style.SUCCESS(f'成功渲染 {total} 篇文章'))
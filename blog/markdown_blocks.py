@@ -0,0 +1,245 @@
+"""
+Markdown 增量预览
+把文档切分为顶层块（空行分隔，围栏代码块、$$ 公式块、HTML 块、列表与引用保持完整），按内容指纹缓存每块渲染后的 HTML。
+标题 id 按整篇文档的顺序统一分配（与整篇渲染一致），块指纹包含分配到的 id。
+预览接口返回块指纹列表，只附带客户端还没有的块的 HTML，客户端据此复用未变化的块、插入新块
+"""
+
+import hashlib
+import html
+import re
+
+from django.core.cache import cache
+from markdown.extensions.toc import IDCOUNT_RE, slugify, unique
+from markdown.util import BLOCK_LEVEL_ELEMENTS
+
+from .templatetags.markdown_extras import EXTENSION_CONFIGS, markdown_filter, render_document, renderer_signature
+
+# 缓存值为 {'html', 'headings'}
+CACHE_PREFIX = 'md_block_v2'
+CACHE_TIMEOUT = 60 * 60
+
+# 块指纹长度（十六进制字符），只用于区分同一篇文档中的块
+BLOCK_ID_LENGTH = 16
+
+_FENCE = re.compile(r'^\s{0,3}(`{3,}|~{3,})')
+_LIST_ITEM = re.compile(r'^\s{0,3}([*+-]|\d+[.)])\s')
+_QUOTE = re.compile(r'^\s{0,3}>')
+# 以块级标签开头的行开始一个原始 HTML 块，直到对应的结束标签为止（中间可以有空行）
+_HTML_START = re.compile(r'^\s{0,3}<([a-zA-Z][a-zA-Z0-9]*)(?=[\s/>]|$)')
+_COMMENT_START = re.compile(r'^\s{0,3}<!--')
+_BLOCK_TAGS = frozenset(BLOCK_LEVEL_ELEMENTS)
+_VOID_TAGS = frozenset({'hr'})
+# 链接引用与缩写定义，不产生输出，但会影响其他块的渲染
+_DEFINITION = re.compile(r'^\s{0,3}(\[[^\]^][^\]]*\]:|\*\[[^\]]+\]:)')
+# 脚注与 [TOC] 需要整篇文档才能正确渲染，出现时退回整篇渲染
+_WHOLE_DOCUMENT = re.compile(r'^\s{0,3}\[\^[^\]]+\]:|\[TOC\]', re.MULTILINE)
+
+
+def _continues(line, previous):
+    """
+    空行之后的这一行是否仍属于上一块（列表的后续项、引用的后续段落或缩进的续行）
+    多合并几块只会少复用一些缓存，不影响渲染结果
+    """
+    if line[:1] in (' ', '\t'):
+        return True
+    if _QUOTE.match(line):
+        return any(_QUOTE.match(item) for item in previous)
+    return bool(_LIST_ITEM.match(line)) and bool(_LIST_ITEM.match(previous[0]))
+
+
+def _tag_depth(line, tag):
+    """这一行使标签 tag 的嵌套层数变化多少（自闭合标签不计）"""
+    opened = len(re.findall(rf'<{tag}(?=[\s/>]|$)', line, re.IGNORECASE))
+    self_closed = len(re.findall(rf'<{tag}(?:\s[^<>]*)?/>', line, re.IGNORECASE))
+    closed = len(re.findall(rf'</{tag}\s*>', line, re.IGNORECASE))
+    return opened - self_closed - closed
+
+
+def split_blocks(text):
+    """切分顶层块，返回字符串列表；无法确定块边界（如 HTML 块没有结束标签）时返回 None"""
+    blocks = []
+    current = []
+    fence = None
+    in_math = False
+    html_tag = None  # 未闭合的 HTML 块：(标签, 层数)，注释为 ('!--', 1)
+
+    for line in text.replace('\r\n', '\n').split('\n'):
+        stripped = line.strip()
+        if fence:
+            current.append(line)
+            if stripped.startswith(fence) and not stripped.lstrip(fence[0]):
+                fence = None
+            continue
+        if in_math:
+            current.append(line)
+            if '$$' in stripped:
+                in_math = False
+            continue
+        if html_tag:
+            current.append(line)
+            tag, depth = html_tag
+            if tag == '!--':
+                depth = 0 if '-->' in line else 1
+            else:
+                depth += _tag_depth(line, tag)
+            html_tag = (tag, depth) if depth > 0 else None
+            continue
+
+        match = _FENCE.match(line)
+        html_match = _HTML_START.match(line)
+        if match:
+            fence = match.group(1)
+        elif stripped.startswith('$$') and stripped.count('$$') == 1:
+            in_math = True
+        elif _COMMENT_START.match(line):
+            if '-->' not in line[line.index('<!--') + 4:]:
+                html_tag = ('!--', 1)
+        elif html_match and html_match.group(1).lower() in _BLOCK_TAGS:
+            tag = html_match.group(1).lower()
+            depth = _tag_depth(line, tag) if tag not in _VOID_TAGS else 0
+            if depth > 0:
+                html_tag = (tag, depth)
+        elif not stripped:
+            if current:
+                blocks.append(current)
+                current = []
+            continue
+
+        if not current and blocks and _continues(line, blocks[-1]):
+            current = blocks.pop() + ['']
+        current.append(line)
+
+    if html_tag:
+        return None
+    if current:
+        blocks.append(current)
+    return ['\n'.join(lines) for lines in blocks]
+
+
+def _render_key(block, context):
+    digest = hashlib.sha256(renderer_signature().encode('ascii'))
+    digest.update(context.encode('utf-8'))
+    digest.update(b'\0')
+    digest.update(block.encode('utf-8'))
+    return digest.hexdigest()[:BLOCK_ID_LENGTH]
+
+
+def _block_id(render_key, id_map):
+    """客户端使用的块指纹：渲染指纹加上文档级分配改动的标题 id"""
+    if not id_map:
+        return render_key
+    digest = hashlib.sha256(render_key.encode('ascii'))
+    for old, new in sorted(id_map.items()):
+        digest.update(f'\0{old}\0{new}'.encode('utf-8'))
+    return digest.hexdigest()[:BLOCK_ID_LENGTH]
+
+
+def _render_block(block, context):
+    """单独渲染一块，返回 ({'html', 'headings'}, 是否成功)"""
+    try:
+        document = render_document(f'{block}\n\n{context}' if context else block)
+        return {'html': document['html'], 'headings': document['headings']}, True
+    except Exception:
+        return {'html': str(markdown_filter(block)), 'headings': []}, False
+
+
+def _id_base(value):
+    match = IDCOUNT_RE.match(value)
+    return match.group(1) if match else value
+
+
+def _slug(name):
+    config = EXTENSION_CONFIGS.get('markdown.extensions.toc', {})
+    return config.get('slugify', slugify)(html.unescape(name), config.get('separator', '-'))
+
+
+def assign_heading_ids(blocks_headings):
+    """
+    按整篇文档的顺序重新分配各块标题的 id，规则与 toc 扩展渲染整篇文档时相同：
+    显式指定的 id 保持不变并先行占用，其余标题按出现顺序由标题文本生成并去重（_1、_2 ...）
+    blocks_headings 为各块单独渲染得到的 [[level, id, name], ...]，返回每块的 {块内 id: 文档 id}（只含有变化的）
+    """
+    parsed = []
+    used = set()
+    for headings in blocks_headings:
+        items = []
+        for _, block_id, name in headings:
+            slug = _slug(name)
+            generated = _id_base(block_id) == _id_base(slug)
+            if not generated:
+                used.add(block_id)
+            items.append((block_id, slug, generated))
+        parsed.append(items)
+
+    id_maps = []
+    for items in parsed:
+        id_map = {}
+        for block_id, slug, generated in items:
+            if generated:
+                document_id = unique(slug, used)
+                if document_id != block_id:
+                    id_map[block_id] = document_id
+        id_maps.append(id_map)
+    return id_maps
+
+
+_HEADING_ID = re.compile(r'(<h[1-6][^>]*?\sid="|<a class="headerlink" href="#)([^"]*)"')
+
+
+def _apply_ids(block_html, id_map):
+    """替换块 HTML 中标题的 id 与永久链接"""
+    if not id_map:
+        return block_html
+    return _HEADING_ID.sub(lambda m: f'{m.group(1)}{id_map.get(m.group(2), m.group(2))}"', block_html)
+
+
+def document_blocks(text):
+    """
+    返回 [(render_key, block, context), ...]
+    链接引用/缩写定义块并入每个块的渲染上下文（定义变化时所有块的指纹随之变化）；
+    含脚注或 [TOC] 的文档、无法确定块边界的文档整体作为一个块
+    """
+    blocks = None if _WHOLE_DOCUMENT.search(text) else split_blocks(text)
+    if blocks is None:
+        return [(_render_key(text, ''), text, '')]
+
+    content = []
+    definitions = []
+    for block in blocks:
+        if all(_DEFINITION.match(line) for line in block.split('\n') if line.strip()):
+            definitions.append(block)
+        else:
+            content.append(block)
+    context = '\n'.join(definitions)
+    return [(_render_key(block, context), block, context) for block in content]
+
+
+def render_blocks(text, known=()):
+    """
+    增量渲染
+    返回 [{'id': ...}, {'id': ..., 'html': ...}, ...]：客户端已有（在 known 中）的块只返回指纹，
+    其余块返回 HTML。标题 id 依赖前面所有块的标题，因此每次都读取全部块的渲染结果（缓存未命中时现场渲染）
+    """
+    known = set(known)
+    blocks = document_blocks(text)
+    keys = [f'{CACHE_PREFIX}_{render_key}' for render_key, _, _ in blocks]
+    rendered = cache.get_many(list(set(keys)))
+
+    to_cache = {}
+    for (_, block, context), key in zip(blocks, keys):
+        if key not in rendered:
+            rendered[key], ok = _render_block(block, context)
+            if ok:
+                to_cache[key] = rendered[key]
+    if to_cache:
+        cache.set_many(to_cache, CACHE_TIMEOUT)
+
+    id_maps = assign_heading_ids([rendered[key]['headings'] for key in keys])
+    result = []
+    for (render_key, _, _), key, id_map in zip(blocks, keys, id_maps):
+        entry = {'id': _block_id(render_key, id_map)}
+        if entry['id'] not in known:
+            entry['html'] = _apply_ids(rendered[key]['html'], id_map)
+        result.append(entry)
+    return result
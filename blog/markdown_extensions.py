@@ -0,0 +1,133 @@
+"""
+博客的 Markdown 扩展
+在生成元素树时一次遍历完成 HTML 调整并收集元数据，取代渲染后对整段 HTML 的多次正则替换：
+表格加 Bootstrap 类、图片加响应式类、mdx_math 生成的公式转为 KaTeX 可识别的元素，
+同时检测是否包含公式并提取纯文本摘要，结果保存在 md.blog_meta 中。
+代码高亮的 HTML 以原始 HTML 形式暂存、不在元素树中，其中 Pygments 输出的空 <span></span> 由后处理器去掉
+"""
+
+import re
+
+from markdown.extensions import Extension
+from markdown.postprocessors import Postprocessor
+from markdown.treeprocessors import Treeprocessor
+from markdown.util import AtomicString, HTML_PLACEHOLDER_RE, STX, ETX
+
+TABLE_CLASS = 'table table-bordered table-hover'
+IMAGE_CLASS = 'img-fluid rounded'
+
+# 未被 mdx_math 处理、留给前端 KaTeX auto-render 的 $...$ 行内公式
+_INLINE_DOLLAR = re.compile(r'\$[^$\n]+\$')
+# Markdown 对反斜杠转义字符的内部编码
+_ESCAPED = re.compile(f'{STX}(\\d+){ETX}')
+_WHITESPACE = re.compile(r'\s+')
+# Pygments 在代码块 <pre> 开头输出的空 span
+_EMPTY_SPAN = re.compile(r'<pre([^>]*)><span></span>')
+
+# 结束时在摘要中补一个空格的块级元素
+_BLOCK_TAGS = {'p', 'li', 'td', 'th', 'blockquote', 'div', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'dd', 'dt'}
+# 内容不计入摘要的元素
+_SKIP_TAGS = {'pre', 'code', 'script', 'style'}
+
+
+def _add_class(element, value):
+    current = element.get('class')
+    element.set('class', f'{current} {value}' if current else value)
+
+
+class BlogTreeprocessor(Treeprocessor):
+    """在行内处理之后、生成目录之前运行，一次遍历整棵树"""
+
+    def __init__(self, md, summary_length):
+        super().__init__(md)
+        self.summary_length = summary_length
+
+    def run(self, root):
+        self.has_math = False
+        self.summary = []
+        self.summary_size = 0
+        self._visit(root, skip_text=False)
+
+        summary = _WHITESPACE.sub(' ', ''.join(self.summary)).strip()
+        summary = _ESCAPED.sub(lambda m: chr(int(m.group(1))), summary)
+        if len(summary) > self.summary_length:
+            summary = summary[:self.summary_length] + '...'
+        self.md.blog_meta = {'has_math': self.has_math, 'summary': summary}
+
+    def _collect(self, text):
+        if not text:
+            return
+        if _INLINE_DOLLAR.search(text):
+            self.has_math = True
+            text = _INLINE_DOLLAR.sub('', text)
+        if self.summary_size <= self.summary_length:
+            text = HTML_PLACEHOLDER_RE.sub('', text)
+            self.summary.append(text)
+            self.summary_size += len(text)
+
+    def _visit(self, element, skip_text):
+        tag = element.tag
+        if tag == 'table':
+            _add_class(element, TABLE_CLASS)
+        elif tag == 'img':
+            _add_class(element, IMAGE_CLASS)
+        elif tag == 'script' and element.get('type', '').startswith('math/tex'):
+            self._convert_math(element)
+            return
+
+        skip_text = skip_text or tag in _SKIP_TAGS
+        if not skip_text:
+            self._collect(element.text)
+        for child in element:
+            self._visit(child, skip_text)
+            if not skip_text:
+                self._collect(child.tail)
+        if tag in _BLOCK_TAGS and not skip_text:
+            self.summary.append(' ')
+
+    def _convert_math(self, element):
+        """mdx_math 输出的 <script type="math/tex"> 改为带分隔符的 span，由 KaTeX auto-render 渲染"""
+        self.has_math = True
+        display = 'mode=display' in element.get('type', '')
+        tex = (element.text or '').strip()
+        element.tag = 'span'
+        element.attrib.clear()
+        element.set('class', 'math display katex-render' if display else 'math inline katex-render')
+        element.text = AtomicString(f'\\[{tex}\\]' if display else f'\\({tex}\\)')
+
+
+class EmptySpanPostprocessor(Postprocessor):
+    """去掉代码高亮输出中 <pre> 开头的空 <span></span>"""
+
+    def run(self, text):
+        if '<span></span>' not in text:
+            return text
+        return _EMPTY_SPAN.sub(r'<pre\1>', text)
+
+
+class BlogHtmlExtension(Extension):
+    """注册 BlogTreeprocessor 与 EmptySpanPostprocessor；每个 Markdown 实例使用独立的扩展实例"""
+
+    def __init__(self, **kwargs):
+        self.config = {
+            'summary_length': [200, '摘要的最大字符数'],
+        }
+        super().__init__(**kwargs)
+
+    def extendMarkdown(self, md):
+        md.registerExtension(self)
+        self.md = md
+        # 行内处理为 20，目录为 5：此时图片与公式元素已生成，标题尚未加锚点
+        md.treeprocessors.register(
+            BlogTreeprocessor(md, self.getConfig('summary_length')), 'blog_html', 6
+        )
+        # 原始 HTML 还原为 30，之后代码高亮的 HTML 才出现在输出中
+        md.postprocessors.register(EmptySpanPostprocessor(md), 'blog_empty_span', 25)
+        self.reset()
+
+    def reset(self):
+        self.md.blog_meta = {'has_math': False, 'summary': ''}
+
+
+def makeExtension(**kwargs):
+    return BlogHtmlExtension(**kwargs)
@@ -4,9 +4,12 @@
 """
 
 import time
+from django.utils import timezone
 from django.utils.deprecation import MiddlewareMixin
-from .models import VisitStatistics
 from .utils import get_client_ip
+from .user_agents import classify_fields
+from .recording_policy import load_policy
+from .visit_recorder import record_visit
 
 # middleware/public_ip_middleware.py
 import json
@@ -125,40 +128,52 @@ def get_client_public_ip(request):
 class VisitStatisticsMiddleware(MiddlewareMixin):
     """
     访问统计中间件
-    记录每个请求的访问信息
+    按 VISIT_RECORDING_POLICY 过滤/采样后记录请求的访问信息
     """
 
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        # 规则在中间件实例化（进程启动）时编译一次
+        self.policy = load_policy()
+
     def process_request(self, request):
         """在请求开始时记录时间"""
         request.start_time = time.time()
 
     def process_response(self, request, response):
         """在响应时记录访问统计"""
-        # 排除管理后台和静态文件
-        if request.path.startswith('/admin/') or request.path.startswith('/static/'):
-            return response
-
-        # 排除API请求（可选）
-        if request.path.startswith('/api/'):
+        # 按路径规则排除（管理后台、静态文件、API等），无需解析请求信息
+        if self.policy.path_weight(request.path) is None:
             return response
 
         try:
-            # 计算响应时间
-            response_time = 0
+            # 计算响应时间（毫秒）
+            response_time_ms = None
             if hasattr(request, 'start_time'):
-                response_time = time.time() - request.start_time
+                response_time_ms = int((time.time() - request.start_time) * 1000)
 
             # 获取客户端信息
             ip_address = get_client_ip(request)
             user_agent = request.META.get('HTTP_USER_AGENT', '')
+            ua_fields = classify_fields(user_agent)
 
-            # 记录访问统计
-            VisitStatistics.objects.create(
+            # 采样、爬虫与单IP限速
+            weight = self.policy.weight_for(request.path, ip_address, ua_fields['device_family'])
+            if weight is None:
+                return response
+
+            # 记录访问统计（入队，由后台线程批量写入）
+            record_visit(
                 ip_address=ip_address,
                 user_agent=user_agent[:500],  # 限制长度
                 path=request.path[:500],
                 method=request.method,
                 status_code=response.status_code,
+                view_name=self._view_name(request),
+                response_time_ms=response_time_ms,
+                visit_time=timezone.now(),
+                sample_weight=weight,
+                **ua_fields,
             )
 
         except Exception as e:
@@ -168,19 +183,33 @@ class VisitStatisticsMiddleware(MiddlewareMixin):
         return response
 
     def process_exception(self, request, exception):
-        """处理异常请求"""
+        """处理异常请求（错误不参与采样，始终记录）"""
+        if self.policy.path_weight(request.path) is None:
+            return None
+
         try:
             ip_address = get_client_ip(request)
             user_agent = request.META.get('HTTP_USER_AGENT', '')
 
-            VisitStatistics.objects.create(
+            record_visit(
                 ip_address=ip_address,
                 user_agent=user_agent[:500],
                 path=request.path[:500],
                 method=request.method,
                 status_code=500,  # 服务器错误
+                view_name=self._view_name(request),
+                visit_time=timezone.now(),
+                **classify_fields(user_agent),
             )
         except:
             pass
 
         return None
+
+    @staticmethod
+    def _view_name(request):
+        """获取请求匹配到的视图名称（未匹配到路由时为空）"""
+        match = getattr(request, 'resolver_match', None)
+        if match is None:
+            return ''
+        return (match.view_name or '')[:100]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.9 on 2026-10-16 22:56
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0003_alter_privatemessage_options_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='visitstatistics',
+            name='visit_time',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='访问时间'),
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.9 on 2026-10-16 22:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0004_visitstatistics_visit_time_default'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True, verbose_name='任务名')),
+                ('last_id', models.BigIntegerField(default=0, verbose_name='已处理最大ID')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+            ],
+            options={
+                'verbose_name': '汇总水位线',
+                'verbose_name_plural': '汇总水位线',
+            },
+        ),
+        migrations.CreateModel(
+            name='VisitDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dimension', models.CharField(choices=[('path', '访问路径'), ('status', '状态码'), ('browser', '浏览器')], max_length=20, verbose_name='维度')),
+                ('key', models.CharField(max_length=500, verbose_name='维度取值')),
+                ('count', models.PositiveBigIntegerField(default=0, verbose_name='访问次数')),
+                ('bucket', models.DateField(verbose_name='日期')),
+            ],
+            options={
+                'verbose_name': '每日访问汇总',
+                'verbose_name_plural': '每日访问汇总',
+                'indexes': [models.Index(fields=['dimension', 'bucket'], name='blog_visitd_dimensi_f448ce_idx')],
+                'unique_together': {('bucket', 'dimension', 'key')},
+            },
+        ),
+        migrations.CreateModel(
+            name='VisitHourlyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dimension', models.CharField(choices=[('path', '访问路径'), ('status', '状态码'), ('browser', '浏览器')], max_length=20, verbose_name='维度')),
+                ('key', models.CharField(max_length=500, verbose_name='维度取值')),
+                ('count', models.PositiveBigIntegerField(default=0, verbose_name='访问次数')),
+                ('bucket', models.DateTimeField(verbose_name='小时')),
+            ],
+            options={
+                'verbose_name': '小时访问汇总',
+                'verbose_name_plural': '小时访问汇总',
+                'indexes': [models.Index(fields=['dimension', 'bucket'], name='blog_visith_dimensi_0800f6_idx')],
+                'unique_together': {('bucket', 'dimension', 'key')},
+            },
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.9 on 2026-10-16 22:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0005_visit_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='visitstatistics',
+            name='response_time_ms',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='响应时间(毫秒)'),
+        ),
+        migrations.AddField(
+            model_name='visitstatistics',
+            name='view_name',
+            field=models.CharField(blank=True, max_length=100, verbose_name='视图名称'),
+        ),
+        migrations.CreateModel(
+            name='LatencyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.DateTimeField(verbose_name='小时')),
+                ('dimension', models.CharField(choices=[('path', '访问路径'), ('view', '视图名称')], max_length=20, verbose_name='维度')),
+                ('key', models.CharField(max_length=500, verbose_name='维度取值')),
+                ('count', models.PositiveBigIntegerField(default=0, verbose_name='样本数')),
+                ('sketch', models.BinaryField(verbose_name='分位数草图')),
+            ],
+            options={
+                'verbose_name': '响应时间汇总',
+                'verbose_name_plural': '响应时间汇总',
+                'indexes': [models.Index(fields=['dimension', 'bucket'], name='blog_latenc_dimensi_13369f_idx')],
+                'unique_together': {('bucket', 'dimension', 'key')},
+            },
+        ),
+    ]
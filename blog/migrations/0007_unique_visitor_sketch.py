@@ -0,0 +1,27 @@
+# Generated by Django 5.2.9 on 2026-10-16 22:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0006_visit_response_time'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UniqueVisitorSketch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.DateField(verbose_name='日期')),
+                ('path', models.CharField(blank=True, max_length=500, verbose_name='访问路径')),
+                ('sketch', models.BinaryField(verbose_name='HyperLogLog草图')),
+            ],
+            options={
+                'verbose_name': '独立访客草图',
+                'verbose_name_plural': '独立访客草图',
+                'unique_together': {('bucket', 'path')},
+            },
+        ),
+    ]
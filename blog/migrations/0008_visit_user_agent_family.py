@@ -0,0 +1,38 @@
+# Generated by Django 5.2.9 on 2026-10-16 22:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0007_unique_visitor_sketch'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='visitstatistics',
+            name='browser_family',
+            field=models.PositiveSmallIntegerField(choices=[(0, '其他'), (1, 'Chrome'), (2, 'Firefox'), (3, 'Safari'), (4, 'Edge'), (5, 'Opera'), (6, 'IE'), (7, '微信'), (8, 'Samsung')], db_index=True, default=0, verbose_name='浏览器'),
+        ),
+        migrations.AddField(
+            model_name='visitstatistics',
+            name='device_family',
+            field=models.PositiveSmallIntegerField(choices=[(0, '其他'), (1, '桌面'), (2, '手机'), (3, '平板'), (4, '爬虫')], default=0, verbose_name='设备类型'),
+        ),
+        migrations.AddField(
+            model_name='visitstatistics',
+            name='os_family',
+            field=models.PositiveSmallIntegerField(choices=[(0, '其他'), (1, 'Windows'), (2, 'macOS'), (3, 'iOS'), (4, 'Android'), (5, 'Linux')], default=0, verbose_name='操作系统'),
+        ),
+        migrations.AlterField(
+            model_name='visitdailyrollup',
+            name='dimension',
+            field=models.CharField(choices=[('path', '访问路径'), ('status', '状态码'), ('browser', '浏览器'), ('os', '操作系统'), ('device', '设备类型')], max_length=20, verbose_name='维度'),
+        ),
+        migrations.AlterField(
+            model_name='visithourlyrollup',
+            name='dimension',
+            field=models.CharField(choices=[('path', '访问路径'), ('status', '状态码'), ('browser', '浏览器'), ('os', '操作系统'), ('device', '设备类型')], max_length=20, verbose_name='维度'),
+        ),
+    ]
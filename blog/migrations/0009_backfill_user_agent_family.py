@@ -0,0 +1,51 @@
+# Generated by Django 5.2.9 on 2026-10-16 23:20
+
+from collections import defaultdict
+
+from django.db import migrations, transaction
+
+CHUNK_SIZE = 5000
+
+
+def backfill_user_agent_family(apps, schema_editor):
+    """
+    按主键范围分块回填历史访问记录的分类字段
+    每块按主键顺序读取一次（不依赖 user_agent 上的索引），在 Python 中分类（同一 UA 只解析一次），
+    按分类结果分组后用主键列表批量更新；每块单独提交，中断后重新执行是幂等的
+    """
+    from blog.user_agents import classify_fields
+
+    VisitStatistics = apps.get_model('blog', 'VisitStatistics')
+    last_id = 0
+    while True:
+        rows = list(
+            VisitStatistics.objects.filter(id__gt=last_id).order_by('id')
+            .values_list('id', 'user_agent')[:CHUNK_SIZE]
+        )
+        if not rows:
+            break
+
+        # 分类结果 -> 主键列表；全为默认值（其他）的记录无需更新
+        groups = defaultdict(list)
+        for pk, user_agent in rows:
+            families = classify_fields(user_agent)
+            if any(families.values()):
+                groups[tuple(sorted(families.items()))].append(pk)
+
+        with transaction.atomic(using=schema_editor.connection.alias):
+            for families, ids in groups.items():
+                VisitStatistics.objects.filter(id__in=ids).update(**dict(families))
+        last_id = rows[-1][0]
+
+
+class Migration(migrations.Migration):
+    # 数据量大时不能放在一个事务里，每块单独提交
+    atomic = False
+
+    dependencies = [
+        ('blog', '0008_visit_user_agent_family'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_user_agent_family, migrations.RunPython.noop),
+    ]
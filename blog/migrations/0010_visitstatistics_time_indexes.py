@@ -0,0 +1,21 @@
+# Generated by Django 5.2.9 on 2026-10-16 23:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0009_backfill_user_agent_family'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='visitstatistics',
+            index=models.Index(fields=['visit_time'], name='blog_visits_visit_t_61dbcf_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='visitstatistics',
+            index=models.Index(fields=['path', 'visit_time'], name='blog_visits_path_5f7ba0_idx'),
+        ),
+    ]
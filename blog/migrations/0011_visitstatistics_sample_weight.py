@@ -0,0 +1,18 @@
+# Generated by Django 5.2.9 on 2026-10-16 23:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0010_visitstatistics_time_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='visitstatistics',
+            name='sample_weight',
+            field=models.PositiveIntegerField(default=1, verbose_name='采样权重'),
+        ),
+    ]
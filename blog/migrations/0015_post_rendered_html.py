@@ -0,0 +1,28 @@
+# Generated by Django 5.2.9 on 2026-10-16 23:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0014_related_posts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='content_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64, verbose_name='渲染指纹'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='content_html',
+            field=models.TextField(blank=True, editable=False, verbose_name='渲染后的HTML'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='content_toc',
+            field=models.TextField(blank=True, editable=False, verbose_name='目录HTML'),
+        ),
+    ]
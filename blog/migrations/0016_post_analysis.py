@@ -0,0 +1,43 @@
+# Generated by Django 5.2.9 on 2026-10-16 23:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0015_post_rendered_html'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='cjk_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='中日韩字符数'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='excerpt',
+            field=models.TextField(blank=True, editable=False, verbose_name='自动摘要'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='has_math',
+            field=models.BooleanField(default=False, editable=False, verbose_name='包含公式'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='outline',
+            field=models.JSONField(blank=True, default=list, editable=False, verbose_name='标题大纲'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='read_time',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='阅读时间（分钟）'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='word_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='单词数'),
+        ),
+    ]
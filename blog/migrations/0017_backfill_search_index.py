@@ -0,0 +1,25 @@
+# Generated by Django 5.2.9 on 2026-10-17 10:05
+
+from django.db import migrations
+
+
+def build_search_index(apps, schema_editor):
+    """
+    为已有的已发布文章建立检索索引（之后由保存/删除信号增量维护）
+    分词与后端选择都在 blog.search 中，这里直接调用 rebuild_index：按主键分批读取，
+    只读取 id、标题、摘要与正文，不依赖之后迁移新增的字段
+    """
+    from blog.search import rebuild_index
+
+    rebuild_index()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0016_post_analysis'),
+    ]
+
+    operations = [
+        migrations.RunPython(build_search_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.9 on 2026-10-17 10:20
+
+from django.db import migrations
+
+
+def build_related_posts(apps, schema_editor):
+    """
+    为已有文章计算相关文章（之后由保存与标签变更信号增量维护）
+    直接调用 blog.related_posts.rebuild：只读取 id、分类、创建时间与标签，在当前进程中计算
+    """
+    from blog.related_posts import rebuild
+
+    rebuild(workers=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0017_backfill_search_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(build_related_posts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.9 on 2026-10-17 10:35
+
+from django.db import migrations
+
+
+def render_existing_posts(apps, schema_editor):
+    """
+    为已有文章渲染 HTML 并计算派生属性（摘要、阅读时间等）
+    直接调用 blog.post_rendering.rerender：按主键顺序分批渲染，每批用一条 bulk_update 写回并单独提交，
+    中断后重新执行只会处理指纹不符的文章
+    """
+    from blog.post_rendering import rerender
+
+    rerender(workers=1, batch_size=100)
+
+
+class Migration(migrations.Migration):
+    # 文章多时不能放在一个事务里，每批单独提交
+    atomic = False
+
+    dependencies = [
+        ('blog', '0018_backfill_related_posts'),
+    ]
+
+    operations = [
+        migrations.RunPython(render_existing_posts, migrations.RunPython.noop),
+    ]
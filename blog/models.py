@@ -14,6 +14,7 @@ import os
 from django.core.files.storage import FileSystemStorage
 from django.core.files.base import ContentFile
 from django.conf import settings
+from .user_agents import BROWSER_CHOICES, OS_CHOICES, DEVICE_CHOICES
 
 
 class HashedFilenameStorage(FileSystemStorage):
@@ -125,6 +126,8 @@ class Post(models.Model):
         ('published', '已发布'),
         ('archived', '已归档'),
     )
+    # 列表页不需要的大字段，列表查询中延迟加载（预览使用 summary / excerpt）
+    LIST_DEFERRED_FIELDS = ('content', 'content_html', 'content_toc', 'outline')
 
     title = models.CharField('标题', max_length=200)
     content = models.TextField('内容')
@@ -139,11 +142,27 @@ class Post(models.Model):
     view_count = models.PositiveIntegerField('浏览数', default=0)
     created_at = models.DateTimeField('创建时间', default=timezone.now)
     updated_at = models.DateTimeField('更新时间', auto_now=True)
+    # 渲染缓存，由 blog.post_rendering 在保存时维护；content_hash 为内容与渲染器配置的指纹
+    content_html = models.TextField('渲染后的HTML', blank=True, editable=False)
+    content_toc = models.TextField('目录HTML', blank=True, editable=False)
+    content_hash = models.CharField('渲染指纹', max_length=64, blank=True, editable=False)
+    # 派生属性，由 blog.post_analysis 随渲染一起计算
+    word_count = models.PositiveIntegerField('单词数', default=0, editable=False)
+    cjk_count = models.PositiveIntegerField('中日韩字符数', default=0, editable=False)
+    read_time = models.PositiveIntegerField('阅读时间（分钟）', default=0, editable=False)
+    excerpt = models.TextField('自动摘要', blank=True, editable=False)
+    has_math = models.BooleanField('包含公式', default=False, editable=False)
+    outline = models.JSONField('标题大纲', default=list, blank=True, editable=False)
 
     class Meta:
         verbose_name = '文章'
         verbose_name_plural = '文章'
         ordering = ['-created_at']
+        indexes = [
+            # 列表页按 (created_at, id) 做键集分页
+            models.Index(fields=['status', '-created_at', '-id'], name='post_status_created_idx'),
+            models.Index(fields=['category', 'status', '-created_at', '-id'], name='post_category_created_idx'),
+        ]
 
     def __str__(self):
         return self.title
@@ -152,9 +171,13 @@ class Post(models.Model):
         return reverse('post_detail', args=[str(self.id)])
 
     def increment_view_count(self):
-        """增加浏览数"""
-        self.view_count += 1
-        self.save(update_fields=['view_count'])
+        """
+        增加浏览数
+        增量先原子累积，由 blog.view_counter 的后台线程批量写回数据库；
+        实例上的 view_count 会加上尚未写回的增量，便于直接展示
+        """
+        from .view_counter import increment
+        self.view_count += increment(self.pk)
 
     @property
     def short_content(self):
@@ -189,17 +212,186 @@ class VisitStatistics(models.Model):
     path = models.CharField('访问路径', max_length=500)
     method = models.CharField('请求方法', max_length=10)
     status_code = models.IntegerField('状态码')
-    visit_time = models.DateTimeField('访问时间', auto_now_add=True)
+    view_name = models.CharField('视图名称', max_length=100, blank=True)
+    response_time_ms = models.PositiveIntegerField('响应时间(毫秒)', null=True, blank=True)
+    # 写入时由 blog/user_agents.py 分类，统计时直接按编号分组
+    browser_family = models.PositiveSmallIntegerField('浏览器', choices=BROWSER_CHOICES, default=0, db_index=True)
+    os_family = models.PositiveSmallIntegerField('操作系统', choices=OS_CHOICES, default=0)
+    device_family = models.PositiveSmallIntegerField('设备类型', choices=DEVICE_CHOICES, default=0)
+    # 采样记录时一条记录代表的访问次数，统计时按权重还原
+    sample_weight = models.PositiveIntegerField('采样权重', default=1)
+    # 由写入管道在请求时填入，批量落库时不会被覆盖
+    visit_time = models.DateTimeField('访问时间', default=timezone.now)
 
     class Meta:
         verbose_name = '访问统计'
         verbose_name_plural = '访问统计'
         ordering = ['-visit_time']
+        indexes = [
+            models.Index(fields=['visit_time']),
+            models.Index(fields=['path', 'visit_time']),
+        ]
 
     def __str__(self):
         return f'{self.ip_address} - {self.path}'
 
 
+class VisitRollupBase(models.Model):
+    """访问统计汇总表基类，每行为某时间桶内某一维度取值的访问次数"""
+    DIMENSION_CHOICES = (
+        ('path', '访问路径'),
+        ('status', '状态码'),
+        ('browser', '浏览器'),
+        ('os', '操作系统'),
+        ('device', '设备类型'),
+    )
+
+    dimension = models.CharField('维度', max_length=20, choices=DIMENSION_CHOICES)
+    key = models.CharField('维度取值', max_length=500)
+    count = models.PositiveBigIntegerField('访问次数', default=0)
+
+    class Meta:
+        abstract = True
+
+
+class VisitHourlyRollup(VisitRollupBase):
+    """按小时汇总的访问统计"""
+    bucket = models.DateTimeField('小时')
+
+    class Meta:
+        verbose_name = '小时访问汇总'
+        verbose_name_plural = '小时访问汇总'
+        unique_together = ['bucket', 'dimension', 'key']
+        indexes = [
+            models.Index(fields=['dimension', 'bucket']),
+        ]
+
+    def __str__(self):
+        return f'{self.bucket:%Y-%m-%d %H}:00 {self.dimension}={self.key}: {self.count}'
+
+
+class VisitDailyRollup(VisitRollupBase):
+    """按天汇总的访问统计"""
+    bucket = models.DateField('日期')
+
+    class Meta:
+        verbose_name = '每日访问汇总'
+        verbose_name_plural = '每日访问汇总'
+        unique_together = ['bucket', 'dimension', 'key']
+        indexes = [
+            models.Index(fields=['dimension', 'bucket']),
+        ]
+
+    def __str__(self):
+        return f'{self.bucket} {self.dimension}={self.key}: {self.count}'
+
+
+class LatencyRollup(models.Model):
+    """按小时汇总的响应时间分位数草图（见 blog/sketches.py）"""
+    DIMENSION_CHOICES = (
+        ('path', '访问路径'),
+        ('view', '视图名称'),
+    )
+
+    bucket = models.DateTimeField('小时')
+    dimension = models.CharField('维度', max_length=20, choices=DIMENSION_CHOICES)
+    key = models.CharField('维度取值', max_length=500)
+    count = models.PositiveBigIntegerField('样本数', default=0)
+    sketch = models.BinaryField('分位数草图')
+
+    class Meta:
+        verbose_name = '响应时间汇总'
+        verbose_name_plural = '响应时间汇总'
+        unique_together = ['bucket', 'dimension', 'key']
+        indexes = [
+            models.Index(fields=['dimension', 'bucket']),
+        ]
+
+    def __str__(self):
+        return f'{self.bucket:%Y-%m-%d %H}:00 {self.dimension}={self.key}: {self.count}'
+
+
+class UniqueVisitorSketch(models.Model):
+    """每日独立访客 HyperLogLog 草图，path 为空表示全站"""
+    bucket = models.DateField('日期')
+    path = models.CharField('访问路径', max_length=500, blank=True)
+    sketch = models.BinaryField('HyperLogLog草图')
+
+    class Meta:
+        verbose_name = '独立访客草图'
+        verbose_name_plural = '独立访客草图'
+        unique_together = ['bucket', 'path']
+
+    def __str__(self):
+        return f'{self.bucket} {self.path or "全站"}'
+
+
+class RollupWatermark(models.Model):
+    """增量汇总任务的水位线，记录已处理到的最大原始记录ID"""
+    name = models.CharField('任务名', max_length=50, unique=True)
+    last_id = models.BigIntegerField('已处理最大ID', default=0)
+    updated_at = models.DateTimeField('更新时间', auto_now=True)
+
+    class Meta:
+        verbose_name = '汇总水位线'
+        verbose_name_plural = '汇总水位线'
+
+    def __str__(self):
+        return f'{self.name}: {self.last_id}'
+
+
+class SearchDocument(models.Model):
+    """
+    全文检索文档统计（纯 Python 检索后端使用）
+    length 为标题加权后的词项总数，用于 BM25 的文档长度归一化
+    """
+    post = models.OneToOneField(Post, on_delete=models.CASCADE, primary_key=True,
+                                related_name='search_document', verbose_name='文章')
+    length = models.PositiveIntegerField('词项数', default=0)
+
+    class Meta:
+        verbose_name = '检索文档'
+        verbose_name_plural = '检索文档'
+
+    def __str__(self):
+        return f'{self.post_id}: {self.length}'
+
+
+class SearchPosting(models.Model):
+    """全文检索倒排表（纯 Python 检索后端使用），tf 为标题加权后的词频"""
+    term = models.CharField('词项', max_length=64)
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='search_postings',
+                             verbose_name='文章')
+    tf = models.PositiveIntegerField('词频', default=0)
+
+    class Meta:
+        verbose_name = '检索倒排项'
+        verbose_name_plural = '检索倒排项'
+        unique_together = ['term', 'post']
+
+    def __str__(self):
+        return f'{self.term} -> {self.post_id}'
+
+
+class RelatedPost(models.Model):
+    """预先计算的相关文章（每篇文章保留得分最高的前 K 篇），由 blog.related_posts 维护"""
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='related_entries',
+                             verbose_name='文章')
+    related = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='+',
+                                verbose_name='相关文章')
+    score = models.FloatField('相似度')
+    rank = models.PositiveSmallIntegerField('排名')
+
+    class Meta:
+        verbose_name = '相关文章'
+        verbose_name_plural = '相关文章'
+        ordering = ['post', 'rank']
+        unique_together = ['post', 'rank']
+
+    def __str__(self):
+        return f'{self.post_id} -> {self.related_id} ({self.score:.3f})'
+
+
 class PrivateChatSession(models.Model):
     """私聊会话"""
     user1 = models.ForeignKey(User, on_delete=models.CASCADE,
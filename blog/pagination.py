@@ -0,0 +1,142 @@
+"""
+文章列表的键集（游标）分页
+按 (created_at, id) 降序翻页，游标记录上一页边界文章的这两个值，
+每页只执行一次 WHERE ... ORDER BY ... LIMIT 查询，不做 COUNT(*) 也不用 OFFSET，翻到多深代价都相同
+"""
+
+from datetime import datetime
+
+from django.core import signing
+from django.db.models import Q
+
+CURSOR_SALT = 'blog.pagination.cursor'
+
+DEFAULT_PER_PAGE = 10
+
+
+def encode_cursor(payload):
+    """把游标内容签名编码为不透明的 URL 安全字符串"""
+    return signing.dumps(payload, salt=CURSOR_SALT, compress=True)
+
+
+def decode_cursor(token):
+    """解码游标，空值或被篡改的游标返回 None（视为第一页）"""
+    if not token:
+        return None
+    try:
+        return signing.loads(token, salt=CURSOR_SALT)
+    except signing.BadSignature:
+        return None
+
+
+class CursorPage:
+    """一页结果，接口与模板中常用的 Paginator Page 属性保持一致"""
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+def _key_cursor(post, direction):
+    return encode_cursor({'t': post.created_at.isoformat(), 'id': post.pk, 'd': direction})
+
+
+def paginate(queryset, cursor=None, per_page=DEFAULT_PER_PAGE):
+    """
+    按 (created_at, id) 降序对查询集做键集分页
+    cursor 中 d='n' 表示取边界之后（更旧）的一页，d='p' 表示取边界之前（更新）的一页
+    """
+    payload = decode_cursor(cursor)
+    boundary = None
+    if payload and 't' in payload:
+        try:
+            boundary = (datetime.fromisoformat(payload['t']), int(payload['id']))
+        except (TypeError, ValueError):
+            boundary = None
+
+    if boundary is None:
+        rows = list(queryset.order_by('-created_at', '-id')[:per_page + 1])
+        has_more, rows = len(rows) > per_page, rows[:per_page]
+        return CursorPage(rows, next_cursor=_key_cursor(rows[-1], 'n') if has_more else None)
+
+    # (created_at, id) < (t, pk) 写成 created_at <= t AND (created_at < t OR id < pk)，
+    # 外层的范围条件可以直接在索引上定位，不必从头扫描
+    created_at, pk = boundary
+    if payload.get('d') == 'p':
+        # 向前翻页：升序取边界之后的记录，再反转回降序
+        rows = list(
+            queryset.filter(Q(created_at__gt=created_at) | Q(id__gt=pk), created_at__gte=created_at)
+            .order_by('created_at', 'id')[:per_page + 1]
+        )
+        has_more, rows = len(rows) > per_page, rows[:per_page]
+        rows.reverse()
+        if not rows:
+            return paginate(queryset, None, per_page)
+        return CursorPage(
+            rows,
+            next_cursor=_key_cursor(rows[-1], 'n'),
+            previous_cursor=_key_cursor(rows[0], 'p') if has_more else None,
+        )
+
+    rows = list(
+        queryset.filter(Q(created_at__lt=created_at) | Q(id__lt=pk), created_at__lte=created_at)
+        .order_by('-created_at', '-id')[:per_page + 1]
+    )
+    has_more, rows = len(rows) > per_page, rows[:per_page]
+    return CursorPage(
+        rows,
+        next_cursor=_key_cursor(rows[-1], 'n') if has_more else None,
+        previous_cursor=_key_cursor(rows[0], 'p') if rows else None,
+    )
+
+
+def paginate_ranked(queryset, post_ids, cursor=None, per_page=DEFAULT_PER_PAGE):
+    """
+    对已按相关度排好序的检索结果分页（结果数有上限，游标记录在结果中的偏移量）
+    queryset 只用于按本页的 ID 取出文章
+    """
+    payload = decode_cursor(cursor) or {}
+    try:
+        offset = max(0, int(payload.get('o', 0)))
+    except (TypeError, ValueError):
+        offset = 0
+
+    page_ids = post_ids[offset:offset + per_page]
+    posts = queryset.in_bulk(page_ids)
+    rows = [posts[pk] for pk in page_ids if pk in posts]
+    has_more = offset + per_page < len(post_ids)
+    return CursorPage(
+        rows,
+        next_cursor=encode_cursor({'o': offset + per_page}) if has_more else None,
+        previous_cursor=encode_cursor({'o': max(0, offset - per_page)}) if offset else None,
+    )
+
+
+def page_json(page, serialize):
+    """无限滚动接口使用的 JSON 结构"""
+    return {
+        'success': True,
+        'posts': [serialize(item) for item in page],
+        'next_cursor': page.next_cursor,
+        'previous_cursor': page.previous_cursor,
+        'has_next': page.has_next(),
+    }
@@ -0,0 +1,98 @@
+"""
+文章分析器
+文章渲染时（见 blog/post_rendering.py）计算派生属性并保存在 Post 字段上：字数、阅读时间、
+自动摘要、是否包含公式与标题大纲，列表页直接读取字段，不再逐篇处理正文。
+分析器是 analyzer(content, document, fields) -> {字段: 值} 形式的函数，按 settings.POST_ANALYSIS['ANALYZERS']
+的顺序执行，document 为 render_document() 的结果，fields 为前面的分析器已经得到的结果。
+分析器配置是渲染指纹的一部分，修改后用 rerender_posts 命令回填已有文章
+"""
+
+import hashlib
+import json
+import re
+from functools import lru_cache
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .text_utils import CJK, CJK_CHAR
+
+DEFAULT_CONFIG = {
+    'ANALYZERS': [
+        'blog.post_analysis.count_words',
+        'blog.post_analysis.read_time',
+        'blog.post_analysis.excerpt',
+        'blog.post_analysis.outline',
+    ],
+    'WORDS_PER_MINUTE': 200,  # 每个中日韩字符按一个词计
+}
+
+# 分析结果对应的 Post 字段及空内容时的取值
+FIELDS = {
+    'word_count': 0,
+    'cjk_count': 0,
+    'read_time': 0,
+    'excerpt': '',
+    'has_math': False,
+    'outline': [],
+}
+
+# 中日韩文字以外的单词（字母、数字连续片段）
+_WORD = re.compile(rf'(?:(?![{CJK}])[^\W_])+')
+
+
+def _config():
+    config = dict(DEFAULT_CONFIG)
+    config.update(getattr(settings, 'POST_ANALYSIS', {}))
+    return config
+
+
+@lru_cache(maxsize=1)
+def get_analyzers():
+    return [import_string(path) for path in _config()['ANALYZERS']]
+
+
+@lru_cache(maxsize=1)
+def signature():
+    """分析器配置的指纹，并入文章的渲染指纹"""
+    return hashlib.sha256(json.dumps(_config(), sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def analyze(content, document):
+    """依次执行分析器，返回 FIELDS 中全部字段的取值"""
+    fields = {name: (value.copy() if isinstance(value, list) else value) for name, value in FIELDS.items()}
+    if content:
+        for analyzer in get_analyzers():
+            fields.update(analyzer(content, document, fields))
+    return fields
+
+
+def count_text(text):
+    """返回 (单词数, 中日韩字符数)"""
+    return len(_WORD.findall(text)), len(CJK_CHAR.findall(text))
+
+
+def minutes_to_read(words, words_per_minute=None):
+    """阅读时间（分钟），最少 1 分钟"""
+    words_per_minute = words_per_minute or _config()['WORDS_PER_MINUTE']
+    return max(1, int(words / words_per_minute))
+
+
+# ---------- 内置分析器 ----------
+
+def count_words(content, document, fields):
+    words, cjk = count_text(content)
+    return {'word_count': words, 'cjk_count': cjk}
+
+
+def read_time(content, document, fields):
+    return {'read_time': minutes_to_read(fields['word_count'] + fields['cjk_count'])}
+
+
+def excerpt(content, document, fields):
+    # 摘要与公式检测由 Markdown 扩展在渲染时一并得到
+    return {'excerpt': document['summary'], 'has_math': document['has_math']}
+
+
+def outline(content, document, fields):
+    return {'outline': document['headings']}
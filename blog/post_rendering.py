@@ -0,0 +1,217 @@
+"""
+文章渲染缓存
+文章内容渲染后的 HTML 与目录保存在 Post.content_html / content_toc 中，并按内容指纹放入缓存；
+同一次渲染中由 blog.post_analysis 计算的派生属性（字数、阅读时间、摘要等）一并保存。
+指纹由内容、渲染器配置与分析器配置共同决定，任一变化后旧结果自动失效；
+文章保存时（pre_save）重新渲染，读取时指纹不符才现场渲染并写回；
+渲染或分析配置变更后可用 rerender() 批量并行重新渲染
+"""
+
+import hashlib
+import logging
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.cache import cache
+from django.db import connections
+from django.utils.safestring import mark_safe
+
+from . import post_analysis
+from .templatetags.markdown_extras import markdown_filter, render_document, renderer_signature
+
+logger = logging.getLogger(__name__)
+
+CACHE_PREFIX = 'post_render'
+CACHE_TIMEOUT = 60 * 60 * 24 * 7
+
+# 渲染时写到 Post 上的字段（不含 content_hash）
+RENDERED_FIELDS = ['content_html', 'content_toc', *post_analysis.FIELDS]
+
+
+def content_hash(content):
+    """内容 + 渲染器配置 + 分析器配置的指纹"""
+    digest = hashlib.sha256(renderer_signature().encode('ascii'))
+    digest.update(post_analysis.signature().encode('ascii'))
+    digest.update(content.encode('utf-8'))
+    return digest.hexdigest()
+
+
+def _cache_key(digest):
+    return f'{CACHE_PREFIX}_{digest}'
+
+
+def render_fields(content):
+    """渲染并分析，返回 RENDERED_FIELDS 各字段的取值；出错时直接抛出异常"""
+    document = render_document(content)
+    fields = {'content_html': document['html'], 'content_toc': document['toc']}
+    fields.update(post_analysis.analyze(content, document))
+    return fields
+
+
+def render(content, digest=None):
+    """
+    渲染并放入缓存，返回 (fields, ok)
+    渲染失败时 content_html 为过滤器的错误提示 HTML，ok 为 False，结果不缓存也不写库
+    """
+    digest = digest or content_hash(content)
+    cached = cache.get(_cache_key(digest))
+    if cached is not None:
+        return cached, True
+    try:
+        fields = render_fields(content)
+    except Exception as e:
+        logger.error(f"渲染文章内容失败: {e}")
+        return {'content_html': str(markdown_filter(content)), 'content_toc': ''}, False
+    cache.set(_cache_key(digest), fields, CACHE_TIMEOUT)
+    return fields, True
+
+
+def _apply(post, fields, digest):
+    for name, value in fields.items():
+        setattr(post, name, value)
+    post.content_hash = digest
+
+
+def prepare(post):
+    """保存前调用：内容或配置变化时重新渲染，结果写到实例字段上，随本次保存一起写库"""
+    if not post.content:
+        _apply(post, {'content_html': '', 'content_toc': '', **post_analysis.analyze('', None)}, '')
+        return
+    digest = content_hash(post.content)
+    if post.content_html and post.content_hash == digest:
+        return
+    fields, ok = render(post.content, digest)
+    if ok:
+        _apply(post, fields, digest)
+
+
+def get_rendered(post):
+    """
+    返回 (html, toc)，均已标记为安全
+    通常直接使用实例上的字段；指纹不符（例如渲染配置变更后）时从缓存取或现场渲染并写回数据库
+    """
+    if not post.content:
+        return mark_safe(''), mark_safe('')
+    digest = content_hash(post.content)
+    if post.content_html and post.content_hash == digest:
+        return mark_safe(post.content_html), mark_safe(post.content_toc)
+
+    fields, ok = render(post.content, digest)
+    if ok:
+        # 用 update 写回，不触发 auto_now 与保存信号
+        type(post).objects.filter(pk=post.pk, content=post.content)\
+            .update(**fields, content_hash=digest)
+        _apply(post, fields, digest)
+    return mark_safe(fields['content_html']), mark_safe(fields['content_toc'])
+
+
+# ---------- 批量重新渲染 ----------
+
+def iter_batches(start_after=0, force=False, batch_size=100):
+    """
+    按主键顺序流式读取文章，每扫描 batch_size 篇产出一次 (rows, last_id, scanned)
+    rows 为其中需要重新渲染的 [(id, content), ...]（force 时为全部）；
+    即使 rows 为空也会产出，便于调用方推进断点
+    """
+    from .models import Post
+
+    posts = Post.objects.filter(id__gt=start_after).order_by('id')\
+        .values_list('id', 'content', 'content_html', 'content_hash')
+    rows = []
+    scanned = 0
+    for pk, content, html, digest in posts.iterator(chunk_size=max(batch_size, 500)):
+        scanned += 1
+        if content and (force or not html or digest != content_hash(content)):
+            rows.append((pk, content))
+        if scanned % batch_size == 0:
+            yield rows, pk, scanned
+            rows = []
+    if scanned % batch_size:
+        yield rows, pk, scanned
+
+
+def render_batch(rows):
+    """
+    渲染一批文章，返回 [(id, fields, digest), ...]，渲染失败的文章跳过
+    在子进程中执行时不使用缓存（各进程的本地缓存互不共享），结果由主进程写库
+    """
+    results = []
+    for pk, content in rows:
+        try:
+            fields = render_fields(content)
+        except Exception as e:
+            logger.error(f"渲染文章 {pk} 失败: {e}")
+            continue
+        results.append((pk, fields, content_hash(content)))
+    return results
+
+
+def write_batch(results):
+    from .models import Post
+
+    if results:
+        Post.objects.bulk_update(
+            [Post(pk=pk, **fields, content_hash=digest) for pk, fields, digest in results],
+            [*RENDERED_FIELDS, 'content_hash'],
+        )
+
+
+def _init_worker():
+    # spawn 方式启动的子进程需要自行初始化 Django（fork 时为空操作）
+    import django
+    django.setup()
+
+
+def rerender(workers=1, batch_size=100, start_after=0, force=False, dry_run=False, progress=None):
+    """
+    重新渲染指纹不符（force 时为全部）的文章，返回统计 {'scanned', 'rendered', 'failed', 'last_id'}
+    workers 大于 1 时用进程池并行渲染；结果按提交顺序写回，last_id 之前的文章都已处理完，可作为断点。
+    每写回一批调用一次 progress(stats)
+    """
+    stats = {'scanned': 0, 'rendered': 0, 'failed': 0, 'last_id': start_after}
+
+    def finish(rows, results, last_id, scanned):
+        if not dry_run:
+            write_batch(results)
+        stats['scanned'] = scanned
+        stats['rendered'] += len(results)
+        stats['failed'] += len(rows) - len(results)
+        stats['last_id'] = last_id
+        if progress:
+            progress(stats)
+
+    batches = iter_batches(start_after, force, batch_size)
+    if dry_run:
+        for rows, last_id, scanned in batches:
+            finish(rows, [(pk,) for pk, _ in rows], last_id, scanned)
+        return stats
+
+    if workers <= 1:
+        for rows, last_id, scanned in batches:
+            finish(rows, render_batch(rows), last_id, scanned)
+        return stats
+
+    # 在读取数据库之前关闭连接并启动子进程，子进程不继承打开的连接
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+        executor.submit(int).result()
+        pending = deque()
+        for rows, last_id, scanned in batches:
+            pending.append((rows, executor.submit(render_batch, rows) if rows else None, last_id, scanned))
+            # 限制在途批次数，保持内存占用平稳
+            while len(pending) > workers * 2:
+                rows_done, future, *position = pending.popleft()
+                finish(rows_done, future.result() if future else [], *position)
+        while pending:
+            rows_done, future, *position = pending.popleft()
+            finish(rows_done, future.result() if future else [], *position)
+    return stats
+
+
+def warm(batch_size=200, force=False, progress=None):
+    """在当前进程中重新渲染指纹不符（force 时为全部）的文章，返回重新渲染的篇数"""
+    def report(stats):
+        if progress:
+            progress(stats['scanned'], stats['rendered'])
+
+    return rerender(workers=1, batch_size=batch_size, force=force, progress=report)['rendered']
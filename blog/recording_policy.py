@@ -0,0 +1,139 @@
+"""
+访问记录策略
+根据 settings.VISIT_RECORDING_POLICY 决定一次请求是否记录、以什么权重记录：
+路径包含/排除规则（前缀或正则，启动时编译一次）、按规则采样、爬虫识别、单IP限速
+"""
+
+import random
+import re
+import threading
+import time
+
+from django.conf import settings
+
+DEFAULT_POLICY = {
+    # 按顺序匹配，第一条命中的规则生效；未命中任何规则时使用 DEFAULT_SAMPLE_RATE
+    # 规则字段: prefix 或 regex 二选一；action 为 exclude 时不记录，否则按 sample_rate 采样
+    'RULES': [
+        {'prefix': '/admin/', 'action': 'exclude'},
+        {'prefix': '/static/', 'action': 'exclude'},
+        {'prefix': '/media/', 'action': 'exclude'},
+        {'prefix': '/api/', 'action': 'exclude'},
+        {'prefix': '/ws/', 'action': 'exclude'},
+    ],
+    'DEFAULT_SAMPLE_RATE': 1.0,
+    # 爬虫请求的采样率，0 表示不记录
+    'BOT_SAMPLE_RATE': 0.1,
+    # 单个IP在 IP_RATE_WINDOW 秒内最多记录的次数，0 表示不限制（每个进程单独计数）
+    'IP_RATE_LIMIT': 0,
+    'IP_RATE_WINDOW': 60,
+}
+
+BOT_DEVICE_FAMILY = 4
+
+
+def sample_weight_for(rate):
+    """
+    采样率换算为整数权重（每条记录代表的访问次数）
+    采样率按 1/N 取整，例如 0.3 视为 1/3
+    """
+    if rate >= 1:
+        return 1
+    return max(1, round(1 / rate))
+
+
+class PathRule:
+    """单条路径规则"""
+
+    def __init__(self, prefix=None, regex=None, action='record', sample_rate=1.0):
+        if (prefix is None) == (regex is None):
+            raise ValueError('访问记录规则必须且只能指定 prefix 或 regex 之一')
+        self.prefix = prefix
+        self.pattern = re.compile(regex) if regex is not None else None
+        self.exclude = action == 'exclude'
+        self.weight = None if self.exclude or sample_rate <= 0 else sample_weight_for(sample_rate)
+
+    def matches(self, path):
+        if self.prefix is not None:
+            return path.startswith(self.prefix)
+        return self.pattern.search(path) is not None
+
+
+class RecordingPolicy:
+    """
+    编译后的访问记录策略
+    weight_for() 返回 None 表示不记录，否则返回该记录的采样权重
+    """
+
+    def __init__(self, config):
+        self.rules = [PathRule(**rule) for rule in config['RULES']]
+        default_rate = config['DEFAULT_SAMPLE_RATE']
+        self.default_weight = sample_weight_for(default_rate) if default_rate > 0 else None
+        bot_rate = config['BOT_SAMPLE_RATE']
+        self.bot_weight = sample_weight_for(bot_rate) if bot_rate > 0 else None
+        self.ip_rate_limit = config['IP_RATE_LIMIT']
+        self.ip_rate_window = config['IP_RATE_WINDOW']
+
+        self._ip_lock = threading.Lock()
+        self._ip_window = 0
+        self._ip_counts = {}
+
+        # 运行指标
+        self.excluded = 0
+        self.sampled_out = 0
+        self.rate_limited = 0
+
+    def path_weight(self, path):
+        """仅按路径规则判断，返回权重或 None"""
+        for rule in self.rules:
+            if rule.matches(path):
+                return rule.weight
+        return self.default_weight
+
+    def weight_for(self, path, ip_address, device_family=0):
+        weight = self.path_weight(path)
+        if weight is None:
+            self.excluded += 1
+            return None
+
+        # 爬虫使用单独的采样率（取两者中更稀疏的一个）
+        if device_family == BOT_DEVICE_FAMILY:
+            if self.bot_weight is None:
+                self.excluded += 1
+                return None
+            weight = max(weight, self.bot_weight)
+
+        if weight > 1 and random.random() >= 1 / weight:
+            self.sampled_out += 1
+            return None
+
+        if self.ip_rate_limit and not self._allow_ip(ip_address):
+            self.rate_limited += 1
+            return None
+
+        return weight
+
+    def _allow_ip(self, ip_address):
+        """固定时间窗口计数，窗口切换时整体清空，内存只与当前窗口内的IP数有关"""
+        window = int(time.time() // self.ip_rate_window)
+        with self._ip_lock:
+            if window != self._ip_window:
+                self._ip_window = window
+                self._ip_counts = {}
+            count = self._ip_counts.get(ip_address, 0) + 1
+            self._ip_counts[ip_address] = count
+        return count <= self.ip_rate_limit
+
+    def stats(self):
+        return {
+            'excluded': self.excluded,
+            'sampled_out': self.sampled_out,
+            'rate_limited': self.rate_limited,
+        }
+
+
+def load_policy():
+    """读取 settings 并编译策略"""
+    config = dict(DEFAULT_POLICY)
+    config.update(getattr(settings, 'VISIT_RECORDING_POLICY', {}))
+    return RecordingPolicy(config)
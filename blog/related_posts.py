@@ -0,0 +1,375 @@
+"""
+相关文章
+为每篇已发布文章预先计算得分最高的前 K 篇相关文章并存入 RelatedPost，得分由三部分组成：
+按标签稀有度加权的 Jaccard 相似度、同分类加分、发布时间接近加分。
+文章或标签变更时增量更新受影响的列表（标签权重的变化留到下次全量重建时校正），
+rebuild() 可用进程池全量重建
+"""
+
+import logging
+import math
+import os
+from bisect import bisect_left
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from heapq import nlargest
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Count
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONFIG = {
+    'TOP_K': 5,                     # 每篇文章保存的相关文章数
+    'CATEGORY_WEIGHT': 0.2,         # 同分类加分
+    'RECENCY_WEIGHT': 0.1,          # 发布时间接近加分的上限
+    'RECENCY_HALF_LIFE_DAYS': 180,  # 发布时间相差该天数时，时间加分减半
+}
+
+SECONDS_PER_DAY = 86400
+
+# 进程间批量读写时单次 IN 查询的 ID 数
+ID_CHUNK = 500
+
+
+def get_config():
+    config = dict(DEFAULT_CONFIG)
+    config.update(getattr(settings, 'RELATED_POSTS', {}))
+    return config
+
+
+def _tag_weights(total_posts, tag_counts):
+    """标签权重：越稀有的标签越能说明两篇文章相关"""
+    return {tag: math.log(1 + total_posts / count) for tag, count in tag_counts.items() if count}
+
+
+class Corpus:
+    """
+    参与计算的文章集合（只包含 ID、标签、分类与时间戳，可整体 pickle 发送给子进程）
+    全量重建时包含全部已发布文章；增量更新时只包含一篇文章及其候选
+    """
+
+    def __init__(self, tag_weight):
+        self.tag_weight = tag_weight
+        self.tags = {}
+        self.category = {}
+        self.created = {}
+        self.tag_total = {}
+        self.by_tag = defaultdict(set)
+        self.by_category = defaultdict(list)
+
+    def add(self, post_id, category_id, created_ts, tag_ids):
+        tags = frozenset(tag_ids)
+        self.tags[post_id] = tags
+        self.category[post_id] = category_id
+        self.created[post_id] = created_ts
+        self.tag_total[post_id] = sum(self.tag_weight.get(tag, 0) for tag in tags)
+        for tag in tags:
+            self.by_tag[tag].add(post_id)
+        if category_id is not None:
+            self.by_category[category_id].append((created_ts, post_id))
+
+    def finalize(self):
+        for members in self.by_category.values():
+            members.sort()
+
+    def nearest_in_category(self, post_id, k):
+        """
+        同分类中发布时间最接近的 k 篇
+        只靠分类入选的候选得分随时间差单调递减，因此这 k 篇已包含其中最好的 k 个
+        """
+        members = self.by_category.get(self.category[post_id], [])
+        created = self.created[post_id]
+        index = bisect_left(members, (created, post_id))
+        window = members[max(0, index - k):index + k + 1]
+        nearest = sorted((abs(ts - created), pk) for ts, pk in window if pk != post_id)
+        return [pk for _, pk in nearest[:k]]
+
+    def score(self, a, b, config):
+        """两篇文章的相似度（对称）"""
+        score = 0.0
+        shared = self.tags[a] & self.tags[b]
+        if shared:
+            intersection = sum(self.tag_weight.get(tag, 0) for tag in shared)
+            union = self.tag_total[a] + self.tag_total[b] - intersection
+            if union > 0:
+                score = intersection / union
+        category = self.category[a]
+        if category is not None and category == self.category[b]:
+            score += config['CATEGORY_WEIGHT']
+        days = abs(self.created[a] - self.created[b]) / SECONDS_PER_DAY
+        score += config['RECENCY_WEIGHT'] * 0.5 ** (days / config['RECENCY_HALF_LIFE_DAYS'])
+        return score
+
+    def candidates(self, post_id, config):
+        """候选：至少有一个共同标签，或同分类中发布时间最接近的 K 篇"""
+        candidates = set()
+        for tag in self.tags[post_id]:
+            candidates |= self.by_tag[tag]
+        if self.category[post_id] is not None:
+            candidates.update(self.nearest_in_category(post_id, config['TOP_K']))
+        candidates.discard(post_id)
+        return candidates
+
+    def similar(self, post_id, config):
+        """得分最高的前 K 篇，返回 [(score, related_id), ...]，按得分降序"""
+        scored = [(self.score(post_id, other, config), other) for other in self.candidates(post_id, config)]
+        return nlargest(config['TOP_K'], scored)
+
+
+# ---------- 读取 ----------
+
+def _published():
+    from .models import Post
+    return Post.objects.filter(status='published')
+
+
+def _through():
+    from .models import Post
+    return Post.tags.through.objects
+
+
+def load_corpus():
+    """读取全部已发布文章"""
+    posts = _published()
+    published_tags = _through().filter(post__status='published')
+    tag_counts = dict(published_tags.values_list('tag_id').annotate(n=Count('post_id')).order_by())
+
+    tags = defaultdict(list)
+    for post_id, tag_id in published_tags.values_list('post_id', 'tag_id').iterator(chunk_size=10000):
+        tags[post_id].append(tag_id)
+
+    corpus = Corpus(_tag_weights(posts.count(), tag_counts))
+    for pk, category_id, created_at in posts.values_list('id', 'category_id', 'created_at')\
+            .iterator(chunk_size=10000):
+        corpus.add(pk, category_id, created_at.timestamp(), tags.get(pk, ()))
+    corpus.finalize()
+    return corpus
+
+
+def load_neighbourhood(post_id, config):
+    """
+    只读取一篇文章和它的候选：共同标签的文章，以及同分类中发布时间前后最近的各 K 篇
+    文章不存在或未发布时返回 None
+    """
+    posts = _published()
+    row = posts.filter(pk=post_id).values_list('id', 'category_id', 'created_at').first()
+    if row is None:
+        return None
+    _, category_id, created_at = row
+    own_tags = list(_through().filter(post_id=post_id).values_list('tag_id', flat=True))
+
+    rows = {row}
+    sharing = posts.filter(tags__in=own_tags)
+    if own_tags:
+        rows.update(sharing.values_list('id', 'category_id', 'created_at').distinct())
+    if category_id is not None:
+        same_category = posts.filter(category_id=category_id).exclude(pk=post_id)\
+            .values_list('id', 'category_id', 'created_at')
+        k = config['TOP_K']
+        rows.update(same_category.filter(created_at__lte=created_at).order_by('-created_at', '-id')[:k])
+        rows.update(same_category.filter(created_at__gte=created_at).order_by('created_at', 'id')[:k])
+
+    ids = [pk for pk, _, _ in rows]
+    tags = defaultdict(list)
+    for start in range(0, len(ids), ID_CHUNK):
+        for pk, tag_id in _through().filter(post_id__in=ids[start:start + ID_CHUNK])\
+                .values_list('post_id', 'tag_id'):
+            tags[pk].append(tag_id)
+
+    involved = {tag_id for tag_ids in tags.values() for tag_id in tag_ids}
+    tag_counts = dict(
+        _through().filter(post__status='published', tag_id__in=involved)
+        .values_list('tag_id').annotate(n=Count('post_id')).order_by()
+    )
+
+    corpus = Corpus(_tag_weights(posts.count(), tag_counts))
+    for pk, category, created in rows:
+        corpus.add(pk, category, created.timestamp(), tags.get(pk, ()))
+    corpus.finalize()
+    return corpus
+
+
+def _current_lists(post_ids):
+    """读取现有的相关文章列表，返回 {post_id: [(score, related_id), ...]}"""
+    from .models import RelatedPost
+
+    post_ids = list(post_ids)
+    lists = defaultdict(list)
+    for start in range(0, len(post_ids), ID_CHUNK):
+        for pk, related_id, score in RelatedPost.objects.filter(post_id__in=post_ids[start:start + ID_CHUNK])\
+                .order_by('post_id', 'rank').values_list('post_id', 'related_id', 'score'):
+            lists[pk].append((score, related_id))
+    return lists
+
+
+# ---------- 写入 ----------
+
+def _write_lists(lists):
+    """整体替换若干文章的相关文章列表，lists 为 {post_id: [(score, related_id), ...]}"""
+    from .models import RelatedPost
+
+    post_ids = list(lists)
+    entries = [
+        RelatedPost(post_id=post_id, related_id=related_id, score=score, rank=rank)
+        for post_id, similar in lists.items()
+        for rank, (score, related_id) in enumerate(similar, start=1)
+    ]
+    with transaction.atomic():
+        for start in range(0, len(post_ids), ID_CHUNK):
+            RelatedPost.objects.filter(post_id__in=post_ids[start:start + ID_CHUNK]).delete()
+        RelatedPost.objects.bulk_create(entries, batch_size=2000)
+
+
+def _recompute(post_ids, config):
+    """逐篇重新计算并写入（只更新这些文章自己的列表）"""
+    lists = {}
+    for post_id in post_ids:
+        corpus = load_neighbourhood(post_id, config)
+        lists[post_id] = corpus.similar(post_id, config) if corpus is not None else []
+    if lists:
+        _write_lists(lists)
+
+
+# ---------- 增量更新 ----------
+
+def refresh_post(post_id):
+    """
+    文章标签、分类、状态或时间变更后调用
+    重新计算该文章的列表；相似度是对称的，因此顺带把它插入/移出候选文章的列表，
+    只有它在某个列表中的得分下降或不再是候选时才整体重算那个列表
+    """
+    from .models import RelatedPost
+
+    config = get_config()
+    corpus = load_neighbourhood(post_id, config)
+    if corpus is None:
+        remove_post(post_id)
+        return
+
+    scores = {other: corpus.score(post_id, other, config) for other in corpus.candidates(post_id, config)}
+    referrers = set(RelatedPost.objects.filter(related_id=post_id).values_list('post_id', flat=True))
+    current = _current_lists(set(scores) | referrers)
+
+    changed = {post_id: nlargest(config['TOP_K'], [(score, other) for other, score in scores.items()])}
+    stale = set()
+    for other in set(scores) | referrers:
+        entries = current.get(other, [])
+        previous = next((score for score, related_id in entries if related_id == post_id), None)
+        new_score = scores.get(other)
+        if previous is not None and (new_score is None or new_score < previous):
+            # 得分下降后可能有列表外的候选排到它前面，重算该列表
+            stale.add(other)
+            continue
+        if new_score is None:
+            continue
+        others = [(score, related_id) for score, related_id in entries if related_id != post_id]
+        updated = nlargest(config['TOP_K'], others + [(new_score, post_id)])
+        if updated != entries:
+            changed[other] = updated
+
+    _write_lists(changed)
+    _recompute(stale, config)
+
+
+def remove_post(post_id, referrers=None):
+    """文章删除或取消发布：清空它的列表并重算引用了它的文章"""
+    from .models import RelatedPost
+
+    if referrers is None:
+        referrers = list(RelatedPost.objects.filter(related_id=post_id).values_list('post_id', flat=True))
+    RelatedPost.objects.filter(post_id=post_id).delete()
+    RelatedPost.objects.filter(related_id=post_id).delete()
+    _recompute([pk for pk in referrers if pk != post_id], get_config())
+
+
+def schedule_refresh(post_ids):
+    """事务提交后再更新，失败只记录日志，不影响文章保存"""
+    def run():
+        for post_id in post_ids:
+            try:
+                refresh_post(post_id)
+            except Exception as e:
+                logger.error(f"更新文章 {post_id} 的相关文章失败: {e}")
+    transaction.on_commit(run)
+
+
+def schedule_remove(post_id, referrers):
+    def run():
+        try:
+            remove_post(post_id, referrers)
+        except Exception as e:
+            logger.error(f"移除文章 {post_id} 的相关文章失败: {e}")
+    transaction.on_commit(run)
+
+
+# ---------- 全量重建 ----------
+
+_worker_corpus = None
+_worker_config = None
+
+
+def _init_worker(corpus, config):
+    global _worker_corpus, _worker_config
+    _worker_corpus = corpus
+    _worker_config = config
+
+
+def _compute_chunk(post_ids):
+    return {post_id: _worker_corpus.similar(post_id, _worker_config) for post_id in post_ids}
+
+
+def rebuild(workers=None, chunk_size=1000, progress=None):
+    """
+    全量重建，返回处理的文章数
+    语料只读取一次，随进程池初始化发送给每个子进程；子进程只做计算，结果回到主进程在一个事务中写入
+    """
+    from .models import RelatedPost
+
+    config = get_config()
+    corpus = load_corpus()
+    post_ids = sorted(corpus.tags)
+    chunks = [post_ids[start:start + chunk_size] for start in range(0, len(post_ids), chunk_size)]
+    workers = workers or os.cpu_count() or 1
+
+    executor = None
+    if workers > 1 and len(chunks) > 1:
+        # 子进程不使用数据库，fork 前关闭连接避免共享同一个连接
+        connections.close_all()
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                       initargs=(corpus, config))
+        results = executor.map(_compute_chunk, chunks)
+    else:
+        _init_worker(corpus, config)
+        results = map(_compute_chunk, chunks)
+
+    processed = 0
+    try:
+        with transaction.atomic():
+            RelatedPost.objects.all().delete()
+            for lists in results:
+                RelatedPost.objects.bulk_create([
+                    RelatedPost(post_id=post_id, related_id=related_id, score=score, rank=rank)
+                    for post_id, similar in lists.items()
+                    for rank, (score, related_id) in enumerate(similar, start=1)
+                ], batch_size=2000)
+                processed += len(lists)
+                if progress:
+                    progress(processed, len(post_ids))
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    return processed
+
+
+# ---------- 查询 ----------
+
+def get_related_posts(post, limit=3):
+    """读取预先计算的相关文章（只返回已发布的）"""
+    from .models import Post, RelatedPost
+
+    entries = RelatedPost.objects.filter(post_id=post.pk, related__status='published')\
+        .select_related('related').order_by('rank')\
+        .defer(*(f'related__{name}' for name in Post.LIST_DEFERRED_FIELDS))[:limit]
+    return [entry.related for entry in entries]
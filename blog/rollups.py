@@ -0,0 +1,426 @@
+"""
+访问统计汇总
+把原始 VisitStatistics 增量汇总到按小时/按天的汇总表，统计面板只读汇总表。
+水位线是已汇总的最大记录ID；多个进程并发批量写入时，ID 较小的记录可能晚于 ID 较大的记录提交，
+因此每次只汇总到 SETTLE_SECONDS 之前的记录为止，留给仍在事务中的记录提交的时间
+"""
+
+import logging
+import threading
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max, Sum
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+
+from .models import (
+    VisitStatistics, VisitHourlyRollup, VisitDailyRollup, LatencyRollup,
+    UniqueVisitorSketch, RollupWatermark,
+)
+from .sketches import LatencySketch, HyperLogLog
+from .user_agents import BROWSER_LABELS, OS_LABELS, DEVICE_LABELS
+
+logger = logging.getLogger(__name__)
+
+WATERMARK_NAME = 'visit_rollup'
+
+DEFAULT_CONFIG = {
+    # 只汇总访问时间早于此秒数的记录，须大于访问记录从发生到提交的最长延迟（见 VISIT_RECORDER）
+    'SETTLE_SECONDS': 5 * 60,
+    # 未汇总记录超过此数时，统计请求先补做一块汇总（汇总通常由定时任务 rollup_visits 执行）
+    'MAX_PENDING': 20000,
+    'CATCH_UP_CHUNK_SIZE': 10000,  # 请求内补做汇总的记录ID范围，其余留给定时任务
+    'CATCH_UP_INTERVAL': 60,       # 同一进程内两次检查的最短间隔（秒）
+}
+
+
+def get_config():
+    config = dict(DEFAULT_CONFIG)
+    config.update(getattr(settings, 'VISIT_ROLLUP', {}))
+    return config
+
+
+# 汇总维度 -> (原始记录字段, 取值转为汇总表 key 的函数)
+DIMENSION_FIELDS = {
+    'path': ('path', str),
+    'status': ('status_code', str),
+    'browser': ('browser_family', lambda value: BROWSER_LABELS.get(value, '其他')),
+    'os': ('os_family', lambda value: OS_LABELS.get(value, '其他')),
+    'device': ('device_family', lambda value: DEVICE_LABELS.get(value, '其他')),
+}
+
+
+# ---------- 增量汇总 ----------
+
+def _aggregate_range(start_id, end_id):
+    """
+    汇总 (start_id, end_id] 范围内的原始记录
+    返回 {(hour, dimension, key): count}
+    """
+    rows = VisitStatistics.objects.filter(id__gt=start_id, id__lte=end_id)\
+        .annotate(hour=TruncHour('visit_time'))
+
+    counts = defaultdict(int)
+    for dimension, (field, to_key) in DIMENSION_FIELDS.items():
+        # 按采样权重求和，还原被采样掉的访问量
+        for item in rows.values('hour', field).annotate(count=Sum('sample_weight')).order_by():
+            counts[(item['hour'], dimension, to_key(item[field]))] += item['count']
+    return counts
+
+
+def _hour_bucket(value):
+    """与 TruncHour 一致的本地时区整点"""
+    return timezone.localtime(value).replace(minute=0, second=0, microsecond=0)
+
+
+def _latency_sketches(visits, bucketed=True):
+    """
+    流式读取响应时间并写入草图，不排序原始数据
+    返回 {(hour, dimension, key): LatencySketch}，bucketed=False 时 hour 为 None
+    """
+    sketches = defaultdict(LatencySketch)
+    rows = visits.filter(response_time_ms__isnull=False)\
+        .values_list('visit_time', 'path', 'view_name', 'response_time_ms', 'sample_weight')
+    for visit_time, path, view_name, response_time_ms, weight in rows.iterator(chunk_size=2000):
+        hour = _hour_bucket(visit_time) if bucketed else None
+        sketches[(hour, 'path', path)].add(response_time_ms, weight)
+        if view_name:
+            sketches[(hour, 'view', view_name)].add(response_time_ms, weight)
+    return sketches
+
+
+def _merge_sketches(sketches):
+    """把新草图合并进 LatencyRollup"""
+    groups = defaultdict(dict)
+    for (bucket, dimension, key), sketch in sketches.items():
+        groups[(bucket, dimension)][key] = sketch
+
+    to_update, to_create = [], []
+    for (bucket, dimension), keyed in groups.items():
+        existing = {
+            row.key: row for row in LatencyRollup.objects.filter(
+                bucket=bucket, dimension=dimension, key__in=list(keyed)
+            )
+        }
+        for key, sketch in keyed.items():
+            if key in existing:
+                row = existing[key]
+                merged = LatencySketch.from_bytes(row.sketch).merge(sketch)
+                row.sketch = merged.to_bytes()
+                row.count = merged.count
+                to_update.append(row)
+            else:
+                to_create.append(LatencyRollup(
+                    bucket=bucket, dimension=dimension, key=key,
+                    count=sketch.count, sketch=sketch.to_bytes(),
+                ))
+
+    if to_update:
+        LatencyRollup.objects.bulk_update(to_update, ['sketch', 'count'], batch_size=500)
+    if to_create:
+        LatencyRollup.objects.bulk_create(to_create, batch_size=500)
+
+
+def _unique_sketches(visits, paths=True):
+    """
+    按天（以及按天+路径）把访客IP写入 HyperLogLog
+    返回 {(date, path): HyperLogLog}，path 为空表示全站
+    """
+    sketches = defaultdict(HyperLogLog)
+    rows = visits.values_list('visit_time', 'path', 'ip_address')
+    for visit_time, path, ip_address in rows.iterator(chunk_size=2000):
+        day = timezone.localtime(visit_time).date()
+        sketches[(day, '')].add(ip_address)
+        if paths:
+            sketches[(day, path)].add(ip_address)
+    return sketches
+
+
+def _merge_unique_visitors(sketches):
+    """把新草图合并进 UniqueVisitorSketch"""
+    groups = defaultdict(dict)
+    for (day, path), sketch in sketches.items():
+        groups[day][path] = sketch
+
+    to_update, to_create = [], []
+    for day, keyed in groups.items():
+        existing = {
+            row.path: row for row in UniqueVisitorSketch.objects.filter(
+                bucket=day, path__in=list(keyed)
+            )
+        }
+        for path, sketch in keyed.items():
+            if path in existing:
+                row = existing[path]
+                row.sketch = HyperLogLog.from_bytes(row.sketch).merge(sketch).to_bytes()
+                to_update.append(row)
+            else:
+                to_create.append(UniqueVisitorSketch(bucket=day, path=path, sketch=sketch.to_bytes()))
+
+    if to_update:
+        UniqueVisitorSketch.objects.bulk_update(to_update, ['sketch'], batch_size=500)
+    if to_create:
+        UniqueVisitorSketch.objects.bulk_create(to_create, batch_size=500)
+
+
+def _merge_counts(model, counts):
+    """把增量计数累加到汇总表：已有行原地相加，新行批量插入"""
+    groups = defaultdict(dict)
+    for (bucket, dimension, key), count in counts.items():
+        groups[(bucket, dimension)][key] = groups[(bucket, dimension)].get(key, 0) + count
+
+    to_update, to_create = [], []
+    for (bucket, dimension), keyed in groups.items():
+        existing = {
+            row.key: row for row in model.objects.filter(
+                bucket=bucket, dimension=dimension, key__in=list(keyed)
+            )
+        }
+        for key, count in keyed.items():
+            if key in existing:
+                row = existing[key]
+                row.count += count
+                to_update.append(row)
+            else:
+                to_create.append(model(bucket=bucket, dimension=dimension, key=key, count=count))
+
+    if to_update:
+        model.objects.bulk_update(to_update, ['count'], batch_size=500)
+    if to_create:
+        model.objects.bulk_create(to_create, batch_size=500)
+
+
+def _watermark():
+    return RollupWatermark.objects.filter(name=WATERMARK_NAME)\
+        .values_list('last_id', flat=True).first() or 0
+
+
+def run_rollup(chunk_size=10000, max_chunks=None):
+    """
+    处理水位线之后的新记录，每个分块在单独事务中写入汇总表并推进水位线
+    水位线只推进到 SETTLE_SECONDS 之前的最大记录ID，之后的记录留到下次汇总；
+    max_chunks 限制本次最多处理的分块数，不传则处理到最新
+    返回本次处理的原始记录条数
+    """
+    settled_before = timezone.now() - timedelta(seconds=get_config()['SETTLE_SECONDS'])
+    max_id = VisitStatistics.objects.filter(id__gt=_watermark(), visit_time__lt=settled_before)\
+        .aggregate(max_id=Max('id'))['max_id'] or 0
+    processed = 0
+    chunks = 0
+
+    while max_chunks is None or chunks < max_chunks:
+        chunks += 1
+        with transaction.atomic():
+            watermark, _ = RollupWatermark.objects.select_for_update()\
+                .get_or_create(name=WATERMARK_NAME)
+            start_id = watermark.last_id
+            if start_id >= max_id:
+                break
+            end_id = min(start_id + chunk_size, max_id)
+
+            hourly = _aggregate_range(start_id, end_id)
+            daily = defaultdict(int)
+            for (hour, dimension, key), count in hourly.items():
+                daily[(timezone.localtime(hour).date(), dimension, key)] += count
+
+            _merge_counts(VisitHourlyRollup, hourly)
+            _merge_counts(VisitDailyRollup, daily)
+            chunk = VisitStatistics.objects.filter(id__gt=start_id, id__lte=end_id)
+            _merge_sketches(_latency_sketches(chunk))
+            _merge_unique_visitors(_unique_sketches(chunk))
+
+            processed += chunk.count()
+            watermark.last_id = end_id
+            watermark.save(update_fields=['last_id', 'updated_at'])
+
+    return processed
+
+
+def reset_rollups():
+    """清空汇总表与水位线（用于全量重建）"""
+    with transaction.atomic():
+        VisitHourlyRollup.objects.all().delete()
+        VisitDailyRollup.objects.all().delete()
+        LatencyRollup.objects.all().delete()
+        UniqueVisitorSketch.objects.all().delete()
+        RollupWatermark.objects.filter(name=WATERMARK_NAME).delete()
+
+
+# ---------- 查询接口 ----------
+
+_last_catch_up = None
+_catch_up_lock = threading.Lock()
+
+
+def catch_up():
+    """
+    未汇总记录过多（定时任务未运行或落后）时补做一块汇总，由统计视图在每个请求开始时调用一次
+    按主键差值估算未汇总条数；只处理 CATCH_UP_CHUNK_SIZE 范围内的记录，请求耗时有上限，
+    积压的其余记录留给 rollup_visits；同一进程内最多每 CATCH_UP_INTERVAL 秒检查一次，并发请求不会重复执行
+    返回本次汇总的记录条数
+    """
+    global _last_catch_up
+    config = get_config()
+    now = time.monotonic()
+    if _last_catch_up is not None and now - _last_catch_up < config['CATCH_UP_INTERVAL']:
+        return 0
+    if not _catch_up_lock.acquire(blocking=False):
+        return 0
+    try:
+        _last_catch_up = now
+        max_id = VisitStatistics.objects.aggregate(max_id=Max('id'))['max_id'] or 0
+        pending = max_id - _watermark()
+        if pending <= config['MAX_PENDING']:
+            return 0
+        if pending > config['MAX_PENDING'] + config['CATCH_UP_CHUNK_SIZE']:
+            logger.warning(f"约有 {pending} 条访问记录未汇总，请检查 rollup_visits 定时任务")
+        return run_rollup(chunk_size=config['CATCH_UP_CHUNK_SIZE'], max_chunks=1)
+    finally:
+        _catch_up_lock.release()
+
+
+def _pending_visits():
+    """
+    尚未汇总的原始记录（水位线之后，按主键范围扫描）
+    汇总任务运行间隔内的数据由此补齐，保证面板数据实时
+    """
+    return VisitStatistics.objects.filter(id__gt=_watermark())
+
+
+def _pending_by_day(pending):
+    counts = defaultdict(int)
+    for item in pending.values('visit_time__date').annotate(count=Sum('sample_weight')).order_by():
+        counts[item['visit_time__date']] += item['count']
+    return counts
+
+
+def total_visits(start_date=None):
+    """start_date（含）以来的总访问量，不传则为全部"""
+    rollups = VisitDailyRollup.objects.filter(dimension='status')
+    pending = _pending_visits()
+    if start_date is not None:
+        rollups = rollups.filter(bucket__gte=start_date)
+        pending = pending.filter(visit_time__date__gte=start_date)
+    total = rollups.aggregate(total=Sum('count'))['total'] or 0
+    return total + (pending.aggregate(total=Sum('sample_weight'))['total'] or 0)
+
+
+def visits_by_day(start_date, end_date):
+    """[start_date, end_date] 内每天的访问量，按日期升序返回 [(date, count)]"""
+    counts = defaultdict(int)
+    rollups = VisitDailyRollup.objects.filter(
+        dimension='status', bucket__range=[start_date, end_date]
+    ).values('bucket').annotate(total=Sum('count')).order_by()
+    for item in rollups:
+        counts[item['bucket']] += item['total']
+
+    pending = _pending_visits().filter(visit_time__date__range=[start_date, end_date])
+    for day, count in _pending_by_day(pending).items():
+        counts[day] += count
+
+    return sorted(counts.items())
+
+
+def top_keys(dimension, limit=10, start_date=None):
+    """
+    某维度访问量最高的取值，返回 [{'key': ..., 'count': ...}]
+    dimension 为 path / status / browser / os / device
+    """
+    counts = defaultdict(int)
+    rollups = VisitDailyRollup.objects.filter(dimension=dimension)
+    pending = _pending_visits()
+    if start_date is not None:
+        rollups = rollups.filter(bucket__gte=start_date)
+        pending = pending.filter(visit_time__date__gte=start_date)
+
+    for item in rollups.values('key').annotate(total=Sum('count')).order_by('-total')[:limit * 2]:
+        counts[item['key']] += item['total']
+
+    field, to_key = DIMENSION_FIELDS[dimension]
+    for item in pending.values(field).annotate(count=Sum('sample_weight')).order_by():
+        counts[to_key(item[field])] += item['count']
+
+    ranked = sorted(counts.items(), key=lambda kv: kv[1], reverse=True)[:limit]
+    return [{'key': key, 'count': count} for key, count in ranked]
+
+
+def latency_report(dimension, since, limit=10):
+    """
+    since 以来各路径/视图的响应时间分位数（毫秒）
+    dimension 为 path / view，按样本数降序返回
+    [{'key', 'count', 'p50', 'p90', 'p99'}]
+    """
+    merged = defaultdict(LatencySketch)
+    rows = LatencyRollup.objects.filter(dimension=dimension, bucket__gte=_hour_bucket(since))\
+        .values_list('key', 'sketch')
+    for key, data in rows.iterator(chunk_size=500):
+        merged[key].merge(LatencySketch.from_bytes(data))
+
+    pending = _pending_visits().filter(visit_time__gte=since)
+    for (_, dim, key), sketch in _latency_sketches(pending, bucketed=False).items():
+        if dim == dimension:
+            merged[key].merge(sketch)
+
+    ranked = sorted(merged.items(), key=lambda kv: kv[1].count, reverse=True)[:limit]
+    report = []
+    for key, sketch in ranked:
+        report.append({
+            'key': key,
+            'count': sketch.count,
+            'p50': round(sketch.quantile(0.5), 1),
+            'p90': round(sketch.quantile(0.9), 1),
+            'p99': round(sketch.quantile(0.99), 1),
+        })
+    return report
+
+
+def _merged_unique_sketches(start_date=None, end_date=None, paths=('',)):
+    """合并日期范围内各路径的独立访客草图（含未汇总记录），返回 {path: HyperLogLog}"""
+    merged = defaultdict(HyperLogLog)
+    rows = UniqueVisitorSketch.objects.filter(path__in=list(paths))
+    pending = _pending_visits()
+    if start_date is not None:
+        rows = rows.filter(bucket__gte=start_date)
+        pending = pending.filter(visit_time__date__gte=start_date)
+    if end_date is not None:
+        rows = rows.filter(bucket__lte=end_date)
+        pending = pending.filter(visit_time__date__lte=end_date)
+
+    for path, data in rows.values_list('path', 'sketch').iterator(chunk_size=500):
+        merged[path].merge(HyperLogLog.from_bytes(data))
+
+    wanted = set(paths)
+    for (_, path), sketch in _unique_sketches(pending, paths=wanted != {''}).items():
+        if path in wanted:
+            merged[path].merge(sketch)
+    return merged
+
+
+def unique_visitors(start_date=None, end_date=None, path=''):
+    """日期范围内的独立访客数估算（按IP，HyperLogLog 误差约2%），path 为空表示全站"""
+    return _merged_unique_sketches(start_date, end_date, paths=(path,))[path].count()
+
+
+def unique_visitors_by_path(paths, start_date=None, end_date=None):
+    """多个路径的独立访客数估算，返回 {path: count}"""
+    merged = _merged_unique_sketches(start_date, end_date, paths=paths)
+    return {path: merged[path].count() for path in paths}
+
+
+def unique_visitors_by_day(start_date, end_date):
+    """[start_date, end_date] 内每天的全站独立访客数，返回 {date: count}"""
+    counts = {}
+    rows = UniqueVisitorSketch.objects.filter(path='', bucket__range=[start_date, end_date])
+    sketches = {day: HyperLogLog.from_bytes(data) for day, data in rows.values_list('bucket', 'sketch')}
+
+    pending = _pending_visits().filter(visit_time__date__range=[start_date, end_date])
+    for (day, _), sketch in _unique_sketches(pending, paths=False).items():
+        sketches.setdefault(day, HyperLogLog()).merge(sketch)
+
+    for day, sketch in sketches.items():
+        counts[day] = sketch.count()
+    return counts
@@ -0,0 +1,358 @@
+"""
+文章全文检索
+倒排索引由文章保存/删除信号同步维护，只收录已发布文章：
+SQLite 且支持 FTS5 时使用 blog_post_fts 虚拟表，否则使用 SearchPosting 倒排表并在 Python 中计算 BM25。
+中文、日文、韩文按单字 + 相邻双字切分（查询时使用双字），其余文字按单词切分
+"""
+
+import html
+import logging
+import math
+import re
+from collections import Counter, defaultdict
+from heapq import nlargest
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Avg
+from django.utils.safestring import mark_safe
+
+from .text_utils import CJK, CJK_CHAR
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONFIG = {
+    'BACKEND': 'auto',      # auto / fts5 / python
+    'MAX_RESULTS': 200,     # 单次检索最多返回的文章数
+    'TITLE_WEIGHT': 5,      # 标题词项相对正文的权重
+    'SNIPPET_LENGTH': 120,  # 摘要片段长度（字符）
+}
+
+FTS_TABLE = 'blog_post_fts'
+MAX_TERM_LENGTH = 64
+
+# BM25 参数
+K1 = 1.2
+B = 0.75
+
+_TOKEN = re.compile(rf'[{CJK}]+|(?:(?![{CJK}])[^\W_])+')
+
+# 生成摘要片段前去掉常见的 Markdown 标记
+_MARKUP = re.compile(r'```[^\n]*|!?\[([^\]]*)\]\([^)]*\)|^#{1,6}\s+|[*_~`>|]+', re.MULTILINE)
+_WHITESPACE = re.compile(r'\s+')
+
+
+def _config():
+    config = dict(DEFAULT_CONFIG)
+    config.update(getattr(settings, 'SEARCH_INDEX', {}))
+    return config
+
+
+# ---------- 分词 ----------
+
+def _is_cjk(run):
+    # _TOKEN 切出的片段要么全是中日韩文字，要么不含
+    return CJK_CHAR.match(run) is not None
+
+
+def tokenize(text, for_query=False):
+    """
+    切分文本为词项列表
+    建索引时中日韩文字同时产出单字与双字；查询时连续两个以上的字只用双字，单独一个字用单字
+    """
+    tokens = []
+    for match in _TOKEN.finditer(text.lower()):
+        run = match.group()
+        if not _is_cjk(run):
+            tokens.append(run[:MAX_TERM_LENGTH])
+            continue
+        bigrams = [run[i:i + 2] for i in range(len(run) - 1)]
+        if for_query:
+            tokens.extend(bigrams or [run])
+        else:
+            tokens.extend(run)
+            tokens.extend(bigrams)
+    return tokens
+
+
+def query_terms(query):
+    """查询词项（去重并保持顺序）"""
+    return list(dict.fromkeys(tokenize(query, for_query=True)))
+
+
+def _document_fields(post):
+    return post.title, f'{post.summary}\n{post.content}'
+
+
+# ---------- 后端 ----------
+
+class Fts5Backend:
+    """SQLite FTS5 后端，rowid 即文章ID，排序使用内置 bm25()"""
+
+    name = 'fts5'
+
+    def index(self, posts):
+        rows = []
+        for post in posts:
+            title, body = _document_fields(post)
+            rows.append((post.pk, ' '.join(tokenize(title)), ' '.join(tokenize(body))))
+        if not rows:
+            return
+        with connection.cursor() as cursor:
+            cursor.executemany(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [(row[0],) for row in rows])
+            cursor.executemany(f'INSERT INTO {FTS_TABLE}(rowid, title, body) VALUES (%s, %s, %s)', rows)
+
+    def remove(self, post_ids):
+        with connection.cursor() as cursor:
+            cursor.executemany(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [(pk,) for pk in post_ids])
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+
+    def optimize(self):
+        # 合并 FTS5 内部的多个 b-tree 段，批量写入后执行可加快检索
+        with connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')")
+
+    def search(self, terms, limit):
+        # 词项只含文字字符，加引号作为短语即可；空格分隔表示同时包含
+        expression = ' '.join(f'"{term}"' for term in terms)
+        title_weight = float(_config()['TITLE_WEIGHT'])
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+                f'ORDER BY bm25({FTS_TABLE}, %s, 1.0) LIMIT %s',
+                [expression, title_weight, limit],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+class PythonBackend:
+    """
+    纯 Python 后端
+    倒排表存放在 SearchPosting / SearchDocument 中，检索时只读取查询词项的倒排列表并计算 BM25
+    """
+
+    name = 'python'
+
+    def index(self, posts):
+        from .models import SearchDocument, SearchPosting
+
+        title_weight = _config()['TITLE_WEIGHT']
+        postings = []
+        documents = []
+        for post in posts:
+            title, body = _document_fields(post)
+            counts = Counter(tokenize(body))
+            for term, tf in Counter(tokenize(title)).items():
+                counts[term] += tf * title_weight
+            postings.extend(SearchPosting(term=term, post_id=post.pk, tf=tf) for term, tf in counts.items())
+            documents.append(SearchDocument(post_id=post.pk, length=sum(counts.values())))
+        if not documents:
+            return
+
+        post_ids = [document.post_id for document in documents]
+        with transaction.atomic():
+            SearchPosting.objects.filter(post_id__in=post_ids).delete()
+            SearchDocument.objects.filter(post_id__in=post_ids).delete()
+            SearchDocument.objects.bulk_create(documents)
+            SearchPosting.objects.bulk_create(postings, batch_size=2000)
+
+    def remove(self, post_ids):
+        from .models import SearchDocument, SearchPosting
+
+        with transaction.atomic():
+            SearchPosting.objects.filter(post_id__in=post_ids).delete()
+            SearchDocument.objects.filter(post_id__in=post_ids).delete()
+
+    def clear(self):
+        from .models import SearchDocument, SearchPosting
+
+        with transaction.atomic():
+            SearchPosting.objects.all().delete()
+            SearchDocument.objects.all().delete()
+
+    def optimize(self):
+        pass
+
+    def search(self, terms, limit):
+        from .models import SearchDocument, SearchPosting
+
+        postings = defaultdict(dict)
+        for term, post_id, tf in SearchPosting.objects.filter(term__in=terms)\
+                .values_list('term', 'post_id', 'tf').iterator(chunk_size=5000):
+            postings[term][post_id] = tf
+        if len(postings) < len(terms):
+            return []
+
+        # 与 FTS5 一致：要求包含全部词项
+        candidates = set.intersection(*(set(docs) for docs in postings.values()))
+        if not candidates:
+            return []
+
+        total = SearchDocument.objects.count()
+        avg_length = SearchDocument.objects.aggregate(avg=Avg('length'))['avg'] or 1
+        lengths = dict(
+            SearchDocument.objects.filter(post_id__in=candidates).values_list('post_id', 'length')
+        )
+
+        scores = defaultdict(float)
+        for docs in postings.values():
+            idf = math.log((total - len(docs) + 0.5) / (len(docs) + 0.5) + 1)
+            for post_id in candidates:
+                tf = docs[post_id]
+                norm = K1 * (1 - B + B * lengths.get(post_id, avg_length) / avg_length)
+                scores[post_id] += idf * tf * (K1 + 1) / (tf + norm)
+
+        return [post_id for post_id, _ in nlargest(limit, scores.items(), key=lambda item: item[1])]
+
+
+_fts_ready = False
+
+
+def _fts_available():
+    """FTS5 虚拟表是否已由迁移创建（只缓存肯定结果，迁移前后都能正确判断）"""
+    global _fts_ready
+    if _fts_ready:
+        return True
+    if connection.vendor != 'sqlite':
+        return False
+    _fts_ready = FTS_TABLE in connection.introspection.table_names()
+    return _fts_ready
+
+
+def get_backend():
+    backend = _config()['BACKEND']
+    if backend == 'fts5' or (backend == 'auto' and _fts_available()):
+        return Fts5Backend()
+    return PythonBackend()
+
+
+# ---------- 索引维护 ----------
+
+def index_post(post):
+    """同步单篇文章的索引：已发布则写入，否则移除"""
+    backend = get_backend()
+    if post.status == 'published':
+        backend.index([post])
+    else:
+        backend.remove([post.pk])
+
+
+def remove_post(post_id):
+    get_backend().remove([post_id])
+
+
+def rebuild_index(batch_size=500, progress=None):
+    """
+    清空并重建索引，返回收录的文章数
+    按主键分批读取已发布文章；整个过程在一个事务中完成，重建期间检索仍使用旧索引
+    """
+    from .models import Post
+
+    backend = get_backend()
+    posts = Post.objects.filter(status='published').only('id', 'title', 'summary', 'content').order_by('id')
+    indexed = 0
+    last_id = 0
+    with transaction.atomic():
+        backend.clear()
+        while True:
+            batch = list(posts.filter(id__gt=last_id)[:batch_size])
+            if not batch:
+                break
+            backend.index(batch)
+            indexed += len(batch)
+            last_id = batch[-1].pk
+            if progress:
+                progress(indexed)
+        backend.optimize()
+    return indexed
+
+
+# ---------- 检索 ----------
+
+def search_post_ids(query, limit=None):
+    """按相关度降序返回匹配的文章ID"""
+    terms = query_terms(query)
+    if not terms:
+        return []
+    if limit is None:
+        limit = _config()['MAX_RESULTS']
+    backend = get_backend()
+    try:
+        return backend.search(terms, limit)
+    except Exception as e:
+        logger.error(f"全文检索失败（{backend.name}）: {e}")
+        return []
+
+
+def filter_ranked(queryset, post_ids):
+    """按查询集的过滤条件筛选检索结果，保持相关度顺序"""
+    if not post_ids:
+        return []
+    allowed = set(queryset.filter(pk__in=post_ids).values_list('pk', flat=True))
+    return [pk for pk in post_ids if pk in allowed]
+
+
+def _highlight_terms(query):
+    """高亮用的词：原始单词/整段中日韩文字，以及其双字切分"""
+    terms = set()
+    for match in _TOKEN.finditer(query.lower()):
+        run = match.group()
+        terms.add(run)
+        if _is_cjk(run):
+            terms.update(run[i:i + 2] for i in range(len(run) - 1))
+    return terms
+
+
+def plain_text(text):
+    """去掉 Markdown 标记并压缩空白"""
+    text = _MARKUP.sub(lambda m: m.group(1) or ' ', text)
+    return _WHITESPACE.sub(' ', text).strip()
+
+
+def highlight(text, query, length=None):
+    """
+    截取包含查询词的片段，用 <mark> 标出所有命中位置，返回已转义的安全 HTML
+    """
+    if length is None:
+        length = _config()['SNIPPET_LENGTH']
+    text = plain_text(text)
+    lowered = text.lower()
+    if len(lowered) != len(text):
+        lowered = text
+
+    marked = [False] * len(text)
+    for term in _highlight_terms(query):
+        start = lowered.find(term)
+        while start != -1:
+            marked[start:start + len(term)] = [True] * len(term)
+            start = lowered.find(term, start + 1)
+
+    first = marked.index(True) if True in marked else 0
+    start = max(0, first - length // 3)
+    end = min(len(text), start + length)
+
+    parts = ['…'] if start > 0 else []
+    position = start
+    while position < end:
+        flag = marked[position]
+        stop = position
+        while stop < end and marked[stop] == flag:
+            stop += 1
+        segment = html.escape(text[position:stop])
+        parts.append(f'<mark>{segment}</mark>' if flag else segment)
+        position = stop
+    if end < len(text):
+        parts.append('…')
+    return mark_safe(''.join(parts))
+
+
+def attach_snippets(posts, query):
+    """为当前页的文章附加 search_snippet（高亮片段）"""
+    for post in posts:
+        # 摘要与正文分别去掉 Markdown 标记：正文开头的标题等标记只在行首才能识别
+        text = ' '.join(part for part in (plain_text(post.summary), plain_text(post.content)) if part)
+        post.search_snippet = highlight(text, query)
+    return posts
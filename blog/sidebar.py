@@ -0,0 +1,48 @@
+"""
+侧边栏数据
+分类/标签文章数与热门文章列表缓存在 Django 缓存中，
+文章、分类、标签变更时由 blog/signals.py 失效
+"""
+
+from django.core.cache import cache
+from django.db.models import Count
+
+from . import view_counter
+
+CACHE_KEY = 'sidebar_data'
+CACHE_TIMEOUT = 60 * 10
+POPULAR_LIMIT = 5
+
+
+def _build():
+    from .models import Post, Category, Tag
+
+    return {
+        'categories': list(Category.objects.annotate(post_count=Count('post'))),
+        'tags': list(Tag.objects.annotate(post_count=Count('post'))),
+        # 多取一些候选，读取时合并未写回的浏览增量后再排序截取
+        'popular_candidates': list(
+            Post.objects.filter(status='published')
+            .select_related('author', 'category')
+            .defer(*Post.LIST_DEFERRED_FIELDS)
+            .order_by('-view_count')[:POPULAR_LIMIT * 2]
+        ),
+    }
+
+
+def get_sidebar_data():
+    """返回 {'categories', 'tags', 'popular_posts'}"""
+    data = cache.get(CACHE_KEY)
+    if data is None:
+        data = _build()
+        cache.set(CACHE_KEY, data, CACHE_TIMEOUT)
+
+    return {
+        'categories': data['categories'],
+        'tags': data['tags'],
+        'popular_posts': view_counter.rank_posts(data['popular_candidates'], POPULAR_LIMIT),
+    }
+
+
+def invalidate_sidebar():
+    cache.delete(CACHE_KEY)
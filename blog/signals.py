@@ -0,0 +1,72 @@
+"""
+信号处理
+文章、分类、标签变更时失效相关缓存，文章保存/删除时同步渲染缓存、全文检索索引与相关文章
+"""
+
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from . import post_rendering, related_posts, search
+from .models import Post, Category, Tag, RelatedPost
+from .sidebar import invalidate_sidebar
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def invalidate_sidebar_on_change(sender, **kwargs):
+    invalidate_sidebar()
+
+
+@receiver(m2m_changed, sender=Post.tags.through)
+def invalidate_sidebar_on_tags_change(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        invalidate_sidebar()
+
+
+@receiver(pre_save, sender=Post)
+def render_post_content(sender, instance, raw=False, **kwargs):
+    if not raw:
+        post_rendering.prepare(instance)
+
+
+@receiver(post_save, sender=Post)
+def update_search_index(sender, instance, **kwargs):
+    search.index_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def remove_from_search_index(sender, instance, **kwargs):
+    search.remove_post(instance.pk)
+
+
+@receiver(post_save, sender=Post)
+def update_related_posts(sender, instance, **kwargs):
+    related_posts.schedule_refresh([instance.pk])
+
+
+@receiver(m2m_changed, sender=Post.tags.through)
+def update_related_posts_on_tags_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        related_posts.schedule_refresh([instance.pk])
+    elif pk_set:
+        # 从标签一侧修改时 pk_set 为文章ID
+        related_posts.schedule_refresh(sorted(pk_set))
+
+
+@receiver(pre_delete, sender=Post)
+def collect_related_referrers(sender, instance, **kwargs):
+    # 删除后引用它的相关文章记录会被级联删除，先记下需要重算的文章
+    instance._related_referrers = list(
+        RelatedPost.objects.filter(related_id=instance.pk).values_list('post_id', flat=True)
+    )
+
+
+@receiver(post_delete, sender=Post)
+def update_related_posts_on_delete(sender, instance, **kwargs):
+    related_posts.schedule_remove(instance.pk, getattr(instance, '_related_referrers', []))
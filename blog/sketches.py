@@ -0,0 +1,146 @@
+"""
+流式统计草图
+LatencySketch: 对数分桶的分位数草图（DDSketch 思路），可合并、可序列化，
+用于在不排序原始数据的情况下估算响应时间的 p50/p90/p99
+HyperLogLog: 基数估算草图，用于统计独立访客数，可跨天合并
+"""
+
+import hashlib
+import math
+import struct
+import zlib
+
+_HEADER = struct.Struct('<dQI')   # 相对误差, 零值计数, 桶数量
+_BUCKET = struct.Struct('<iI')    # 桶序号, 计数
+
+
+class LatencySketch:
+    """
+    分位数草图
+    每个正数值落入 ceil(log_gamma(v)) 号桶，估算值的相对误差不超过 relative_accuracy
+    """
+
+    def __init__(self, relative_accuracy=0.01):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.buckets = {}
+        self.zero_count = 0
+
+    @property
+    def count(self):
+        return self.zero_count + sum(self.buckets.values())
+
+    def add(self, value, count=1):
+        """加入一个观测值（负数按0处理）"""
+        if value <= 0:
+            self.zero_count += count
+            return
+        index = math.ceil(math.log(value) / self._log_gamma)
+        self.buckets[index] = self.buckets.get(index, 0) + count
+
+    def merge(self, other):
+        """合并另一个相同精度的草图"""
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError('无法合并精度不同的草图')
+        self.zero_count += other.zero_count
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        return self
+
+    def quantile(self, q):
+        """估算分位数 q（0~1），草图为空时返回 None"""
+        total = self.count
+        if total == 0:
+            return None
+        rank = q * (total - 1)
+        if rank < self.zero_count:
+            return 0.0
+        seen = self.zero_count
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen > rank:
+                return 2 * self.gamma ** index / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.buckets) / (self.gamma + 1)
+
+    # ---------- 序列化 ----------
+    def to_bytes(self):
+        parts = [_HEADER.pack(self.relative_accuracy, self.zero_count, len(self.buckets))]
+        parts.extend(_BUCKET.pack(index, count) for index, count in sorted(self.buckets.items()))
+        return b''.join(parts)
+
+    @classmethod
+    def from_bytes(cls, data):
+        data = bytes(data)
+        relative_accuracy, zero_count, size = _HEADER.unpack_from(data, 0)
+        sketch = cls(relative_accuracy)
+        sketch.zero_count = zero_count
+        offset = _HEADER.size
+        for _ in range(size):
+            index, count = _BUCKET.unpack_from(data, offset)
+            sketch.buckets[index] = count
+            offset += _BUCKET.size
+        return sketch
+
+
+class HyperLogLog:
+    """
+    HyperLogLog 基数估算
+    precision=12 时使用 4096 个寄存器，标准误差约 1.6%
+    """
+
+    def __init__(self, precision=12):
+        if not 4 <= precision <= 16:
+            raise ValueError('precision 取值范围为 4~16')
+        self.precision = precision
+        self.size = 1 << precision
+        self.registers = bytearray(self.size)
+
+    @staticmethod
+    def _hash(value):
+        digest = hashlib.blake2b(str(value).encode('utf-8'), digest_size=8).digest()
+        return int.from_bytes(digest, 'big')
+
+    def add(self, value):
+        """加入一个元素"""
+        x = self._hash(value)
+        index = x >> (64 - self.precision)
+        rest = x & ((1 << (64 - self.precision)) - 1)
+        # 剩余位中第一个1出现的位置
+        rank = (64 - self.precision) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other):
+        """合并另一个相同精度的草图（取寄存器最大值）"""
+        if other.precision != self.precision:
+            raise ValueError('无法合并精度不同的 HyperLogLog')
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def count(self):
+        """估算基数"""
+        m = self.size
+        if m >= 128:
+            alpha = 0.7213 / (1 + 1.079 / m)
+        else:
+            alpha = {16: 0.673, 32: 0.697, 64: 0.709}[m]
+        estimate = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+
+        # 小基数时使用线性计数修正
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+    # ---------- 序列化 ----------
+    def to_bytes(self):
+        """精度1字节 + zlib 压缩的寄存器（低基数时寄存器大多为0，压缩后很小）"""
+        return bytes([self.precision]) + zlib.compress(bytes(self.registers))
+
+    @classmethod
+    def from_bytes(cls, data):
+        data = bytes(data)
+        sketch = cls(data[0])
+        sketch.registers = bytearray(zlib.decompress(data[1:]))
+        return sketch
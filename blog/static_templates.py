@@ -0,0 +1,95 @@
+"""
+静态目录中的模板
+static_template_view 视图与 {% render_static_template %} 标签共用的编译缓存：
+按文件缓存编译好的 Template，文件的修改时间或大小变化后重新编译；按最近使用淘汰，最多缓存 size 个。
+启动时（BlogConfig.ready）预编译白名单 settings.ALLOWED_STATIC_TEMPLATES 中的模板
+"""
+
+import logging
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from django.conf import settings
+from django.template import Template
+
+logger = logging.getLogger(__name__)
+
+
+def template_dir():
+    return Path(getattr(settings, 'STATIC_TEMPLATE_DIR', Path(settings.BASE_DIR) / 'blog' / 'static'))
+
+
+def resolve(template_path):
+    """把相对路径解析为模板目录下的文件路径，越出模板目录时返回 None（防止目录遍历）"""
+    root = template_dir().resolve()
+    # 模板标签传入的是 SafeString，pathlib 无法直接拼接，先按普通字符串拼接
+    file_path = Path(os.path.join(root, template_path)).resolve()
+    try:
+        file_path.relative_to(root)
+    except ValueError:
+        return None
+    return file_path
+
+
+class TemplateCache:
+    """线程安全的编译模板 LRU 缓存（编译好的 Template 可在多个线程中同时渲染）"""
+
+    def __init__(self, size):
+        self.size = size
+        self._templates = OrderedDict()  # 文件路径 -> (mtime_ns, 大小, Template)
+        self._lock = threading.Lock()
+
+    def get(self, file_path):
+        """返回编译好的模板，文件不存在时抛出 FileNotFoundError"""
+        stat = file_path.stat()
+        version = (stat.st_mtime_ns, stat.st_size)
+        key = str(file_path)
+        with self._lock:
+            entry = self._templates.get(key)
+            if entry is not None and entry[:2] == version:
+                self._templates.move_to_end(key)
+                return entry[2]
+
+        # 编译在锁外进行，同一文件偶尔被并发编译两次也无妨
+        template = Template(file_path.read_text(encoding='utf-8'), origin=None, name=key)
+        with self._lock:
+            self._templates[key] = (*version, template)
+            self._templates.move_to_end(key)
+            while len(self._templates) > self.size:
+                self._templates.popitem(last=False)
+        return template
+
+    def clear(self):
+        with self._lock:
+            self._templates.clear()
+
+    def __len__(self):
+        return len(self._templates)
+
+
+template_cache = TemplateCache(getattr(settings, 'STATIC_TEMPLATE_CACHE_SIZE', 64))
+
+
+def get_template(template_path):
+    """按相对路径取编译好的模板，路径非法或文件不存在时返回 None"""
+    file_path = resolve(template_path)
+    if file_path is None:
+        return None
+    try:
+        return template_cache.get(file_path)
+    except (FileNotFoundError, IsADirectoryError, NotADirectoryError):
+        return None
+
+
+def warm_up():
+    """预编译白名单中的模板，返回编译成功的个数；单个模板出错只记录日志"""
+    compiled = 0
+    for template_path in getattr(settings, 'ALLOWED_STATIC_TEMPLATES', []):
+        try:
+            if get_template(template_path) is not None:
+                compiled += 1
+        except Exception as e:
+            logger.error(f"预编译静态模板 {template_path} 失败: {e}")
+    return compiled
@@ -1,10 +1,18 @@
 # blog/templatetags/markdown_extras.py
 
+import hashlib
+import json
+import queue
+import re
+from contextlib import contextmanager
+from functools import lru_cache
+
 import markdown
+import pygments
 from django import template
+from django.conf import settings
 from django.utils.safestring import mark_safe
 from django.template.defaultfilters import stringfilter
-import re
 from mdx_math import MathExtension
 
 register = template.Library()
@@ -17,6 +25,7 @@ EXTENSIONS = [
     'markdown.extensions.nl2br',  # 换行转<br>
     'markdown.extensions.sane_lists',  # 更智能的列表
     MathExtension(),  # LaTeX 支持
+    'blog.markdown_extensions',  # 表格/图片/公式样式类、公式检测与摘要
 ]
 
 EXTENSION_CONFIGS = {
@@ -33,9 +42,110 @@ EXTENSION_CONFIGS = {
         'title': '目录',
         'permalink': True,
         'baselevel': 2,
-    }
+    },
+    'blog.markdown_extensions': {
+        'summary_length': 200,
+    },
 }
 
+# 渲染结果缓存的版本号：修改扩展配置以外的渲染逻辑（如 blog.markdown_extensions）时加一，使已缓存的 HTML 失效
+RENDER_VERSION = 3
+
+# 源文本中的公式与需要从摘要中移除的 Markdown 语法，编译一次、各扫描一遍
+_MATH_SOURCE = re.compile(r'\$\$.+?\$\$|\$.+?\$|\\\(.+?\\\)|\\\[.+?\\\]', re.DOTALL)
+_SUMMARY_STRIP = re.compile(
+    r'```.*?```'  # 代码块
+    r'|\$\$.*?\$\$|(?-s:\$.*?\$)|\\\[.*?\\\]'  # 公式
+    r'|(?-s:!?\[.*?\]\(.*?\))'  # 图片、链接
+    r'|<[^>]+>',  # HTML 标签
+    re.DOTALL,
+)
+_SUMMARY_MARKUP = re.compile(r'#+ |[*_~`]')
+
+
+@lru_cache(maxsize=1)
+def renderer_signature():
+    """渲染器配置的指纹：扩展、扩展配置、依赖版本与 RENDER_VERSION"""
+    parts = [
+        str(RENDER_VERSION),
+        markdown.__version__,
+        pygments.__version__,
+        *(ext if isinstance(ext, str) else f'{type(ext).__module__}.{type(ext).__name__}' for ext in EXTENSIONS),
+        json.dumps(EXTENSION_CONFIGS, sort_keys=True, ensure_ascii=False),
+    ]
+    return hashlib.sha256('\n'.join(parts).encode('utf-8')).hexdigest()
+
+
+def build_renderer():
+    """按 EXTENSIONS / EXTENSION_CONFIGS 构建一个 Markdown 实例"""
+    return markdown.Markdown(
+        extensions=EXTENSIONS,
+        extension_configs=EXTENSION_CONFIGS,
+        output_format='html5'
+    )
+
+
+class RendererPool:
+    """
+    预先构建的 Markdown 渲染器池（线程安全）
+    构建实例要初始化全部扩展，开销远大于一次普通渲染；池中的实例用完 reset() 后归还复用。
+    池空时临时构建新实例，归还时池已满则丢弃，池的大小不会超过 size
+    """
+
+    def __init__(self, size):
+        self._renderers = queue.LifoQueue(maxsize=size)
+        for _ in range(size):
+            self._renderers.put_nowait(build_renderer())
+
+    @contextmanager
+    def renderer(self):
+        try:
+            md = self._renderers.get_nowait()
+        except queue.Empty:
+            md = build_renderer()
+        # 渲染出错的实例可能处于不一致的状态，不再归还
+        yield md
+        md.reset()
+        try:
+            self._renderers.put_nowait(md)
+        except queue.Full:
+            pass
+
+
+# 导入时构建一次，markdown 过滤器、render_markdown_file 与预览接口共用
+renderer_pool = RendererPool(getattr(settings, 'MARKDOWN_RENDERER_POOL_SIZE', 4))
+
+
+def _flatten_headings(tokens):
+    """把 toc 扩展的嵌套标题树展开为 [[level, id, name], ...]"""
+    headings = []
+    for token in tokens:
+        headings.append([token['level'], token['id'], token['name']])
+        headings.extend(_flatten_headings(token['children']))
+    return headings
+
+
+def render_document(value):
+    """
+    渲染 Markdown，返回 {'html', 'toc', 'headings', 'has_math', 'summary'}
+    has_math 与 summary 由 blog.markdown_extensions 在同一次遍历中产生；渲染出错时直接抛出异常
+    """
+    with renderer_pool.renderer() as md:
+        html = md.convert(value)
+        toc = md.toc if md.toc_tokens else ''
+        headings = _flatten_headings(md.toc_tokens)
+        meta = md.blog_meta
+    return {'html': html, 'toc': toc, 'headings': headings, **meta}
+
+
+def render_markdown(value):
+    """
+    渲染 Markdown，返回 (html, toc)
+    没有标题时 toc 为空字符串；渲染出错时直接抛出异常
+    """
+    document = render_document(value)
+    return document['html'], document['toc']
+
 
 @register.filter(name='markdown')
 @stringfilter
@@ -47,19 +157,7 @@ def markdown_filter(value):
         return ''
 
     try:
-        # 创建 Markdown 实例
-        md = markdown.Markdown(
-            extensions=EXTENSIONS,
-            extension_configs=EXTENSION_CONFIGS,
-            output_format='html5'
-        )
-
-        # 转换 Markdown 为 HTML
-        html = md.convert(value)
-
-        # 处理一些特殊情况
-        html = post_process_html(html)
-
+        html, _ = render_markdown(value)
         return mark_safe(html)
     except Exception as e:
         # 如果转换失败，返回原始文本
@@ -82,20 +180,9 @@ def markdown_summary_filter(value, length=200):
     if not value:
         return ''
 
-    # 移除 LaTeX 公式
-    text = re.sub(r'\$.*?\$', '', value)  # 行内公式
-    text = re.sub(r'\\\[.*?\\\]', '', text)  # 块级公式
-    text = re.sub(r'\$\$.*?\$\$', '', text)  # 块级公式
-
-    # 移除 Markdown 标签
-    text = re.sub(r'\[.*?\]\(.*?\)', '', text)  # 链接
-    text = re.sub(r'#+ ', '', text)  # 标题
-    text = re.sub(r'[*_~`]', '', text)  # 粗体、斜体等
-    text = re.sub(r'!\[.*?\]\(.*?\)', '', text)  # 图片
-    text = re.sub(r'```.*?```', '', text, flags=re.DOTALL)  # 代码块
-
-    # 移除 HTML 标签（如果有）
-    text = re.sub(r'<[^>]+>', '', text)
+    # 不渲染整篇文档，只在源文本上移除公式、代码块、链接、图片与标签；渲染时的摘要见 render_document
+    text = _SUMMARY_STRIP.sub('', value)
+    text = _SUMMARY_MARKUP.sub('', text)
 
     # 截断文本
     if len(text) > length:
@@ -113,50 +200,7 @@ def has_math_filter(value):
     if not value:
         return False
 
-    math_patterns = [
-        r'\$.*?\$',  # 行内公式
-        r'\\\(.*?\\\)',  # 行内公式
-        r'\$\$.*?\$\$',  # 块级公式
-        r'\\\[.*?\\\]',  # 块级公式
-    ]
-
-    for pattern in math_patterns:
-        if re.search(pattern, value, re.DOTALL):
-            return True
-
-    return False
-
-
-def post_process_html(html):
-    """
-    对生成的 HTML 进行后处理
-    """
-    if not html:
-        return html
-
-    # 添加表格的 Bootstrap 类
-    html = re.sub(r'<table>', '<table class="table table-bordered table-hover">', html)
-
-    # 为代码块添加行号
-    html = re.sub(
-        r'<div class="codehilite"><pre><span></span><code>',
-        '<div class="codehilite"><pre><code>',
-        html
-    )
-
-    # 为图片添加响应式类
-    html = re.sub(
-        r'<img src="([^"]+)" alt="([^"]*)"',
-        r'<img src="\1" alt="\2" class="img-fluid rounded"',
-        html
-    )
-
-    # 为数学公式添加样式类
-    html = html.replace('class="math"', 'class="math katex-render"')
-    html = html.replace('class="math inline"', 'class="math inline katex-render"')
-    html = html.replace('class="math display"', 'class="math display katex-render"')
-
-    return html
+    return bool(_MATH_SOURCE.search(value))
 
 
 @register.simple_tag
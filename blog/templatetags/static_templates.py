@@ -1,8 +1,6 @@
 from django import template
-from django.template.loader import get_template
-import os
-from pathlib import Path
-from django.conf import settings
+
+from ..static_templates import get_template
 
 register = template.Library()
 
@@ -10,23 +8,12 @@ register = template.Library()
 @register.simple_tag(takes_context=True)
 def render_static_template(context, template_path):
     """
-    渲染静态文件目录中的模板
+    渲染静态文件目录中的模板（编译结果与 static_template_view 共用缓存）
     用法: {% render_static_template 'pages/about.html' %}
     """
-    # 将静态文件路径转换为模板路径
-    static_dir = Path(settings.BASE_DIR) / 'myblog' / 'blog' / 'static'
-    full_path = static_dir / template_path
-
-    if full_path.exists():
-        # 读取文件内容
-        with open(full_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-
-        # 创建临时模板
-        template_obj = template.Template(content)
-
-        # 渲染模板
-        rendered = template_obj.render(context)
-        return rendered
+    template_obj = get_template(template_path)
+    if template_obj is None:
+        return f"<!-- Template not found: {template_path} -->"
 
-    return f"<!-- Template not found: {template_path} -->"
\ No newline at end of file
+    # 渲染模板
+    return template_obj.render(context)
@@ -0,0 +1,38 @@
+import tempfile
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from blog.models import RollupWatermark, VisitDailyRollup, VisitStatistics
+
+
+class ArchiveVisitsCommandTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        old = timezone.now() - timedelta(days=400)
+        VisitStatistics.objects.bulk_create(
+            VisitStatistics(ip_address='203.0.113.1', path='/', method='GET', status_code=200, visit_time=visit_time)
+            for visit_time in [old] * 5 + [timezone.now()] * 3
+        )
+
+    def call(self, **options):
+        out = StringIO()
+        with override_settings(VISIT_RETENTION={'DAYS': 90, 'ARCHIVE_DIR': self.directory}):
+            call_command('archive_visits', stdout=out, **options)
+        return out.getvalue()
+
+    def test_dry_run_writes_nothing(self):
+        self.assertIn('待归档记录: 5 条', self.call(dry_run=True))
+        self.assertFalse(RollupWatermark.objects.exists())
+        self.assertFalse(VisitDailyRollup.objects.exists())
+        self.assertEqual(VisitStatistics.objects.count(), 8)
+
+    def test_archive_rolls_up_then_deletes(self):
+        self.assertIn('成功归档 5 条', self.call())
+        self.assertEqual(VisitStatistics.objects.count(), 3)
+        self.assertTrue(VisitDailyRollup.objects.exists())
@@ -0,0 +1,147 @@
+import os
+import tempfile
+
+from django.test import SimpleTestCase, override_settings
+
+from blog import ip_location
+from blog.ip_location import IPRangeTable, ip_to_int, load, pack, parse_csv, write
+
+ROWS = [
+    (ip_to_int('1.0.1.0'), ip_to_int('1.0.3.255'), '福州'),
+    (ip_to_int('1.0.8.0'), ip_to_int('1.0.15.255'), '广州'),
+    (ip_to_int('1.0.16.0'), ip_to_int('1.0.16.0'), '东京'),
+    (ip_to_int('223.255.255.0'), 0xFFFFFFFF, '悉尼'),
+]
+
+
+class IPToIntTests(SimpleTestCase):
+    def test_ipv4(self):
+        self.assertEqual(ip_to_int('0.0.0.0'), 0)
+        self.assertEqual(ip_to_int(' 1.0.1.0 '), 0x01000100)
+        self.assertEqual(ip_to_int('255.255.255.255'), 0xFFFFFFFF)
+
+    def test_ipv4_mapped_ipv6(self):
+        self.assertEqual(ip_to_int('::ffff:1.0.1.0'), 0x01000100)
+
+    def test_unsupported_or_invalid(self):
+        for value in ('2001:db8::1', '::1', '', 'localhost', '1.0.1', '256.0.0.1', None):
+            self.assertIsNone(ip_to_int(value))
+
+
+class IPRangeTableTests(SimpleTestCase):
+    def setUp(self):
+        self.table = IPRangeTable(pack(ROWS))
+
+    def test_range_boundaries_are_inclusive(self):
+        self.assertEqual(self.table.lookup('1.0.1.0'), '福州')
+        self.assertEqual(self.table.lookup('1.0.2.128'), '福州')
+        self.assertEqual(self.table.lookup('1.0.3.255'), '福州')
+        self.assertEqual(self.table.lookup('1.0.8.0'), '广州')
+        self.assertEqual(self.table.lookup('1.0.15.255'), '广州')
+
+    def test_just_outside_ranges(self):
+        self.assertIsNone(self.table.lookup('1.0.0.255'))
+        self.assertIsNone(self.table.lookup('1.0.4.0'))
+        self.assertIsNone(self.table.lookup('1.0.7.255'))
+        self.assertIsNone(self.table.lookup('0.0.0.0'))
+
+    def test_single_address_range(self):
+        self.assertEqual(self.table.lookup('1.0.16.0'), '东京')
+        self.assertIsNone(self.table.lookup('1.0.16.1'))
+
+    def test_last_range_reaches_top_of_address_space(self):
+        self.assertEqual(self.table.lookup('255.255.255.255'), '悉尼')
+        self.assertIsNone(self.table.lookup('223.255.254.255'))
+
+    def test_ipv6_and_invalid_input(self):
+        self.assertEqual(self.table.lookup('::ffff:1.0.8.0'), '广州')
+        self.assertIsNone(self.table.lookup('2001:db8::1'))
+        self.assertIsNone(self.table.lookup('not-an-ip'))
+
+    def test_duplicate_cities_share_index(self):
+        table = IPRangeTable(pack([(1, 2, '北京'), (10, 20, '北京'), (5, 6, '上海')]))
+        self.assertEqual(table.cities, ['北京', '上海'])
+        self.assertEqual(len(table), 3)
+
+    def test_empty_table(self):
+        table = IPRangeTable(pack([]))
+        self.assertEqual(len(table), 0)
+        self.assertIsNone(table.lookup('1.0.1.0'))
+
+
+class PackTests(SimpleTestCase):
+    def test_rows_are_sorted(self):
+        table = IPRangeTable(pack(list(reversed(ROWS))))
+        self.assertEqual(table.lookup('1.0.1.0'), '福州')
+
+    def test_overlap_is_rejected(self):
+        with self.assertRaises(ValueError):
+            pack([(0, 10, '北京'), (10, 20, '上海')])
+        with self.assertRaises(ValueError):
+            pack([(0, 10, '北京'), (5, 6, '上海')])
+
+    def test_inverted_range_is_rejected(self):
+        with self.assertRaises(ValueError):
+            pack([(10, 5, '北京')])
+
+    def test_invalid_buffer(self):
+        with self.assertRaises(ValueError):
+            IPRangeTable(b'')
+        with self.assertRaises(ValueError):
+            IPRangeTable(b'NOTATABL' + bytes(8))
+        with self.assertRaises(ValueError):
+            IPRangeTable(pack(ROWS)[:20])
+
+
+class TableFileTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def write_csv(self, text):
+        path = os.path.join(self.directory, 'ip.csv')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        return path
+
+    def test_parse_csv(self):
+        path = self.write_csv(
+            'start,end,city\n'
+            '# 注释\n'
+            '\n'
+            '1.0.1.0,1.0.3.255,福州\n'
+            '16779264,16781311, 广州 \n'
+            '1.0.16.0,1.0.16.0,\n'
+        )
+        self.assertEqual(parse_csv(path), [
+            (0x01000100, 0x010003FF, '福州'),
+            (0x01000800, 0x01000FFF, '广州'),
+        ])
+
+    def test_parse_csv_reports_bad_line(self):
+        path = self.write_csv('1.0.1.0,1.0.3.255,福州\n1.0.8.0,4294967296,广州\n')
+        with self.assertRaisesMessage(ValueError, '第 2 行'):
+            parse_csv(path)
+
+    def test_binary_and_csv_files_give_same_lookups(self):
+        binary_path = os.path.join(self.directory, 'ip.bin')
+        self.assertEqual(write(ROWS, binary_path), (4, 4))
+        csv_path = self.write_csv(''.join(f'{start},{end},{city}\n' for start, end, city in ROWS))
+
+        binary, text = load(binary_path), load(csv_path)
+        self.addCleanup(binary._buffer.close)
+        for ip in ('1.0.1.0', '1.0.3.255', '1.0.4.0', '1.0.16.0', '255.255.255.255', '::1'):
+            self.assertEqual(binary.lookup(ip), text.lookup(ip))
+        self.assertEqual(binary.lookup('1.0.15.255'), '广州')
+
+    def test_lookup_city_uses_configured_table(self):
+        path = os.path.join(self.directory, 'ip.bin')
+        write(ROWS, path)
+        with override_settings(IP_LOCATION={'PATH': path}):
+            with self.assertLogs('blog.ip_location', 'INFO'):
+                ip_location.reload()
+            self.addCleanup(ip_location.reload)
+            self.assertTrue(ip_location.enabled())
+            self.assertEqual(ip_location.lookup_city('1.0.8.1'), '广州')
+            self.assertIsNone(ip_location.lookup_city('8.8.8.8'))
@@ -0,0 +1,121 @@
+import re
+
+from django.core.cache import cache
+from django.test import SimpleTestCase
+
+from blog.markdown_blocks import assign_heading_ids, document_blocks, render_blocks, split_blocks
+from blog.templatetags.markdown_extras import render_markdown
+
+
+class SplitBlocksTests(SimpleTestCase):
+    def test_blank_lines_separate_blocks(self):
+        self.assertEqual(split_blocks('# 标题\n\n第一段\n续行\n\n\n第二段'),
+                         ['# 标题', '第一段\n续行', '第二段'])
+
+    def test_fenced_code_keeps_blank_lines(self):
+        text = '```python\na = 1\n\nb = 2\n```\n\n段落'
+        self.assertEqual(split_blocks(text), ['```python\na = 1\n\nb = 2\n```', '段落'])
+
+    def test_math_block_keeps_blank_lines(self):
+        self.assertEqual(split_blocks('$$\na\n\nb\n$$\n\n段落'), ['$$\na\n\nb\n$$', '段落'])
+
+    def test_html_block_with_blank_line_stays_whole(self):
+        text = '<div class="note">\n\n**不是 Markdown**\n\n</div>\n\n段落'
+        self.assertEqual(split_blocks(text), ['<div class="note">\n\n**不是 Markdown**\n\n</div>', '段落'])
+
+    def test_nested_html_block(self):
+        text = '<div>\n<div>\n\n内层\n</div>\n\n外层\n</div>\n\n段落'
+        self.assertEqual(split_blocks(text), ['<div>\n<div>\n\n内层\n</div>\n\n外层\n</div>', '段落'])
+
+    def test_single_line_html_and_void_tags(self):
+        self.assertEqual(split_blocks('<div>一行</div>\n\n<hr>\n\n段落'), ['<div>一行</div>', '<hr>', '段落'])
+
+    def test_inline_tag_does_not_start_html_block(self):
+        self.assertEqual(split_blocks('<span>\n\n段落'), ['<span>', '段落'])
+
+    def test_unclosed_html_block(self):
+        self.assertIsNone(split_blocks('<div>\n\n段落'))
+        self.assertIsNone(split_blocks('<!-- 注释\n\n段落'))
+
+    def test_multiline_comment(self):
+        self.assertEqual(split_blocks('<!-- 注释\n\n仍是注释 -->\n\n段落'),
+                         ['<!-- 注释\n\n仍是注释 -->', '段落'])
+
+    def test_blockquote_paragraphs_are_merged(self):
+        text = '> 第一段\n\n> 第二段\n\n段落'
+        self.assertEqual(split_blocks(text), ['> 第一段\n\n> 第二段', '段落'])
+
+    def test_list_items_are_merged(self):
+        text = '- 一\n\n- 二\n\n    续行\n\n段落'
+        self.assertEqual(split_blocks(text), ['- 一\n\n- 二\n\n    续行', '段落'])
+
+    def test_whole_document_fallback(self):
+        text = '正文[^1]\n\n[^1]: 脚注'
+        self.assertEqual([block for _, block, _ in document_blocks(text)], [text])
+
+    def test_definitions_become_context(self):
+        blocks = document_blocks('[链接][a]\n\n[a]: https://example.com')
+        self.assertEqual([(block, context) for _, block, context in blocks],
+                         [('[链接][a]', '[a]: https://example.com')])
+
+
+class AssignHeadingIdsTests(SimpleTestCase):
+    def test_duplicate_headings_across_blocks(self):
+        id_maps = assign_heading_ids([
+            [[2, 'intro', 'Intro']],
+            [[2, 'intro', 'Intro']],
+            [[2, 'intro', 'Intro'], [3, 'intro_1', 'Intro']],
+        ])
+        self.assertEqual(id_maps, [{}, {'intro': 'intro_1'}, {'intro': 'intro_2', 'intro_1': 'intro_3'}])
+
+    def test_explicit_ids_are_reserved_first(self):
+        id_maps = assign_heading_ids([
+            [[2, 'setup', 'Setup']],
+            [[2, 'setup', 'Install']],
+        ])
+        # 显式 id 保持不变，自动生成的 id 让开
+        self.assertEqual(id_maps, [{'setup': 'setup_1'}, {}])
+
+
+def normalize(html):
+    """整篇渲染时原始 HTML 块之后多一个空行，不影响 DOM，比较前统一标签之间的换行"""
+    return re.sub(r'>\n+<', '>\n<', html)
+
+
+class RenderBlocksTests(SimpleTestCase):
+    DOCUMENTS = [
+        '# 标题\n\n段落\n\n## 标题\n\n### 标题',
+        '## 安装\n\n正文\n\n## 安装\n\n<div>\n\n## 不是标题\n\n</div>\n\n## 安装',
+        '## Setup {#setup}\n\n## Setup\n\n> 引用\n\n> 续段\n\n```\ncode\n\nmore\n```',
+        '[链接][a] 与 *[HTML] 缩写\n\n[a]: https://example.com\n*[HTML]: HyperText',
+    ]
+
+    def setUp(self):
+        cache.clear()
+
+    def test_joined_blocks_match_full_render(self):
+        for text in self.DOCUMENTS:
+            with self.subTest(text=text):
+                html = '\n'.join(entry['html'] for entry in render_blocks(text))
+                self.assertEqual(normalize(html), normalize(render_markdown(text)[0]))
+
+    def test_cached_blocks_give_same_result(self):
+        text = self.DOCUMENTS[1]
+        self.assertEqual(render_blocks(text), render_blocks(text))
+
+    def test_known_blocks_skip_html(self):
+        text = '## 安装\n\n正文'
+        first = render_blocks(text)
+        second = render_blocks(text + '\n\n## 安装', known=[first[0]['id'], first[1]['id']])
+        self.assertEqual([entry['id'] for entry in second[:2]], [entry['id'] for entry in first])
+        self.assertEqual([('html' in entry) for entry in second], [False, False, True])
+        # 中文标题生成的 id 为 _1、_2 ...，新块中的同名标题排在第二
+        self.assertIn('id="_2"', second[2]['html'])
+
+    def test_heading_id_change_changes_block_id(self):
+        first = render_blocks('## 安装')
+        second = render_blocks('## 安装\n\n## 安装')
+        third = render_blocks('正文\n\n## 安装')
+        self.assertEqual(second[0]['id'], first[0]['id'])
+        self.assertNotEqual(second[1]['id'], first[0]['id'])
+        self.assertEqual(third[1]['id'], first[0]['id'])
@@ -0,0 +1,107 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core import signing
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from blog.models import Post
+from blog.pagination import decode_cursor, encode_cursor, paginate, paginate_ranked
+
+
+class CursorTokenTests(SimpleTestCase):
+    def test_round_trip(self):
+        payload = {'t': '2026-01-01T00:00:00+00:00', 'id': 42, 'd': 'n'}
+        token = encode_cursor(payload)
+        self.assertNotIn('2026', token)
+        self.assertEqual(decode_cursor(token), payload)
+
+    def test_tampered_token_is_rejected(self):
+        token = encode_cursor({'o': 10})
+        value, signature = token.rsplit(':', 1)
+        forged = signing.dumps({'o': 1000}, compress=True).rsplit(':', 1)[0]
+        self.assertIsNone(decode_cursor(f'{forged}:{signature}'))
+        self.assertIsNone(decode_cursor(value + ':' + signature[::-1]))
+
+    def test_token_signed_with_other_salt_is_rejected(self):
+        self.assertIsNone(decode_cursor(signing.dumps({'o': 10}, salt='other', compress=True)))
+        self.assertIsNone(decode_cursor(signing.dumps({'o': 10})))
+
+    def test_empty_or_garbage(self):
+        for token in (None, '', 'abc', 'abc:def', '::'):
+            self.assertIsNone(decode_cursor(token))
+
+
+class PaginateTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user('author')
+        base = timezone.now()
+        # 每三篇文章共用一个创建时间，验证同一时间的文章按 id 分页时不重不漏
+        Post.objects.bulk_create(
+            Post(title=f'文章 {i}', content='内容', author=author, status='published',
+                 created_at=base - timedelta(minutes=i // 3))
+            for i in range(25)
+        )
+        cls.expected = list(Post.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+
+    def ids(self, page):
+        return [post.pk for post in page]
+
+    def test_walk_forward_and_back(self):
+        queryset = Post.objects.all()
+        pages = [paginate(queryset, None, 10)]
+        self.assertFalse(pages[0].has_previous())
+        while pages[-1].has_next():
+            pages.append(paginate(queryset, pages[-1].next_cursor, 10))
+
+        self.assertEqual([len(page) for page in pages], [10, 10, 5])
+        self.assertEqual(sum((self.ids(page) for page in pages), []), self.expected)
+
+        # 从最后一页逐页向前翻，回到与正向相同的页
+        page = pages[-1]
+        for expected_page in reversed(pages[:-1]):
+            page = paginate(queryset, page.previous_cursor, 10)
+            self.assertEqual(self.ids(page), self.ids(expected_page))
+        self.assertFalse(page.has_previous())
+
+    def test_cursor_is_stable_when_new_posts_arrive(self):
+        queryset = Post.objects.all()
+        first = paginate(queryset, None, 10)
+        Post.objects.create(title='新文章', content='内容', author=User.objects.get(), status='published')
+        second = paginate(queryset, first.next_cursor, 10)
+        self.assertEqual(self.ids(second), self.expected[10:20])
+
+    def test_malformed_boundary_returns_first_page(self):
+        for payload in ({'t': 'not-a-date', 'id': 1, 'd': 'n'}, {'t': '2026-01-01T00:00:00', 'id': 'x'}):
+            page = paginate(Post.objects.all(), encode_cursor(payload), 10)
+            self.assertEqual(self.ids(page), self.expected[:10])
+
+    def test_previous_past_the_start_returns_first_page(self):
+        newest = Post.objects.get(pk=self.expected[0])
+        cursor = encode_cursor({'t': newest.created_at.isoformat(), 'id': newest.pk, 'd': 'p'})
+        self.assertEqual(self.ids(paginate(Post.objects.all(), cursor, 10)), self.expected[:10])
+
+
+class PaginateRankedTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user('author')
+        Post.objects.bulk_create(Post(title=f'文章 {i}', content='内容', author=author) for i in range(7))
+        cls.ranked = list(Post.objects.order_by('?').values_list('id', flat=True))
+
+    def test_pages_follow_ranking(self):
+        first = paginate_ranked(Post.objects.all(), self.ranked, None, 3)
+        second = paginate_ranked(Post.objects.all(), self.ranked, first.next_cursor, 3)
+        last = paginate_ranked(Post.objects.all(), self.ranked, second.next_cursor, 3)
+        self.assertEqual([post.pk for post in first], self.ranked[:3])
+        self.assertEqual([post.pk for post in second], self.ranked[3:6])
+        self.assertEqual([post.pk for post in last], self.ranked[6:])
+        self.assertFalse(last.has_next())
+        self.assertEqual(decode_cursor(last.previous_cursor), {'o': 3})
+
+    def test_negative_or_invalid_offset_is_clamped(self):
+        for offset in (-5, 'x'):
+            page = paginate_ranked(Post.objects.all(), self.ranked, encode_cursor({'o': offset}), 3)
+            self.assertEqual([post.pk for post in page], self.ranked[:3])
+            self.assertFalse(page.has_previous())
@@ -0,0 +1,26 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+
+from blog.models import Post
+
+
+class PostDetailTocTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('author')
+
+    def get(self, content):
+        post = Post.objects.create(title='文章', content=content, author=self.author, status='published')
+        response = self.client.get(reverse('post_detail', args=[post.pk]))
+        self.assertEqual(response.status_code, 200)
+        return response.content.decode()
+
+    def test_no_toc_without_marker(self):
+        html = self.get('# 第一节\n\n正文\n\n## 小节')
+        self.assertIn('id="_1"', html)
+        self.assertNotIn('class="toc"', html)
+
+    def test_toc_only_where_marked(self):
+        html = self.get('[TOC]\n\n# 第一节\n\n正文')
+        self.assertEqual(html.count('class="toc"'), 1)
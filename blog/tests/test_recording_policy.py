@@ -0,0 +1,104 @@
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from blog.recording_policy import DEFAULT_POLICY, PathRule, RecordingPolicy, load_policy, sample_weight_for
+
+
+def make_policy(**overrides):
+    config = dict(DEFAULT_POLICY)
+    config.update(overrides)
+    return RecordingPolicy(config)
+
+
+class SampleWeightTests(SimpleTestCase):
+    def test_rate_to_weight(self):
+        cases = {1.0: 1, 2.0: 1, 0.5: 2, 0.3: 3, 0.25: 4, 0.1: 10, 0.01: 100, 0.9: 1}
+        for rate, weight in cases.items():
+            with self.subTest(rate=rate):
+                self.assertEqual(sample_weight_for(rate), weight)
+
+
+class PathRuleTests(SimpleTestCase):
+    def test_requires_exactly_one_matcher(self):
+        with self.assertRaises(ValueError):
+            PathRule()
+        with self.assertRaises(ValueError):
+            PathRule(prefix='/a/', regex='^/a/')
+
+    def test_prefix_and_regex(self):
+        self.assertTrue(PathRule(prefix='/post/').matches('/post/12/'))
+        self.assertFalse(PathRule(prefix='/post/').matches('/posts/'))
+        rule = PathRule(regex=r'^/post/\d+/$')
+        self.assertTrue(rule.matches('/post/12/'))
+        self.assertFalse(rule.matches('/post/12/edit/'))
+
+    def test_weight(self):
+        self.assertIsNone(PathRule(prefix='/a/', action='exclude').weight)
+        self.assertIsNone(PathRule(prefix='/a/', sample_rate=0).weight)
+        self.assertEqual(PathRule(prefix='/a/', sample_rate=0.2).weight, 5)
+
+
+class RecordingPolicyTests(SimpleTestCase):
+    def test_default_rules_exclude_admin_and_static(self):
+        policy = make_policy()
+        for path in ('/admin/', '/static/app.css', '/api/search/', '/ws/notify/'):
+            self.assertIsNone(policy.weight_for(path, '203.0.113.1'))
+        self.assertEqual(policy.excluded, 4)
+        self.assertEqual(policy.weight_for('/post/1/', '203.0.113.1'), 1)
+
+    def test_first_matching_rule_wins(self):
+        policy = make_policy(RULES=[
+            {'prefix': '/post/', 'sample_rate': 0.5},
+            {'prefix': '/post/', 'action': 'exclude'},
+        ])
+        self.assertEqual(policy.path_weight('/post/1/'), 2)
+
+    def test_zero_default_rate_records_only_matching_rules(self):
+        policy = make_policy(RULES=[{'regex': r'^/post/\d+/$'}], DEFAULT_SAMPLE_RATE=0)
+        self.assertEqual(policy.path_weight('/post/1/'), 1)
+        self.assertIsNone(policy.path_weight('/about/'))
+
+    @mock.patch('blog.recording_policy.random.random', return_value=0.0)
+    def test_bot_uses_sparser_weight(self, _random):
+        policy = make_policy(RULES=[{'prefix': '/post/', 'sample_rate': 0.05}], BOT_SAMPLE_RATE=0.1)
+        self.assertEqual(policy.weight_for('/', '203.0.113.1', device_family=4), 10)
+        self.assertEqual(policy.weight_for('/post/1/', '203.0.113.1', device_family=4), 20)
+        self.assertEqual(policy.weight_for('/', '203.0.113.1', device_family=1), 1)
+
+    def test_bot_rate_zero_excludes_bots(self):
+        policy = make_policy(BOT_SAMPLE_RATE=0)
+        self.assertIsNone(policy.weight_for('/', '203.0.113.1', device_family=4))
+        self.assertEqual(policy.excluded, 1)
+
+    def test_sampling_keeps_one_in_weight(self):
+        policy = make_policy(DEFAULT_SAMPLE_RATE=0.1)
+        with mock.patch('blog.recording_policy.random.random', return_value=0.0999):
+            self.assertEqual(policy.weight_for('/', '203.0.113.1'), 10)
+        with mock.patch('blog.recording_policy.random.random', return_value=0.1):
+            self.assertIsNone(policy.weight_for('/', '203.0.113.1'))
+        self.assertEqual(policy.sampled_out, 1)
+
+    def test_sampled_weights_are_unbiased(self):
+        # 权重之和应接近真实访问数
+        policy = make_policy(DEFAULT_SAMPLE_RATE=0.25)
+        with mock.patch('blog.recording_policy.random.random',
+                        side_effect=[i / 1000 for i in range(1000)]):
+            total = sum(policy.weight_for('/', '203.0.113.1') or 0 for _ in range(1000))
+        self.assertEqual(total, 1000)
+
+    def test_ip_rate_limit_per_window(self):
+        policy = make_policy(IP_RATE_LIMIT=2, IP_RATE_WINDOW=60)
+        with mock.patch('blog.recording_policy.time.time', return_value=600.0):
+            results = [policy.weight_for('/', '203.0.113.1') for _ in range(3)]
+            self.assertEqual(results, [1, 1, None])
+            self.assertEqual(policy.weight_for('/', '203.0.113.2'), 1)
+        with mock.patch('blog.recording_policy.time.time', return_value=660.0):
+            self.assertEqual(policy.weight_for('/', '203.0.113.1'), 1)
+        self.assertEqual(policy.stats(), {'excluded': 0, 'sampled_out': 0, 'rate_limited': 1})
+
+    @override_settings(VISIT_RECORDING_POLICY={'RULES': [], 'DEFAULT_SAMPLE_RATE': 0.5})
+    def test_load_policy_merges_settings(self):
+        policy = load_policy()
+        self.assertEqual(policy.path_weight('/admin/'), 2)
+        self.assertEqual(policy.bot_weight, 10)
@@ -0,0 +1,64 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from blog import rollups
+from blog.models import VisitStatistics
+
+
+def add_visits(count, age=timedelta(hours=1)):
+    visit_time = timezone.now() - age
+    VisitStatistics.objects.bulk_create(
+        VisitStatistics(ip_address=f'203.0.113.{i % 200}', path='/', method='GET', status_code=200,
+                        visit_time=visit_time)
+        for i in range(count)
+    )
+
+
+@override_settings(VISIT_ROLLUP={'MAX_PENDING': 10, 'CATCH_UP_CHUNK_SIZE': 15, 'CATCH_UP_INTERVAL': 0})
+class CatchUpTests(TestCase):
+    def setUp(self):
+        rollups._last_catch_up = None
+        self.addCleanup(setattr, rollups, '_last_catch_up', None)
+        patcher = mock.patch.object(rollups.logger, 'warning')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_small_backlog_is_left_to_cron(self):
+        add_visits(10)
+        self.assertEqual(rollups.catch_up(), 0)
+        self.assertEqual(rollups._watermark(), 0)
+
+    def test_catch_up_processes_one_chunk(self):
+        add_visits(40)
+        # 水位线从 0 开始，一块为 ID 在 (0, 15] 内的记录
+        self.assertEqual(rollups.catch_up(), VisitStatistics.objects.filter(id__lte=15).count())
+        self.assertEqual(rollups._watermark(), 15)
+        # 汇总与尾部合计不变
+        self.assertEqual(rollups.total_visits(), 40)
+
+    def test_run_rollup_max_chunks(self):
+        add_visits(40)
+        self.assertEqual(rollups.run_rollup(chunk_size=10, max_chunks=2), 20)
+        self.assertEqual(rollups.run_rollup(chunk_size=10), 20)
+        self.assertEqual(rollups.total_visits(), 40)
+
+    def test_unsettled_visits_are_not_rolled_up(self):
+        add_visits(20)
+        add_visits(20, age=timedelta(seconds=0))
+        self.assertEqual(rollups.run_rollup(), 20)
+        self.assertEqual(rollups.total_visits(), 40)
+
+    def test_stats_request_catches_up_once(self):
+        add_visits(40)
+        staff = User.objects.create_user('staff', is_staff=True)
+        self.client.force_login(staff)
+        with mock.patch.object(rollups, 'run_rollup', wraps=rollups.run_rollup) as run_rollup:
+            response = self.client.get(reverse('api_visit_stats'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['total_visits'], 40)
+        run_rollup.assert_called_once_with(chunk_size=15, max_chunks=1)
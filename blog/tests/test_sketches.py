@@ -0,0 +1,144 @@
+import random
+
+from django.test import SimpleTestCase
+
+from blog.sketches import HyperLogLog, LatencySketch
+
+
+def exact_quantile(values, q):
+    """与 LatencySketch.quantile 相同的秩定义：排序后第 q * (n - 1) 个值"""
+    ordered = sorted(values)
+    return ordered[int(q * (len(ordered) - 1))]
+
+
+class LatencySketchTests(SimpleTestCase):
+    def setUp(self):
+        rng = random.Random(42)
+        # 对数正态分布，接近真实响应时间（毫秒）的长尾形态
+        self.values = [rng.lognormvariate(4, 1.2) for _ in range(20000)]
+
+    def assertWithinRelativeError(self, estimate, exact, accuracy):
+        self.assertLessEqual(abs(estimate - exact) / exact, accuracy + 1e-9,
+                             f'估算值 {estimate} 与精确值 {exact} 的相对误差超出 {accuracy}')
+
+    def test_quantiles_within_relative_accuracy(self):
+        sketch = LatencySketch(relative_accuracy=0.01)
+        for value in self.values:
+            sketch.add(value)
+        self.assertEqual(sketch.count, len(self.values))
+        for q in (0.0, 0.5, 0.9, 0.99, 1.0):
+            self.assertWithinRelativeError(sketch.quantile(q), exact_quantile(self.values, q), 0.01)
+
+    def test_coarser_accuracy_is_respected(self):
+        sketch = LatencySketch(relative_accuracy=0.05)
+        for value in self.values:
+            sketch.add(value)
+        for q in (0.5, 0.9, 0.99):
+            self.assertWithinRelativeError(sketch.quantile(q), exact_quantile(self.values, q), 0.05)
+
+    def test_merge_equals_single_sketch(self):
+        whole, left, right = LatencySketch(), LatencySketch(), LatencySketch()
+        for i, value in enumerate(self.values):
+            whole.add(value)
+            (left if i % 2 else right).add(value)
+        merged = left.merge(right)
+        self.assertEqual(merged.buckets, whole.buckets)
+        self.assertEqual(merged.count, whole.count)
+        self.assertEqual(merged.quantile(0.99), whole.quantile(0.99))
+
+    def test_merge_rejects_different_accuracy(self):
+        with self.assertRaises(ValueError):
+            LatencySketch(0.01).merge(LatencySketch(0.02))
+
+    def test_weighted_add_matches_repeated_add(self):
+        weighted, repeated = LatencySketch(), LatencySketch()
+        for value in (3.0, 40.0, 500.0):
+            weighted.add(value, 10)
+            for _ in range(10):
+                repeated.add(value)
+        self.assertEqual(weighted.buckets, repeated.buckets)
+        self.assertEqual(weighted.quantile(0.5), repeated.quantile(0.5))
+
+    def test_zero_and_negative_values(self):
+        sketch = LatencySketch()
+        for value in (0, -5, 0, 100):
+            sketch.add(value)
+        self.assertEqual(sketch.zero_count, 3)
+        self.assertEqual(sketch.quantile(0.5), 0.0)
+        self.assertWithinRelativeError(sketch.quantile(1.0), 100, 0.01)
+
+    def test_empty_sketch(self):
+        self.assertIsNone(LatencySketch().quantile(0.5))
+        self.assertEqual(LatencySketch().count, 0)
+
+    def test_serialization_round_trip(self):
+        sketch = LatencySketch(relative_accuracy=0.02)
+        for value in self.values[:1000] + [0, 0]:
+            sketch.add(value)
+        restored = LatencySketch.from_bytes(sketch.to_bytes())
+        self.assertEqual(restored.relative_accuracy, 0.02)
+        self.assertEqual(restored.zero_count, 2)
+        self.assertEqual(restored.buckets, sketch.buckets)
+        self.assertEqual(restored.quantile(0.9), sketch.quantile(0.9))
+
+    def test_from_bytes_accepts_memoryview(self):
+        sketch = LatencySketch()
+        sketch.add(12.5)
+        self.assertEqual(LatencySketch.from_bytes(memoryview(sketch.to_bytes())).buckets, sketch.buckets)
+
+
+class HyperLogLogTests(SimpleTestCase):
+    def assertNear(self, estimate, exact, tolerance):
+        self.assertLessEqual(abs(estimate - exact) / exact, tolerance,
+                             f'估算值 {estimate} 与精确值 {exact} 的相对误差超出 {tolerance}')
+
+    def test_empty(self):
+        self.assertEqual(HyperLogLog().count(), 0)
+
+    def test_small_cardinality_is_nearly_exact(self):
+        for n in (1, 10, 100, 1000):
+            hll = HyperLogLog()
+            for i in range(n):
+                hll.add(f'203.0.113.{i}')
+            self.assertNear(hll.count(), n, 0.02)
+
+    def test_large_cardinality(self):
+        hll = HyperLogLog()
+        for i in range(100000):
+            hll.add(f'visitor-{i}')
+        # precision=12 的标准误差约 1.6%，取三倍标准误差
+        self.assertNear(hll.count(), 100000, 0.05)
+
+    def test_duplicates_are_ignored(self):
+        hll = HyperLogLog()
+        for _ in range(50):
+            for i in range(200):
+                hll.add(i)
+        self.assertNear(hll.count(), 200, 0.02)
+
+    def test_merge_counts_union(self):
+        left, right = HyperLogLog(), HyperLogLog()
+        for i in range(0, 6000):
+            left.add(i)
+        for i in range(4000, 10000):
+            right.add(i)
+        self.assertNear(left.merge(right).count(), 10000, 0.05)
+
+    def test_merge_rejects_different_precision(self):
+        with self.assertRaises(ValueError):
+            HyperLogLog(12).merge(HyperLogLog(10))
+
+    def test_precision_range(self):
+        for precision in (3, 17):
+            with self.assertRaises(ValueError):
+                HyperLogLog(precision)
+        self.assertEqual(HyperLogLog(4).size, 16)
+
+    def test_serialization_round_trip(self):
+        hll = HyperLogLog(precision=10)
+        for i in range(3000):
+            hll.add(i)
+        restored = HyperLogLog.from_bytes(memoryview(hll.to_bytes()))
+        self.assertEqual(restored.precision, 10)
+        self.assertEqual(restored.registers, hll.registers)
+        self.assertEqual(restored.count(), hll.count())
@@ -0,0 +1,90 @@
+import contextlib
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache.backends.locmem import LocMemCache
+from django.test import SimpleTestCase, TestCase
+
+from blog import view_counter
+from blog.models import Post
+from blog.view_counter import CacheStore, LocalStore
+
+
+class StoreTests(SimpleTestCase):
+    def stores(self):
+        cache = LocMemCache('view-counter-test', {})
+        cache.clear()
+        return [LocalStore(), CacheStore(cache)]
+
+    def test_incr_and_get_many(self):
+        for store in self.stores():
+            store.incr(1)
+            self.assertEqual(store.incr(1, 4), 5)
+            store.incr(2)
+            self.assertEqual(store.get_many([1, 2, 3]), {1: 5, 2: 1})
+
+    def test_second_take_of_same_delta_fails(self):
+        # 两个写回读到同一份增量后各自扣减，只有一个成功，计数不会变为负数
+        for store in self.stores():
+            store.incr(1, 5)
+            pending = store.get_many([1])[1]
+            self.assertTrue(store.take(1, pending))
+            self.assertFalse(store.take(1, pending))
+            self.assertEqual(store.get_many([1]), {})
+            store.incr(1)
+            self.assertEqual(store.get_many([1]), {1: 1})
+
+    def test_take_missing_key(self):
+        for store in self.stores():
+            self.assertFalse(store.take(1, 1))
+
+
+class FlushTests(TestCase):
+    def setUp(self):
+        self.post = Post.objects.create(title='文章', content='内容', author=User.objects.create_user('author'))
+        cache = LocMemCache('view-counter-flush-test', {})
+        cache.clear()
+        self.store = CacheStore(cache)
+        for patcher in (mock.patch.object(view_counter, 'store', self.store),
+                        # 模拟另一个进程的写回：不与本进程的写回互斥
+                        mock.patch.object(view_counter, '_flush_lock', contextlib.nullcontext())):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_concurrent_flushes_count_delta_once(self):
+        for _ in range(5):
+            self.store.incr(self.post.pk)
+
+        get_many = self.store.get_many
+        other_flushes = []
+
+        def racing_get_many(post_ids):
+            # 本次写回读到增量之后、扣减之前，另一个写回完整执行一次
+            pending = get_many(post_ids)
+            if not other_flushes:
+                other_flushes.append(None)
+                other_flushes[0] = view_counter.flush([self.post.pk])
+            return pending
+
+        with mock.patch.object(self.store, 'get_many', racing_get_many):
+            flushed = view_counter.flush([self.post.pk])
+
+        self.assertEqual((other_flushes, flushed), ([5], 0))
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.view_count, 5)
+        self.assertEqual(self.store.get_many([self.post.pk]), {})
+
+    def test_views_after_read_are_left_for_next_flush(self):
+        self.store.incr(self.post.pk, 3)
+        get_many = self.store.get_many
+
+        def get_many_then_view(post_ids):
+            pending = get_many(post_ids)
+            self.store.incr(self.post.pk)
+            return pending
+
+        with mock.patch.object(self.store, 'get_many', get_many_then_view):
+            self.assertEqual(view_counter.flush([self.post.pk]), 3)
+        self.assertEqual(view_counter.flush([self.post.pk]), 1)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.view_count, 4)
@@ -0,0 +1,185 @@
+import time
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from blog.weather import CircuitBreaker, WeatherCache
+
+
+class Clock:
+    """可手动推进的 time.monotonic"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+class ClockMixin:
+    def setUp(self):
+        super().setUp()
+        self.clock = Clock()
+        for patcher in (mock.patch('blog.weather.time.monotonic', self.clock),
+                        mock.patch('blog.weather.logger')):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+
+class CircuitBreakerTests(ClockMixin, SimpleTestCase):
+    def test_opens_after_consecutive_failures(self):
+        breaker = CircuitBreaker(failure_threshold=3, reset_seconds=60)
+        for _ in range(2):
+            self.assertTrue(breaker.allow())
+            breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        self.assertFalse(breaker.allow())
+
+    def test_success_resets_failure_count(self):
+        breaker = CircuitBreaker(failure_threshold=2, reset_seconds=60)
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+    def test_half_open_allows_single_trial(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_seconds=60)
+        breaker.record_failure()
+        self.clock.advance(59)
+        self.assertFalse(breaker.allow())
+        self.clock.advance(1)
+        self.assertTrue(breaker.allow())
+        self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+        self.assertFalse(breaker.allow())
+
+    def test_trial_success_closes(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_seconds=60)
+        breaker.record_failure()
+        self.clock.advance(60)
+        self.assertTrue(breaker.allow())
+        breaker.record_success()
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+        self.assertTrue(breaker.allow())
+
+    def test_trial_failure_reopens_for_another_period(self):
+        breaker = CircuitBreaker(failure_threshold=5, reset_seconds=60)
+        for _ in range(5):
+            breaker.record_failure()
+        self.clock.advance(60)
+        self.assertTrue(breaker.allow())
+        # 半开状态下一次失败即重新熔断，不需要再累计到阈值
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        self.clock.advance(59)
+        self.assertFalse(breaker.allow())
+        self.clock.advance(1)
+        self.assertTrue(breaker.allow())
+
+    def test_cancel_trial(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_seconds=60)
+        breaker.record_failure()
+        self.clock.advance(60)
+        self.assertTrue(breaker.allow())
+        breaker.cancel_trial()
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        # 重新打开时不重置计时，下次 allow() 可立即再试探
+        self.assertTrue(breaker.allow())
+
+    def test_cancel_trial_outside_half_open_is_noop(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_seconds=60)
+        breaker.cancel_trial()
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+
+class WeatherCacheTests(ClockMixin, SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        self.calls = []
+        self.responses = []
+        self.cache = WeatherCache(self.fetch, fresh_seconds=100, stale_seconds=1000, negative_seconds=50,
+                                  max_entries=10, workers=1, wait_timeout=5,
+                                  breaker=CircuitBreaker(failure_threshold=3, reset_seconds=60))
+        self.addCleanup(self.cache._executor.shutdown)
+
+    def fetch(self, location):
+        self.calls.append(location)
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    def settle(self):
+        """等待后台拉取结束"""
+        deadline = time.time() + 5
+        while self.cache.is_loading('beijing') and time.time() < deadline:
+            time.sleep(0.001)
+        self.assertFalse(self.cache.is_loading('beijing'))
+
+    def test_miss_then_fresh_hit(self):
+        self.responses = [{'temp': 20}]
+        self.assertEqual(self.cache.get('beijing', wait=True), {'temp': 20})
+        self.assertEqual(self.cache.get('beijing'), {'temp': 20})
+        self.assertEqual(self.calls, ['beijing'])
+        self.assertEqual(self.cache.stats()['hit'], 1)
+
+    def test_stale_value_is_served_while_refreshing(self):
+        self.responses = [{'temp': 20}, {'temp': 25}]
+        self.cache.get('beijing', wait=True)
+        self.clock.advance(101)
+        self.assertEqual(self.cache.get('beijing'), {'temp': 20})
+        self.settle()
+        self.assertEqual(self.cache.get('beijing'), {'temp': 25})
+        self.assertEqual(len(self.calls), 2)
+
+    def test_failed_refresh_keeps_value_and_backs_off(self):
+        self.responses = [{'temp': 20}, ValueError('upstream'), {'temp': 25}]
+        self.cache.get('beijing', wait=True)
+        self.clock.advance(101)
+        self.cache.get('beijing')
+        self.settle()
+        self.assertTrue(self.cache.recently_failed('beijing'))
+
+        # 负缓存期内继续返回旧值，不再发起刷新
+        for _ in range(5):
+            self.assertEqual(self.cache.get('beijing'), {'temp': 20})
+        self.assertFalse(self.cache.is_loading('beijing'))
+        self.assertEqual(len(self.calls), 2)
+
+        # 负缓存期过后重新刷新；旧值的获取时间未被失败刷新改写
+        self.clock.advance(51)
+        self.assertFalse(self.cache.recently_failed('beijing'))
+        self.assertEqual(self.cache.get('beijing'), {'temp': 20})
+        self.settle()
+        self.assertEqual(self.cache.get('beijing'), {'temp': 25})
+        self.assertEqual(len(self.calls), 3)
+
+    def test_failed_refresh_does_not_extend_stale_period(self):
+        self.responses = [{'temp': 20}, ValueError('upstream')]
+        self.cache.get('beijing', wait=True)
+        self.clock.advance(990)
+        self.cache.get('beijing')
+        self.settle()
+        self.clock.advance(11)
+        self.assertIsNone(self.cache._lookup('beijing')[0])
+
+    def test_failure_without_value_is_negatively_cached(self):
+        self.responses = [ValueError('upstream'), {'temp': 20}]
+        self.assertIsNone(self.cache.get('beijing', wait=True))
+        self.assertIsNone(self.cache.get('beijing'))
+        self.assertEqual(self.cache.stats()['negative_hit'], 1)
+        self.clock.advance(51)
+        self.assertEqual(self.cache.get('beijing', wait=True), {'temp': 20})
+
+    def test_open_circuit_rejects_fetches(self):
+        self.responses = [ValueError('upstream')] * 3
+        for location in ('a', 'b', 'c'):
+            self.cache.get(location, wait=True)
+        self.assertEqual(self.cache.breaker.state, CircuitBreaker.OPEN)
+        self.assertIsNone(self.cache.get('d', wait=True))
+        self.assertEqual(self.calls, ['a', 'b', 'c'])
+        self.assertEqual(self.cache.stats()['rejected'], 1)
@@ -0,0 +1,10 @@
+"""
+文本处理的公共定义
+全文检索（blog/search.py）与文章分析（blog/post_analysis.py）共用的字符类
+"""
+
+import re
+
+# 假名、中日韩统一表意文字（含扩展A与兼容区）、韩文音节，用于拼接到正则的字符类中
+CJK = '\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af'
+CJK_CHAR = re.compile(rf'[{CJK}]')
@@ -28,6 +28,8 @@ urlpatterns = [
     # 统计功能
     path('statistics/', views.statistics_view, name='statistics'),
     path('api/visit-stats/', views.api_visit_stats, name='api_visit_stats'),
+    path('api/visit-stats/archive/', views.api_visit_archive, name='api_visit_archive'),
+    path('statistics/export/', views.export_visits_view, name='export_visits'),
 
     # 聊天功能
     path('chat/', views.chat_view, name='chat'),
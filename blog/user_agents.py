@@ -0,0 +1,109 @@
+"""
+User-Agent 分类
+用预编译的正则把 UA 归类为浏览器/操作系统/设备类型的小整数编号，
+结果按 UA 字符串做 LRU 缓存，同一 UA 只解析一次
+"""
+
+import re
+from functools import lru_cache
+
+# 编号写入数据库，只能追加，不能修改已有编号
+BROWSER_CHOICES = (
+    (0, '其他'),
+    (1, 'Chrome'),
+    (2, 'Firefox'),
+    (3, 'Safari'),
+    (4, 'Edge'),
+    (5, 'Opera'),
+    (6, 'IE'),
+    (7, '微信'),
+    (8, 'Samsung'),
+)
+
+OS_CHOICES = (
+    (0, '其他'),
+    (1, 'Windows'),
+    (2, 'macOS'),
+    (3, 'iOS'),
+    (4, 'Android'),
+    (5, 'Linux'),
+)
+
+DEVICE_CHOICES = (
+    (0, '其他'),
+    (1, '桌面'),
+    (2, '手机'),
+    (3, '平板'),
+    (4, '爬虫'),
+)
+
+BROWSER_LABELS = dict(BROWSER_CHOICES)
+OS_LABELS = dict(OS_CHOICES)
+DEVICE_LABELS = dict(DEVICE_CHOICES)
+
+# 按优先级排列：Edge/Opera/微信等基于 Chromium 的 UA 同时包含 Chrome 和 Safari，必须先匹配
+_BROWSER_PATTERNS = [
+    (re.compile(r'MicroMessenger/'), 7),
+    (re.compile(r'Edg(?:e|A|iOS)?/'), 4),
+    (re.compile(r'OPR/|Opera'), 5),
+    (re.compile(r'SamsungBrowser/'), 8),
+    (re.compile(r'Firefox/|FxiOS/'), 2),
+    (re.compile(r'Chrome/|CriOS/|Chromium/'), 1),
+    (re.compile(r'Version/[\d.]+.*Safari/'), 3),
+    (re.compile(r'MSIE |Trident/'), 6),
+]
+
+# iPad/iPhone 的 UA 含 "Mac OS X"，Android 的 UA 含 "Linux"，需先匹配
+_OS_PATTERNS = [
+    (re.compile(r'iPhone|iPad|iPod'), 3),
+    (re.compile(r'Android'), 4),
+    (re.compile(r'Windows'), 1),
+    (re.compile(r'Macintosh|Mac OS X'), 2),
+    (re.compile(r'Linux|X11'), 5),
+]
+
+_BOT_PATTERN = re.compile(
+    r'bot|crawl|spider|slurp|curl|wget|python-requests|httpclient|headless|monitor',
+    re.IGNORECASE,
+)
+_TABLET_PATTERN = re.compile(r'iPad|Tablet|Android(?!.*Mobile)')
+_MOBILE_PATTERN = re.compile(r'Mobile|iPhone|iPod|Android')
+
+
+def _match(patterns, user_agent):
+    for pattern, family in patterns:
+        if pattern.search(user_agent):
+            return family
+    return 0
+
+
+@lru_cache(maxsize=4096)
+def parse_user_agent(user_agent):
+    """
+    解析 UA，返回 (浏览器编号, 系统编号, 设备编号)
+    """
+    if not user_agent:
+        return 0, 0, 0
+
+    if _BOT_PATTERN.search(user_agent):
+        device = 4
+    elif _TABLET_PATTERN.search(user_agent):
+        device = 3
+    elif _MOBILE_PATTERN.search(user_agent):
+        device = 2
+    elif user_agent.startswith('Mozilla/'):
+        device = 1
+    else:
+        device = 0
+
+    return _match(_BROWSER_PATTERNS, user_agent), _match(_OS_PATTERNS, user_agent), device
+
+
+def classify_fields(user_agent):
+    """返回可直接写入 VisitStatistics 的分类字段"""
+    browser, os_family, device = parse_user_agent(user_agent)
+    return {
+        'browser_family': browser,
+        'os_family': os_family,
+        'device_family': device,
+    }
@@ -3,16 +3,45 @@
 包含天气API等功能
 """
 
-import requests
+import logging
 import os
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
 from django.conf import settings
 from dotenv import load_dotenv
-from datetime import datetime, timedelta
+from datetime import datetime
+
+from .post_analysis import count_text, minutes_to_read
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+# 天气接口地址，可指向本地的模拟服务器进行测试
+WEATHER_API_URL = os.getenv('WEATHER_API_URL', 'https://api.seniverse.com/v3/weather/daily.json')
+
+_weather_session = None
+_weather_session_lock = threading.Lock()
+
+
+def get_weather_session():
+    """天气接口共用的 requests.Session（连接池 + keep-alive），连接数与天气缓存的拉取线程数一致"""
+    global _weather_session
+    if _weather_session is None:
+        with _weather_session_lock:
+            if _weather_session is None:
+                pool_size = getattr(settings, 'WEATHER_CACHE', {}).get('WORKERS', 4)
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+                session = requests.Session()
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                _weather_session = session
+    return _weather_session
+
 
-def get_weather_data(location=None, ip="", use_ip=True):
+def get_weather_data(location=None, ip="", use_ip=True, timeout=10, raise_errors=False):
     """
     获取天气数据
     使用心知天气API（Seniverse）
@@ -20,6 +49,8 @@ def get_weather_data(location=None, ip="", use_ip=True):
     参数:
     - location: 城市名，如'beijing'或'北京'
     - use_ip: 是否使用IP定位，如果为True且location为空，则使用IP定位
+    - timeout: 请求超时（秒）
+    - raise_errors: 为True时请求与解析错误直接抛出（供天气缓存统计失败与超时），否则返回None
     """
     api_key = os.getenv('WEATHER_API_KEY')  # 需要修改环境变量名
     if not api_key:
@@ -43,9 +74,7 @@ def get_weather_data(location=None, ip="", use_ip=True):
         else:
             params['location'] = os.getenv('WEATHER_CITY', 'beijing')
 
-        url = 'https://api.seniverse.com/v3/weather/daily.json'
-
-        response = requests.get(url, params=params, timeout=10)
+        response = get_weather_session().get(WEATHER_API_URL, params=params, timeout=timeout)
         response.raise_for_status()
         data = response.json()
 
@@ -94,64 +123,29 @@ def get_weather_data(location=None, ip="", use_ip=True):
 
         return weather_info
     except (requests.RequestException, KeyError, ValueError) as e:
-        print(f"获取天气数据失败: {e}")
+        if raise_errors:
+            raise
+        logger.warning(f"获取天气数据失败: {e}")
         return None
 
 
 def get_client_weather(request):
     """
     根据客户端信息获取天气
-    优先使用IP定位，失败则使用默认城市
+    优先使用IP定位，失败则使用默认城市；数据来自进程内缓存（见 blog/weather.py），不等待天气接口
     """
-    # 尝试从客户端IP获取位置
-    client_ip = get_client_ip(request)
-
-    # 这里可以添加IP定位服务，例如使用心知天气的IP定位API
-    # 但需要另外的API密钥，这里简化处理
-
-    # 尝试使用IP自动定位
-    weather_data = get_weather_data(location=None, ip=client_ip, use_ip=True)
-    print(client_ip)
-
-    # 如果IP定位失败，使用默认城市
-    if not weather_data:
-        default_city = os.getenv('WEATHER_CITY', 'beijing')
-        weather_data = get_weather_data(location=default_city, use_ip=False)
-
-    return weather_data
+    from .weather import get_client_weather as cached_client_weather
+    return cached_client_weather(request)
 
 
 def weather_context(request):
     """
-    天气上下文处理器
-    将天气数据添加到所有模板上下文中
+    天气上下文处理器（默认不启用）
+    天气组件改为页面加载后异步请求天气接口，页面渲染不再读取天气；需要在服务端渲染天气的站点
+    可自行加入 TEMPLATES 的 context_processors。缓存未命中时本次为 None，后台拉取完成后的请求即可显示
     """
-    # 使用缓存避免频繁调用API
-    cache_key = f'weather_data_{get_client_ip(request)}'
-    weather_data = None
-
-    # 检查是否已有缓存的天气数据（这里简化，实际应使用Django缓存）
-    # 我们可以使用session来存储天气数据
-    if 'weather_data' in request.session:
-        weather_data = request.session['weather_data']
-        last_update = request.session.get('weather_last_update')
-
-        # 检查是否过期（1小时过期）
-        if last_update:
-            last_update_time = datetime.fromisoformat(last_update)
-            if datetime.now() - last_update_time < timedelta(hours=1):
-                return {'weather': weather_data}
-
-    # 获取新的天气数据
-    weather_data = get_client_weather(request)
-
-    if weather_data:
-        # 保存到session
-        request.session['weather_data'] = weather_data
-        request.session['weather_last_update'] = datetime.now().isoformat()
-
     return {
-        'weather': weather_data,
+        'weather': get_client_weather(request),
     }
 
 
@@ -169,19 +163,14 @@ def format_date(value, format_string='Y年m月d日 H:i'):
 def calculate_read_time(content, words_per_minute=200):
     """
     计算阅读时间
+    文章的阅读时间已在保存时计算并存于 Post.read_time，这里用于任意文本
     """
     if not content:
         return 0
 
-    # 简单估算：中文按字符数，英文按单词数
-    chinese_chars = sum(1 for char in content if '\u4e00' <= char <= '\u9fff')
-    english_words = len(content.split()) - chinese_chars
-
-    # 估算总单词数（假设每个中文字符相当于一个单词）
-    total_words = chinese_chars + english_words
-    minutes = total_words / words_per_minute
-
-    return max(1, int(minutes))  # 最少1分钟
+    # 中日韩文字按字符数，其余按单词数（每个中日韩字符相当于一个单词）
+    words, cjk_chars = count_text(content)
+    return minutes_to_read(words + cjk_chars, words_per_minute)
 
 
 def get_client_ip(request):
@@ -0,0 +1,223 @@
+"""
+文章浏览数计数器
+浏览增量先原子累积，由后台线程每隔 FLUSH_INTERVAL 秒按文章批量写回数据库：
+UPDATE ... SET view_count = view_count + n，不再每次浏览都读改写一行。
+
+增量暂存在 VIEW_COUNTER['CACHE'] 指定的缓存中，该缓存须为 Redis 等多进程共享、不淘汰条目的缓存，
+此时 flush_view_counts 命令也能写回其他进程的增量；若为本地内存缓存（不跨进程共享且会淘汰条目），
+改为暂存在进程内计数器中，只由本进程写回。进程被强制结束时最多丢失一个写回周期内的增量
+"""
+
+import atexit
+import logging
+import threading
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import close_old_connections
+from django.db.models import F
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'post_views_pending'
+
+DEFAULT_CONFIG = {
+    'FLUSH_INTERVAL': 30,  # 后台线程写回的周期（秒）
+    'CACHE': 'default',    # 暂存增量的缓存
+}
+
+
+def _config():
+    config = dict(DEFAULT_CONFIG)
+    config.update(getattr(settings, 'VIEW_COUNTER', {}))
+    return config
+
+
+def _key(post_id):
+    return f'{KEY_PREFIX}_{post_id}'
+
+
+class LocalStore:
+    """进程内的增量计数，线程安全"""
+
+    shared = False
+
+    def __init__(self):
+        self._counts = Counter()
+        self._lock = threading.Lock()
+
+    def incr(self, post_id, count=1):
+        with self._lock:
+            self._counts[post_id] += count
+            return self._counts[post_id]
+
+    def get_many(self, post_ids):
+        with self._lock:
+            return {post_id: self._counts[post_id] for post_id in post_ids if self._counts.get(post_id)}
+
+    def take(self, post_id, count):
+        """扣减增量，增量不足（已被其他写回扣走）时返回 False"""
+        with self._lock:
+            if self._counts.get(post_id, 0) < count:
+                return False
+            self._counts[post_id] -= count
+            if not self._counts[post_id]:
+                del self._counts[post_id]
+            return True
+
+
+class CacheStore:
+    """共享缓存中的增量计数，cache.incr / decr 保证多进程间的原子性"""
+
+    shared = True
+
+    def __init__(self, cache):
+        self.cache = cache
+
+    def incr(self, post_id, count=1):
+        key = _key(post_id)
+        self.cache.add(key, 0, timeout=None)
+        try:
+            return self.cache.incr(key, count)
+        except ValueError:
+            # 键在 add 与 incr 之间被删除
+            self.cache.set(key, count, timeout=None)
+            return count
+
+    def get_many(self, post_ids):
+        keys = {_key(post_id): post_id for post_id in post_ids}
+        return {keys[key]: value for key, value in self.cache.get_many(list(keys)).items() if value}
+
+    def take(self, post_id, count):
+        """
+        扣减增量，增量不足时返回 False
+        多个进程（及 flush_view_counts 命令）可能读到同一份增量并同时扣减，
+        以 decr 的返回值为准：扣减后为负说明已被其他写回扣走，还回去并跳过
+        """
+        key = _key(post_id)
+        try:
+            remaining = self.cache.decr(key, count)
+        except ValueError:
+            return False
+        if remaining < 0:
+            self.cache.incr(key, count)
+            return False
+        return True
+
+
+def _build_store():
+    cache = caches[_config()['CACHE']]
+    if isinstance(cache, (LocMemCache, DummyCache)):
+        return LocalStore()
+    return CacheStore(cache)
+
+
+store = _build_store()
+
+_dirty = set()
+_dirty_lock = threading.Lock()
+_flush_lock = threading.Lock()
+_flusher = None
+_flusher_lock = threading.Lock()
+_stopped = threading.Event()
+
+
+def increment(post_id):
+    """记录一次浏览，返回该文章尚未写回数据库的浏览增量"""
+    pending = store.incr(post_id)
+    with _dirty_lock:
+        _dirty.add(post_id)
+    _ensure_flusher()
+    return pending
+
+
+def pending_views(post_ids):
+    """批量读取尚未写回的浏览增量，返回 {post_id: n}"""
+    if not post_ids:
+        return {}
+    return store.get_many(post_ids)
+
+
+def apply_pending(posts):
+    """把未写回的增量合并到文章实例的 view_count 上（仅用于展示）"""
+    posts = list(posts)
+    pending = pending_views([post.pk for post in posts])
+    for post in posts:
+        post.view_count += pending.get(post.pk, 0)
+    return posts
+
+
+def rank_posts(posts, limit):
+    """合并未写回增量后按浏览数排序，取前 limit 篇"""
+    posts = apply_pending(posts)
+    posts.sort(key=lambda post: post.view_count, reverse=True)
+    return posts[:limit]
+
+
+def most_viewed(queryset, limit):
+    """按浏览数（含未写回增量）取前 limit 篇文章"""
+    return rank_posts(queryset.order_by('-view_count')[:limit * 2], limit)
+
+
+def flush(post_ids=None):
+    """
+    把浏览增量写回数据库，返回写回的浏览总数
+    post_ids 为空时写回本进程记录过的文章；先原子扣减增量再更新数据库，
+    扣减之后新产生的浏览会留到下一次写回
+    """
+    from .models import Post
+
+    if post_ids is None:
+        with _dirty_lock:
+            post_ids = list(_dirty)
+            _dirty.clear()
+
+    flushed = 0
+    with _flush_lock:
+        for post_id, count in pending_views(post_ids).items():
+            if not store.take(post_id, count):
+                continue
+            try:
+                Post.objects.filter(pk=post_id).update(view_count=F('view_count') + count)
+            except Exception as e:
+                # 写库失败时把增量还回去，留到下一次写回
+                store.incr(post_id, count)
+                with _dirty_lock:
+                    _dirty.add(post_id)
+                logger.error(f"写回文章 {post_id} 浏览数失败: {e}")
+                continue
+            flushed += count
+    return flushed
+
+
+def _flush_safely():
+    try:
+        flush()
+    except Exception as e:
+        logger.error(f"写回浏览数失败: {e}")
+    finally:
+        close_old_connections()
+
+
+def _run(interval):
+    while not _stopped.wait(interval):
+        _flush_safely()
+
+
+def _ensure_flusher():
+    """惰性启动周期写回线程（兼容 fork 后的子进程），空闲的进程也会按周期写回"""
+    global _flusher
+    if _flusher is not None and _flusher.is_alive():
+        return
+    with _flusher_lock:
+        if _flusher is not None and _flusher.is_alive():
+            return
+        _flusher = threading.Thread(target=_run, args=(_config()['FLUSH_INTERVAL'],),
+                                    name='view-counter-flush', daemon=True)
+        _flusher.start()
+
+
+atexit.register(_flush_safely)
@@ -24,7 +24,9 @@ from .auth import (
 
 from .stats import (
     statistics_view,
-    api_visit_stats
+    api_visit_stats,
+    api_visit_archive,
+    export_visits_view,
 )
 
 from .chat import (
@@ -77,6 +79,8 @@ __all__ = [
     # 统计视图
     'statistics_view',
     'api_visit_stats',
+    'api_visit_archive',
+    'export_visits_view',
 
     # 聊天视图
     'chat_view',
@@ -4,17 +4,28 @@ from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.template.loader import render_to_string
 from ..templatetags.markdown_extras import markdown_filter
+from ..markdown_blocks import render_blocks
 
 
 @csrf_exempt
 def markdown_preview(request):
     """
     AJAX 预览 Markdown
+    mode=blocks 时按块增量渲染：known 为客户端已显示的块指纹（逗号分隔），
+    返回的 blocks 按文档顺序列出全部块指纹，只有客户端没有的块附带 html
     """
     if request.method == 'POST':
         content = request.POST.get('content', '')
 
         try:
+            if request.POST.get('mode') == 'blocks':
+                known = [block_id for block_id in request.POST.get('known', '').split(',') if block_id]
+                return JsonResponse({
+                    'success': True,
+                    'mode': 'blocks',
+                    'blocks': render_blocks(content, known),
+                })
+
             # 使用过滤器渲染
             html = markdown_filter(content)
 
@@ -1,13 +1,15 @@
 # views.py 或 api/views.py
 
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse
+from django.template.loader import render_to_string
+from django.utils.cache import (add_never_cache_headers, get_conditional_response,
+                                patch_cache_control, set_response_etag)
 from django.views.decorators.http import require_GET
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 from django.views import View
 import json
-from datetime import datetime, timedelta
-from ...utils import get_weather_data, get_client_ip
+from ...weather import browser_max_age, client_location, default_city, get_client_weather, weather_cache
 
 
 # @require_GET
@@ -15,66 +17,43 @@ from ...utils import get_weather_data, get_client_ip
 def refresh_weather(request):
     """
     API端点：刷新天气数据
+    数据来自进程内天气缓存（见 blog/weather.py），未命中时总共最多等待 WEATHER_CACHE['WAIT_TIMEOUT'] 秒
 
     参数（可选）:
     - city: 城市名称（如'北京'或'beijing'）
     - use_ip: 是否使用IP定位（true/false）
     - force: 是否强制刷新（忽略缓存）
+    - format: html 时返回天气卡片片段（页面上的天气组件异步加载），否则返回JSON
+
+    非强制刷新的 GET 响应带 ETag 与 Cache-Control（max-age 见 WEATHER_CACHE['BROWSER_MAX_AGE']），
+    条件请求命中时返回 304；按 IP 定位的响应只允许浏览器缓存（private），指定城市的响应可被代理缓存
     """
     try:
         # 获取查询参数
         city = request.GET.get('city')
         use_ip = request.GET.get('use_ip', 'true').lower() == 'true'
         force_refresh = request.GET.get('force', 'false').lower() == 'true'
-
-        # 检查是否需要强制刷新或缓存过期
-        should_refresh = force_refresh
-
-        if not should_refresh:
-            # 检查session中是否有缓存数据
-            if 'weather_data' in request.session:
-                weather_data = request.session.get('weather_data')
-                last_update_str = request.session.get('weather_last_update')
-
-                if last_update_str:
-                    try:
-                        last_update = datetime.fromisoformat(last_update_str)
-                        # 检查是否过期（30分钟过期）
-                        if datetime.now() - last_update < timedelta(minutes=30):
-                            # 未过期，返回缓存数据
-                            return JsonResponse({
-                                'success': True,
-                                'cached': True,
-                                'data': weather_data,
-                                'message': '使用缓存的天气数据'
-                            })
-                    except (ValueError, TypeError):
-                        pass  # 日期格式错误，继续获取新数据
-
-        # 获取新的天气数据
-        if city:
-            # 使用指定的城市
-            weather_data = get_weather_data(location=city, use_ip=False)
+        as_html = request.GET.get('format') == 'html'
+
+        # 位置：指定城市 > IP定位（失败时退回默认城市） > 默认城市
+        if force_refresh:
+            location = city or (client_location(request) if use_ip else None) or default_city()
+            weather_data = weather_cache.refresh(location)
+        elif city:
+            weather_data = weather_cache.get(city, wait=True)
+        elif use_ip:
+            weather_data = get_client_weather(request, wait=True)
         else:
-            # 根据参数决定是否使用IP定位
-            if use_ip:
-                weather_data = get_weather_data(location=None, use_ip=True)
-            else:
-                # 使用默认城市
-                from django.conf import settings
-                default_city = getattr(settings, 'WEATHER_CITY', 'beijing')
-                weather_data = get_weather_data(location=default_city, use_ip=False)
-
-        if weather_data:
-            # 保存到session中
-            request.session['weather_data'] = weather_data
-            request.session['weather_last_update'] = datetime.now().isoformat()
-
-            return JsonResponse({
+            weather_data = weather_cache.get(default_city(), wait=True)
+
+        if as_html:
+            # 没有数据时卡片显示提示，仍返回 200
+            response = HttpResponse(render_to_string('blog/components/weather_card.html',
+                                                     {'weather': weather_data}))
+        elif weather_data:
+            response = JsonResponse({
                 'success': True,
-                'cached': False,
                 'data': weather_data,
-                'timestamp': datetime.now().isoformat(),
                 'message': '天气数据已刷新'
             })
         else:
@@ -83,6 +62,19 @@ def refresh_weather(request):
                 'error': '获取天气数据失败'
             }, status=500)
 
+        if force_refresh or request.method != 'GET':
+            add_never_cache_headers(response)
+            return response
+
+        # 没有数据时只短暂缓存，后台拉取完成后尽快显示
+        max_age = browser_max_age() if weather_data else 30
+        if city or not use_ip:
+            patch_cache_control(response, public=True, max_age=max_age)
+        else:
+            patch_cache_control(response, private=True, max_age=max_age)
+        set_response_etag(response)
+        return get_conditional_response(request, etag=response['ETag'], response=response)
+
     except Exception as e:
         return JsonResponse({
             'success': False,
@@ -2,7 +2,7 @@
 认证相关视图
 处理用户注册、登录、注销和个人资料
 """
-from blog.models import UserProfile
+from blog.models import Post, UserProfile
 from django.shortcuts import render, redirect
 from django.contrib.auth import login, logout, authenticate
 from django.contrib.auth.forms import AuthenticationForm
@@ -92,7 +92,7 @@ def profile_view(request):
         profile_form = UserProfileForm(instance=profile)
 
     # 统计信息（保持不变）
-    user_posts = user.post_set.filter(status='published')
+    user_posts = user.post_set.filter(status='published').defer(*Post.LIST_DEFERRED_FIELDS)
     user_comments = user.comment_set.count()
 
     context = {
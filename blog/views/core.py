@@ -6,12 +6,40 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.core.paginator import Paginator
-from django.db.models import Q, Count
 from django.utils import timezone
 from django.http import JsonResponse
 from ..models import Post, Category, Tag, Comment
 from ..forms import PostForm, CommentForm
+from .. import search
+from ..pagination import paginate, paginate_ranked, page_json
+from ..related_posts import get_related_posts
+from ..post_rendering import get_rendered
+
+
+def _post_json(post):
+    """无限滚动接口中单篇文章的数据"""
+    return {
+        'id': post.pk,
+        'title': post.title,
+        'summary': post.summary or post.excerpt,
+        'read_time': post.read_time,
+        'url': post.get_absolute_url(),
+        'author': post.author.username,
+        'category': post.category.name if post.category else None,
+        'tags': [tag.name for tag in post.tags.all()],
+        'view_count': post.view_count,
+        'created_at': post.created_at.isoformat(),
+        'snippet': getattr(post, 'search_snippet', None),
+    }
+
+
+def _render_posts_page(request, template_name, page_obj, context):
+    """?format=json 时返回无限滚动用的 JSON，否则渲染模板"""
+    if request.GET.get('format') == 'json':
+        return JsonResponse(page_json(page_obj, _post_json))
+    context.update({'page_obj': page_obj, 'posts': page_obj.object_list})
+    return render(request, template_name, context)
+
 
 def home_view(request):
     """
@@ -24,16 +52,10 @@ def home_view(request):
     tag_id = request.GET.get('tag')
     featured = request.GET.get('featured')
 
-    # 基础查询集
-    posts = Post.objects.filter(status='published').order_by('-created_at')
-
-    # 应用过滤
-    if query:
-        posts = posts.filter(
-            Q(title__icontains=query) |
-            Q(content__icontains=query) |
-            Q(summary__icontains=query)
-        )
+    # 基础查询集（模板会访问作者、分类和标签，一次性取出避免 N+1 查询）
+    posts = Post.objects.filter(status='published')\
+        .select_related('author', 'category')\
+        .prefetch_related('tags')
 
     if category_id:
         posts = posts.filter(category_id=category_id)
@@ -44,31 +66,25 @@ def home_view(request):
     if featured:
         posts = posts.filter(is_featured=True)
 
-    # 分页
-    paginator = Paginator(posts, 10)  # 每页10篇文章
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-
-    # 获取分类和标签用于筛选
-    categories = Category.objects.annotate(post_count=Count('post'))
-    tags = Tag.objects.annotate(post_count=Count('post'))
+    # 游标分页；搜索时走全文索引，按相关度对（有上限的）结果分页
+    cursor = request.GET.get('cursor')
+    if query:
+        post_ids = search.filter_ranked(posts, search.search_post_ids(query))
+        page_obj = paginate_ranked(posts, post_ids, cursor)
+        search.attach_snippets(page_obj, query)
+    else:
+        page_obj = paginate(posts.defer(*Post.LIST_DEFERRED_FIELDS), cursor)
 
-    # 热门文章
-    popular_posts = Post.objects.filter(status='published')\
-        .order_by('-view_count')[:5]
+    # 分类、标签和热门文章由 sidebar_context 上下文处理器从缓存提供
 
     context = {
-        'page_obj': page_obj,
-        'categories': categories,
-        'tags': tags,
-        'popular_posts': popular_posts,
         'query': query,
         'category_id': category_id,
         'tag_id': tag_id,
         'featured': featured,
     }
 
-    return render(request, 'blog/home.html', context)
+    return _render_posts_page(request, 'blog/home.html', page_obj, context)
 
 def post_detail_view(request, pk):
     """
@@ -100,14 +116,16 @@ def post_detail_view(request, pk):
     # 获取评论
     comments = post.comments.filter(is_active=True).order_by('-created_at')
 
-    # 获取相关文章
-    related_posts = Post.objects.filter(
-        status='published',
-        tags__in=post.tags.all()
-    ).exclude(pk=post.pk).distinct()[:3]
+    # 获取相关文章（预先计算，见 blog/related_posts.py）
+    related_posts = get_related_posts(post, limit=3)
+
+    # 渲染结果来自文章上保存的缓存字段，见 blog/post_rendering.py
+    # 目录只在正文用 [TOC] 标记的位置出现（已包含在 HTML 中），这里不单独显示
+    content_html, _ = get_rendered(post)
 
     context = {
         'post': post,
+        'content_html': content_html,
         'comments': comments,
         'comment_form': comment_form,
         'related_posts': related_posts,
@@ -219,14 +237,16 @@ def category_posts_view(request, category_id):
     """
     category = get_object_or_404(Category, pk=category_id)
     posts = Post.objects.filter(category=category, status='published')\
-        .order_by('-created_at')
+        .select_related('author', 'category')\
+        .prefetch_related('tags')\
+        .defer(*Post.LIST_DEFERRED_FIELDS)
+    page_obj = paginate(posts, request.GET.get('cursor'))
 
     context = {
         'category': category,
-        'posts': posts,
     }
 
-    return render(request, 'blog/category_posts.html', context)
+    return _render_posts_page(request, 'blog/category_posts.html', page_obj, context)
 
 def tag_posts_view(request, tag_id):
     """
@@ -234,14 +254,16 @@ def tag_posts_view(request, tag_id):
     """
     tag = get_object_or_404(Tag, pk=tag_id)
     posts = Post.objects.filter(tags=tag, status='published')\
-        .order_by('-created_at')
+        .select_related('author', 'category')\
+        .prefetch_related('tags')\
+        .defer(*Post.LIST_DEFERRED_FIELDS)
+    page_obj = paginate(posts, request.GET.get('cursor'))
 
     context = {
         'tag': tag,
-        'posts': posts,
     }
 
-    return render(request, 'blog/tag_posts.html', context)
+    return _render_posts_page(request, 'blog/tag_posts.html', page_obj, context)
 
 
 def public_posts_view(request):
@@ -249,15 +271,15 @@ def public_posts_view(request):
     显示所有已发布的公开文章（不带筛选功能）
     """
     # 获取所有已发布的文章，按创建时间倒序排列
-    posts = Post.objects.filter(status='published').order_by('-created_at')
+    posts = Post.objects.filter(status='published')\
+        .select_related('author', 'category')\
+        .prefetch_related('tags')\
+        .defer(*Post.LIST_DEFERRED_FIELDS)
 
-    # 分页处理（每页10篇）
-    paginator = Paginator(posts, 10)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # 游标分页（每页10篇）
+    page_obj = paginate(posts, request.GET.get('cursor'))
 
     context = {
-        'page_obj': page_obj,
         'title': '所有公开文章',
     }
-    return render(request, 'blog/public_posts.html', context)
+    return _render_posts_page(request, 'blog/public_posts.html', page_obj, context)
@@ -5,12 +5,17 @@
 
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required, user_passes_test
-from django.http import JsonResponse
-from django.db.models import Count, Q
+from django.http import JsonResponse, StreamingHttpResponse
+from django.db.models import Q
 from django.utils import timezone
 from datetime import timedelta
 import json
-from ..models import VisitStatistics, Post
+from ..models import Post
+from .. import rollups
+from .. import visit_archive
+from .. import visit_export
+from .. import view_counter
+from ..weather import weather_cache
 
 def is_staff_user(user):
     """检查用户是否是员工"""
@@ -24,26 +29,28 @@ def statistics_view(request):
     只有管理员可以访问
     """
     # 时间范围
-    today = timezone.now().date()
+    today = timezone.localdate()
     week_ago = today - timedelta(days=7)
     month_ago = today - timedelta(days=30)
 
-    # 访问统计
-    total_visits = VisitStatistics.objects.count()
-    today_visits = VisitStatistics.objects.filter(
-        visit_time__date=today
-    ).count()
-    week_visits = VisitStatistics.objects.filter(
-        visit_time__date__gte=week_ago
-    ).count()
-    month_visits = VisitStatistics.objects.filter(
-        visit_time__date__gte=month_ago
-    ).count()
+    # 访问统计（读取汇总表与未汇总的尾部；尾部过长时先补做一块汇总）
+    rollups.catch_up()
+    total_visits = rollups.total_visits()
+    today_visits = rollups.total_visits(start_date=today)
+    week_visits = rollups.total_visits(start_date=week_ago)
+    month_visits = rollups.total_visits(start_date=month_ago)
 
     # 热门页面
-    popular_pages = VisitStatistics.objects.values('path')\
-        .annotate(count=Count('id'))\
-        .order_by('-count')[:10]
+    popular_pages = [
+        {'path': item['key'], 'count': item['count']}
+        for item in rollups.top_keys('path', limit=10)
+    ]
+
+    # 响应时间分位数
+    latency_hours = 24
+    latency_since = timezone.now() - timedelta(hours=latency_hours)
+    latency_by_path = rollups.latency_report('path', latency_since, limit=10)
+    latency_by_view = rollups.latency_report('view', latency_since, limit=10)
 
     # 文章统计
     total_posts = Post.objects.count()
@@ -52,8 +59,7 @@ def statistics_view(request):
     archived_posts = Post.objects.filter(status='archived').count()
 
     # 热门文章
-    top_posts = Post.objects.filter(status='published')\
-        .order_by('-view_count')[:10]
+    top_posts = view_counter.most_viewed(Post.objects.filter(status='published'), 10)
 
     # 用户统计
     from django.contrib.auth.models import User
@@ -69,6 +75,11 @@ def statistics_view(request):
         'month_visits': month_visits,
         'popular_pages': popular_pages,
 
+        # 响应时间
+        'latency_hours': latency_hours,
+        'latency_by_path': latency_by_path,
+        'latency_by_view': latency_by_view,
+
         # 文章统计
         'total_posts': total_posts,
         'published_posts': published_posts,
@@ -98,50 +109,158 @@ def api_visit_stats(request):
         return JsonResponse({'error': '权限不足'}, status=403)
 
     # 过去30天的访问数据
-    end_date = timezone.now().date()
+    end_date = timezone.localdate()
     start_date = end_date - timedelta(days=30)
 
-    visits_by_date = VisitStatistics.objects.filter(
-        visit_time__date__range=[start_date, end_date]
-    ).values('visit_time__date')\
-     .annotate(count=Count('id'))\
-     .order_by('visit_time__date')
-
     # 格式化数据
     dates = []
     counts = []
 
-    for item in visits_by_date:
-        dates.append(item['visit_time__date'].strftime('%m-%d'))
-        counts.append(item['count'])
-
-    # 热门访问路径
-    popular_paths = VisitStatistics.objects.values('path')\
-        .annotate(count=Count('id'))\
-        .order_by('-count')[:15]
-
-    # 浏览器统计
-    browsers = {}
-    for stat in VisitStatistics.objects.all()[:1000]:  # 限制样本数量
-        user_agent = stat.user_agent or ''
-        if 'Chrome' in user_agent:
-            browsers['Chrome'] = browsers.get('Chrome', 0) + 1
-        elif 'Firefox' in user_agent:
-            browsers['Firefox'] = browsers.get('Firefox', 0) + 1
-        elif 'Safari' in user_agent:
-            browsers['Safari'] = browsers.get('Safari', 0) + 1
-        elif 'Edge' in user_agent:
-            browsers['Edge'] = browsers.get('Edge', 0) + 1
-        else:
-            browsers['其他'] = browsers.get('其他', 0) + 1
+    unique_counts = []
+
+    rollups.catch_up()
+    unique_by_day = rollups.unique_visitors_by_day(start_date, end_date)
+    for day, count in rollups.visits_by_day(start_date, end_date):
+        dates.append(day.strftime('%m-%d'))
+        counts.append(count)
+        unique_counts.append(unique_by_day.get(day, 0))
+
+    # 热门访问路径（附带近30天独立访客数）
+    popular_paths = [
+        {'path': item['key'], 'count': item['count']}
+        for item in rollups.top_keys('path', limit=15)
+    ]
+    path_uniques = rollups.unique_visitors_by_path(
+        [item['path'] for item in popular_paths], start_date=start_date
+    )
+    for item in popular_paths:
+        item['unique_visitors'] = path_uniques[item['path']]
+
+    # 独立访客（HyperLogLog 估算）
+    unique_visitors = {
+        'today': unique_by_day.get(end_date, 0),
+        'week': rollups.unique_visitors(start_date=end_date - timedelta(days=7)),
+        'month': rollups.unique_visitors(start_date=start_date),
+        'total': rollups.unique_visitors(),
+    }
+
+    # 浏览器/操作系统/设备统计
+    browsers = {
+        item['key']: item['count']
+        for item in rollups.top_keys('browser', limit=20)
+    }
+    operating_systems = {
+        item['key']: item['count']
+        for item in rollups.top_keys('os', limit=20)
+    }
+    devices = {
+        item['key']: item['count']
+        for item in rollups.top_keys('device', limit=20)
+    }
+
+    # 响应时间分位数（?latency_hours= 指定时间窗口，默认24小时）
+    try:
+        latency_hours = max(1, min(int(request.GET.get('latency_hours', 24)), 24 * 30))
+    except ValueError:
+        latency_hours = 24
+    latency_since = timezone.now() - timedelta(hours=latency_hours)
+    latency = {
+        'hours': latency_hours,
+        'paths': rollups.latency_report('path', latency_since, limit=15),
+        'views': rollups.latency_report('view', latency_since, limit=15),
+    }
 
     data = {
         'dates': dates,
         'counts': counts,
-        'popular_paths': list(popular_paths),
+        'unique_counts': unique_counts,
+        'popular_paths': popular_paths,
         'browsers': browsers,
-        'total_visits': VisitStatistics.objects.count(),
-        'unique_ips': VisitStatistics.objects.values('ip_address').distinct().count(),
+        'operating_systems': operating_systems,
+        'devices': devices,
+        'latency': latency,
+        'total_visits': rollups.total_visits(),
+        'unique_ips': unique_visitors['total'],
+        'unique_visitors': unique_visitors,
+        # 天气缓存命中/失败/超时计数与熔断状态
+        'weather': weather_cache.stats(),
     }
 
     return JsonResponse(data)
+
+
+def api_visit_archive(request):
+    """
+    API: 查询已归档月份的访问统计
+    不带参数时返回可查询的月份列表；?month=2025-01 返回该月汇总，
+    额外传 path / status 时按条件过滤后返回每日访问量
+    """
+    if not request.user.is_staff:
+        return JsonResponse({'error': '权限不足'}, status=403)
+
+    months = visit_archive.archived_months()
+    month = request.GET.get('month')
+    if not month:
+        return JsonResponse({'months': months})
+
+    if month not in months:
+        return JsonResponse({'error': '该月份没有归档数据'}, status=404)
+
+    path = request.GET.get('path')
+    status = request.GET.get('status')
+    if path is None and status is None:
+        return JsonResponse(visit_archive.summarize_month(month))
+
+    try:
+        status_code = int(status) if status else None
+    except ValueError:
+        return JsonResponse({'error': '状态码格式错误'}, status=400)
+
+    by_day = {}
+    total = 0
+    for row in visit_archive.iter_month(month, path=path, status_code=status_code):
+        day = visit_archive.row_date(row).isoformat()
+        weight = row.get('sample_weight', 1)
+        by_day[day] = by_day.get(day, 0) + weight
+        total += weight
+
+    return JsonResponse({
+        'month': month,
+        'path': path,
+        'status': status_code,
+        'total_visits': total,
+        'by_day': dict(sorted(by_day.items())),
+    })
+
+
+@login_required
+@user_passes_test(is_staff_user)
+def export_visits_view(request):
+    """
+    流式导出原始访问记录
+    参数: format=csv|ndjson, start / end (YYYY-MM-DD), path（以 * 结尾为前缀匹配）, status
+    """
+    export_format = request.GET.get('format', 'csv')
+    if export_format not in visit_export.EXPORT_FORMATS:
+        return JsonResponse({'error': '不支持的导出格式'}, status=400)
+
+    try:
+        start_date = visit_export.parse_date(request.GET.get('start'))
+        end_date = visit_export.parse_date(request.GET.get('end'))
+        status = request.GET.get('status')
+        status_code = int(status) if status else None
+    except ValueError:
+        return JsonResponse({'error': '参数格式错误'}, status=400)
+
+    rows = visit_export.export_queryset(
+        start_date=start_date,
+        end_date=end_date,
+        path=request.GET.get('path'),
+        status_code=status_code,
+    )
+
+    content_type = 'text/csv; charset=utf-8' if export_format == 'csv' else 'application/x-ndjson; charset=utf-8'
+    response = StreamingHttpResponse(visit_export.iter_export(rows, export_format), content_type=content_type)
+    filename = f'visits-{timezone.localtime():%Y%m%d%H%M%S}.{export_format}'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
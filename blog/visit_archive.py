@@ -0,0 +1,199 @@
+"""
+访问记录归档
+把超过保留期的 VisitStatistics 按月写入 gzip 压缩的 NDJSON 文件并从数据库删除，
+统计接口可按需读取归档月份
+"""
+
+import gzip
+import json
+import os
+import re
+from collections import defaultdict
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import VisitStatistics, RollupWatermark
+from .rollups import WATERMARK_NAME, get_config as get_rollup_config
+
+ARCHIVE_FIELDS = [
+    'id', 'ip_address', 'user_agent', 'path', 'method', 'status_code',
+    'view_name', 'response_time_ms', 'browser_family', 'os_family',
+    'device_family', 'sample_weight', 'visit_time',
+]
+
+_MONTH_FILE = re.compile(r'^visits-(\d{4}-\d{2})\.ndjson\.gz$')
+
+
+def get_retention_config():
+    config = {
+        'DAYS': 90,
+        'ARCHIVE_DIR': Path(settings.BASE_DIR) / 'archive' / 'visits',
+    }
+    config.update(getattr(settings, 'VISIT_RETENTION', {}))
+    return config
+
+
+def archive_dir():
+    return Path(get_retention_config()['ARCHIVE_DIR'])
+
+
+def month_path(month):
+    """month 形如 '2025-01'"""
+    return archive_dir() / f'visits-{month}.ndjson.gz'
+
+
+def archived_months():
+    """已归档的月份列表（升序）"""
+    directory = archive_dir()
+    if not directory.exists():
+        return []
+    months = []
+    for name in os.listdir(directory):
+        match = _MONTH_FILE.match(name)
+        if match:
+            months.append(match.group(1))
+    return sorted(months)
+
+
+# ---------- 归档 ----------
+
+def _serialize(row):
+    row = dict(row)
+    row['visit_time'] = row['visit_time'].isoformat()
+    return json.dumps(row, ensure_ascii=False)
+
+
+def archive_visits(days=None, chunk_size=5000, dry_run=False):
+    """
+    归档 days 天之前的访问记录，返回归档条数
+    只处理已被汇总任务处理过的记录（ID 不超过水位线），避免汇总数据丢失；
+    每个分块先追加写入归档文件并落盘，再在短事务中删除对应记录。
+    dry_run 时不写入任何数据，返回先执行一次汇总再归档时的条数（另含下次汇总会处理的记录）
+    """
+    if days is None:
+        days = get_retention_config()['DAYS']
+    cutoff = timezone.now() - timedelta(days=days)
+    watermark = RollupWatermark.objects.filter(name=WATERMARK_NAME)\
+        .values_list('last_id', flat=True).first() or 0
+
+    candidates = VisitStatistics.objects.filter(visit_time__lt=cutoff, id__lte=watermark)
+    if dry_run:
+        settled_before = timezone.now() - timedelta(seconds=get_rollup_config()['SETTLE_SECONDS'])
+        return VisitStatistics.objects.filter(
+            Q(id__lte=watermark) | Q(visit_time__lt=settled_before), visit_time__lt=cutoff,
+        ).count()
+
+    archive_dir().mkdir(parents=True, exist_ok=True)
+    archived = 0
+    last_id = 0
+    while True:
+        rows = list(
+            candidates.filter(id__gt=last_id).order_by('id')
+            .values(*ARCHIVE_FIELDS)[:chunk_size]
+        )
+        if not rows:
+            break
+
+        by_month = defaultdict(list)
+        for row in rows:
+            month = timezone.localtime(row['visit_time']).strftime('%Y-%m')
+            by_month[month].append(_serialize(row))
+
+        # gzip 支持多成员拼接，追加写入即可；读取时按 id 去重，重复执行不会重复计数
+        for month, lines in by_month.items():
+            with open(month_path(month), 'ab') as raw:
+                with gzip.GzipFile(fileobj=raw, mode='ab') as f:
+                    f.write(('\n'.join(lines) + '\n').encode('utf-8'))
+                raw.flush()
+                os.fsync(raw.fileno())
+
+        ids = [row['id'] for row in rows]
+        with transaction.atomic():
+            VisitStatistics.objects.filter(id__in=ids).delete()
+
+        archived += len(rows)
+        last_id = ids[-1]
+
+    return archived
+
+
+# ---------- 查询 ----------
+
+def row_date(row):
+    """归档记录的本地日期"""
+    return timezone.localtime(datetime.fromisoformat(row['visit_time'])).date()
+
+
+def iter_month(month, start_date=None, end_date=None, path=None, status_code=None):
+    """逐行读取某个归档月份，按条件过滤并按 id 去重"""
+    file_path = month_path(month)
+    if not file_path.exists():
+        return
+
+    seen = set()
+    with gzip.open(file_path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            if row['id'] in seen:
+                continue
+            seen.add(row['id'])
+
+            if path is not None and row['path'] != path:
+                continue
+            if status_code is not None and row['status_code'] != status_code:
+                continue
+            if start_date is not None or end_date is not None:
+                day = row_date(row)
+                if start_date is not None and day < start_date:
+                    continue
+                if end_date is not None and day > end_date:
+                    continue
+            yield row
+
+
+def summarize_month(month, limit=15):
+    """
+    汇总某个归档月份：每日访问量、热门路径与状态码分布
+    归档文件写入后基本不变，结果按文件大小与修改时间缓存
+    """
+    file_path = month_path(month)
+    if not file_path.exists():
+        return None
+
+    stat = file_path.stat()
+    cache_key = f'visit_archive_summary_{month}_{stat.st_size}_{int(stat.st_mtime)}'
+    summary = cache.get(cache_key)
+    if summary is not None:
+        return summary
+
+    by_day = defaultdict(int)
+    by_path = defaultdict(int)
+    by_status = defaultdict(int)
+    total = 0
+    for row in iter_month(month):
+        weight = row.get('sample_weight', 1)
+        by_day[row_date(row).isoformat()] += weight
+        by_path[row['path']] += weight
+        by_status[str(row['status_code'])] += weight
+        total += weight
+
+    summary = {
+        'month': month,
+        'total_visits': total,
+        'by_day': dict(sorted(by_day.items())),
+        'popular_paths': [
+            {'path': key, 'count': count}
+            for key, count in sorted(by_path.items(), key=lambda kv: kv[1], reverse=True)[:limit]
+        ],
+        'status_codes': dict(by_status),
+    }
+    cache.set(cache_key, summary, 60 * 60 * 24)
+    return summary
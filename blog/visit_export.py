@@ -0,0 +1,94 @@
+"""
+访问记录导出
+以 CSV / NDJSON 流式输出 VisitStatistics，配合 .iterator() 保持内存占用恒定
+"""
+
+import csv
+import json
+from datetime import datetime, time
+
+from django.utils import timezone
+
+from .models import VisitStatistics
+from .user_agents import BROWSER_LABELS, OS_LABELS, DEVICE_LABELS
+
+EXPORT_FIELDS = [
+    'id', 'visit_time', 'ip_address', 'method', 'path', 'status_code',
+    'view_name', 'response_time_ms', 'browser_family', 'os_family',
+    'device_family', 'sample_weight', 'user_agent',
+]
+
+EXPORT_FORMATS = ('csv', 'ndjson')
+
+CHUNK_SIZE = 2000
+
+
+class Echo:
+    """只实现 write 的伪文件对象，csv.writer 写入的内容直接返回给生成器"""
+
+    def write(self, value):
+        return value
+
+
+def parse_date(value):
+    """解析 YYYY-MM-DD，空值返回 None，格式错误抛出 ValueError"""
+    if not value:
+        return None
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+
+def export_queryset(start_date=None, end_date=None, path=None, status_code=None):
+    """
+    构造导出查询集（按 id 升序，便于断点续导与按主键分块读取）
+    日期为本地日期，闭区间
+    """
+    visits = VisitStatistics.objects.all()
+    if start_date is not None:
+        visits = visits.filter(
+            visit_time__gte=timezone.make_aware(datetime.combine(start_date, time.min))
+        )
+    if end_date is not None:
+        visits = visits.filter(
+            visit_time__lte=timezone.make_aware(datetime.combine(end_date, time.max))
+        )
+    if path:
+        # 以 * 结尾视为前缀匹配，例如 /post/*
+        if path.endswith('*'):
+            visits = visits.filter(path__startswith=path[:-1])
+        else:
+            visits = visits.filter(path=path)
+    if status_code is not None:
+        visits = visits.filter(status_code=status_code)
+    return visits.order_by('id').values_list(*EXPORT_FIELDS)
+
+
+def _row_dict(values):
+    row = dict(zip(EXPORT_FIELDS, values))
+    row['visit_time'] = timezone.localtime(row['visit_time']).isoformat()
+    row['browser_family'] = BROWSER_LABELS.get(row['browser_family'], '其他')
+    row['os_family'] = OS_LABELS.get(row['os_family'], '其他')
+    row['device_family'] = DEVICE_LABELS.get(row['device_family'], '其他')
+    return row
+
+
+def iter_csv(rows):
+    """逐行生成 CSV 文本（首行为表头）"""
+    writer = csv.writer(Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    for values in rows.iterator(chunk_size=CHUNK_SIZE):
+        row = _row_dict(values)
+        yield writer.writerow([row[field] for field in EXPORT_FIELDS])
+
+
+def iter_ndjson(rows):
+    """逐行生成 NDJSON 文本"""
+    for values in rows.iterator(chunk_size=CHUNK_SIZE):
+        yield json.dumps(_row_dict(values), ensure_ascii=False) + '\n'
+
+
+def iter_export(rows, export_format):
+    if export_format == 'csv':
+        return iter_csv(rows)
+    if export_format == 'ndjson':
+        return iter_ndjson(rows)
+    raise ValueError(f'不支持的导出格式: {export_format}')
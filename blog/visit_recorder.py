@@ -0,0 +1,183 @@
+"""
+访问记录写入管道
+将访问记录缓存在内存队列中，由后台线程按批量/时间阈值使用 bulk_create 写入数据库
+"""
+
+import atexit
+import logging
+import queue
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+# 默认配置，可通过 settings.VISIT_RECORDER 覆盖
+DEFAULT_CONFIG = {
+    'ENABLED': True,         # 关闭后退化为同步写入
+    'BATCH_SIZE': 200,       # 单次 bulk_create 的最大条数
+    'FLUSH_INTERVAL': 2.0,   # 最长刷新间隔（秒）
+    'MAX_QUEUE_SIZE': 10000,  # 队列上限，超出后丢弃新记录
+}
+
+
+def get_config():
+    """合并默认配置与 settings 中的配置"""
+    config = dict(DEFAULT_CONFIG)
+    config.update(getattr(settings, 'VISIT_RECORDER', {}))
+    return config
+
+
+class VisitRecorder:
+    """
+    访问记录缓冲器
+    请求线程只负责入队，写库由后台线程完成
+    """
+
+    def __init__(self, batch_size=200, flush_interval=2.0, max_queue_size=10000):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+        self._thread_lock = threading.Lock()
+
+        # 运行指标
+        self.enqueued = 0
+        self.dropped = 0
+        self.flushed = 0
+        self.failed = 0
+
+    # ---------- 入队 ----------
+    def record(self, **fields):
+        """
+        记录一次访问，fields 为 VisitStatistics 的字段
+        队列已满时丢弃该记录并计数，绝不阻塞请求
+        """
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait(fields)
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+        self.enqueued += 1
+        if self._queue.qsize() >= self.batch_size:
+            self._wakeup.set()
+        return True
+
+    # ---------- 刷新 ----------
+    def flush(self):
+        """把队列中的记录全部写入数据库，返回写入条数"""
+        from .models import VisitStatistics
+
+        total = 0
+        with self._flush_lock:
+            while True:
+                batch = self._drain(self.batch_size)
+                if not batch:
+                    break
+                try:
+                    VisitStatistics.objects.bulk_create(
+                        [VisitStatistics(**fields) for fields in batch],
+                        batch_size=self.batch_size,
+                    )
+                except Exception as e:
+                    self.failed += len(batch)
+                    logger.error(f"批量写入访问统计失败，丢弃 {len(batch)} 条: {e}")
+                    break
+                total += len(batch)
+                self.flushed += len(batch)
+        return total
+
+    def _drain(self, limit):
+        """从队列中取出最多 limit 条记录"""
+        batch = []
+        while len(batch) < limit:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    # ---------- 后台线程 ----------
+    def _ensure_worker(self):
+        """惰性启动后台线程（兼容 fork 后的子进程）"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._thread_lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopped.clear()
+            self._thread = threading.Thread(
+                target=self._run, name='visit-recorder', daemon=True
+            )
+            self._thread.start()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"访问统计刷新线程异常: {e}")
+            finally:
+                # 后台线程持有独立的数据库连接，用完及时释放
+                close_old_connections()
+
+    def shutdown(self, timeout=5.0):
+        """停止后台线程并写入剩余记录（进程退出时调用）"""
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+        try:
+            self.flush()
+        except Exception as e:
+            logger.error(f"退出时写入访问统计失败: {e}")
+
+    def stats(self):
+        """返回管道运行指标"""
+        return {
+            'queued': self._queue.qsize(),
+            'enqueued': self.enqueued,
+            'flushed': self.flushed,
+            'dropped': self.dropped,
+            'failed': self.failed,
+        }
+
+
+_recorder = None
+_recorder_lock = threading.Lock()
+
+
+def get_recorder():
+    """获取进程内唯一的 VisitRecorder，首次调用时注册退出钩子"""
+    global _recorder
+    if _recorder is None:
+        with _recorder_lock:
+            if _recorder is None:
+                config = get_config()
+                _recorder = VisitRecorder(
+                    batch_size=config['BATCH_SIZE'],
+                    flush_interval=config['FLUSH_INTERVAL'],
+                    max_queue_size=config['MAX_QUEUE_SIZE'],
+                )
+                atexit.register(_recorder.shutdown)
+    return _recorder
+
+
+def record_visit(**fields):
+    """
+    记录一次访问
+    启用缓冲时入队，否则同步写入
+    """
+    if not get_config()['ENABLED']:
+        from .models import VisitStatistics
+        VisitStatistics.objects.create(**fields)
+        return True
+    return get_recorder().record(**fields)
@@ -0,0 +1,388 @@
+"""
+天气数据缓存
+进程内按位置缓存天气数据（所有访客共享，不再按会话缓存）：
+- 新鲜期内直接返回；过期但仍在可用期内时先返回旧值，同时在后台线程刷新（stale-while-revalidate）
+- 同一位置同时只有一个拉取在进行，并发的未命中共享这一次请求的结果（single-flight）
+- 页面渲染不等待天气接口：未命中时只在后台发起拉取，本次返回 None
+- 获取失败的位置在一段时间内直接返回 None（负缓存）；有旧值的位置刷新失败时继续返回旧值，同样在这段时间内不再刷新
+- 上游连续失败时熔断，熔断期间不再发起请求，到期后放行一次试探请求（半开），成功后恢复
+- 每次请求有超时上限，接口视图的等待总时长也有上限；命中、失败、超时等计数见 WeatherCache.stats()
+页面不再在渲染时读取天气：天气组件在页面加载后请求天气接口（见 blog/views/api/views.py）
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+import requests
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONFIG = {
+    'FRESH_SECONDS': 30 * 60,     # 新鲜期，过期后后台刷新
+    'STALE_SECONDS': 6 * 60 * 60,  # 可用期，超过后视为未命中
+    'NEGATIVE_SECONDS': 5 * 60,   # 获取失败的位置在这段时间内不再请求
+    'MAX_ENTRIES': 1024,          # 最多缓存的位置数
+    'WORKERS': 4,                 # 后台拉取线程数
+    'REQUEST_TIMEOUT': 3,         # 单次上游请求的超时（秒）
+    'WAIT_TIMEOUT': 3,            # 接口视图等待拉取结果的总时长上限（秒）
+    'RATE_LIMIT_PER_MINUTE': 30,  # 上游接口调用频率上限（令牌桶），0 表示不限
+    'RATE_LIMIT_BURST': 10,       # 令牌桶容量
+    'FAILURE_THRESHOLD': 5,       # 连续失败多少次后熔断
+    'RESET_SECONDS': 60,          # 熔断多久后放行试探请求
+    'BROWSER_MAX_AGE': 5 * 60,    # 天气接口响应允许浏览器/代理缓存的时长（秒）
+}
+
+# 负缓存的占位值
+_FAILED = object()
+
+
+def _config():
+    config = dict(DEFAULT_CONFIG)
+    config.update(getattr(settings, 'WEATHER_CACHE', {}))
+    return config
+
+
+def default_city():
+    return os.getenv('WEATHER_CITY', 'beijing')
+
+
+def browser_max_age():
+    return _config()['BROWSER_MAX_AGE']
+
+
+class RateLimiter:
+    """令牌桶限流，线程安全；rate_per_minute 为 0 时不限流"""
+
+    def __init__(self, rate_per_minute, burst):
+        self.rate = rate_per_minute / 60
+        self.capacity = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def available(self):
+        if not self.rate:
+            return float('inf')
+        with self._lock:
+            self._refill()
+            return self._tokens
+
+    def try_acquire(self):
+        if not self.rate:
+            return True
+        with self._lock:
+            self._refill()
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+
+class CircuitBreaker:
+    """
+    熔断器，线程安全
+    closed：正常放行；连续失败 failure_threshold 次后 open：全部拒绝；
+    reset_seconds 后 half_open：只放行一个试探请求，成功则 closed，失败则重新 open
+    """
+
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+    def __init__(self, failure_threshold, reset_seconds):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_seconds:
+                self.state = self.HALF_OPEN
+                return True
+            return False
+
+    def cancel_trial(self):
+        """放行的试探请求最终没有发出（例如被限流）时调用，下次 allow() 可重新试探"""
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self.state = self.OPEN
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self._failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning("天气接口连续失败，暂停请求")
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+
+
+def _fetch(location):
+    from .utils import get_weather_data
+    return get_weather_data(location=location, use_ip=False,
+                            timeout=_config()['REQUEST_TIMEOUT'], raise_errors=True)
+
+
+class WeatherCache:
+    """按位置缓存天气数据，线程安全"""
+
+    def __init__(self, fetch, fresh_seconds, stale_seconds, negative_seconds, max_entries, workers,
+                 wait_timeout, limiter=None, breaker=None):
+        self.fetch = fetch
+        self.fresh_seconds = fresh_seconds
+        self.stale_seconds = stale_seconds
+        self.negative_seconds = negative_seconds
+        self.max_entries = max_entries
+        self.wait_timeout = wait_timeout
+        self.limiter = limiter
+        self.breaker = breaker
+        self._entries = OrderedDict()  # 位置 -> (天气数据或 _FAILED, 获取时间, 最近一次刷新失败的时间或 None)
+        self._inflight = {}            # 位置 -> Future
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='weather')
+        # 运行指标：hit / stale_hit / negative_hit / miss / fetch / failure / timeout / rejected / rate_limited
+        self._metrics = Counter()
+
+    def _count(self, name):
+        with self._lock:
+            self._metrics[name] += 1
+
+    def _lookup(self, location):
+        """
+        返回 (天气数据, 状态)，状态为 fresh / stale / stale_failed / failed / miss
+        stale_failed 表示旧值仍可用，但最近一次刷新失败且仍在负缓存期内，暂不再刷新
+        """
+        with self._lock:
+            entry = self._entries.get(location)
+            if entry is None:
+                return None, 'miss'
+            value, fetched_at, failed_at = entry
+            now = time.monotonic()
+            age = now - fetched_at
+            if value is _FAILED:
+                if age <= self.negative_seconds:
+                    return None, 'failed'
+                del self._entries[location]
+                return None, 'miss'
+            if age > self.stale_seconds:
+                del self._entries[location]
+                return None, 'miss'
+            self._entries.move_to_end(location)
+            if age <= self.fresh_seconds:
+                return value, 'fresh'
+            if failed_at is not None and now - failed_at <= self.negative_seconds:
+                return value, 'stale_failed'
+            return value, 'stale'
+
+    def _store(self, location, value):
+        with self._lock:
+            now = time.monotonic()
+            current = self._entries.get(location)
+            if value is _FAILED and current is not None and current[0] is not _FAILED:
+                # 刷新失败时保留尚可用的旧值，只记录失败时间，负缓存期内不再刷新
+                self._entries[location] = (current[0], current[1], now)
+                return
+            self._entries[location] = (value, now, None)
+            self._entries.move_to_end(location)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _load(self, location):
+        self._count('fetch')
+        upstream_failed = True
+        value = None
+        try:
+            value = self.fetch(location)
+            upstream_failed = False
+        except requests.Timeout:
+            self._count('timeout')
+        except Exception as e:
+            logger.warning(f"获取 {location} 的天气数据失败: {e}")
+            self._count('failure')
+
+        try:
+            if self.breaker:
+                if upstream_failed:
+                    self.breaker.record_failure()
+                else:
+                    self.breaker.record_success()
+            self._store(location, value or _FAILED)
+            return value
+        finally:
+            # _start 在持锁时登记 Future，这里取锁后登记必然已完成
+            with self._lock:
+                self._inflight.pop(location, None)
+
+    def _start(self, location):
+        """发起后台拉取；该位置已有拉取在进行时返回同一个 Future，熔断或限流时返回 None"""
+        with self._lock:
+            future = self._inflight.get(location)
+        if future is not None:
+            return future
+        if self.breaker and not self.breaker.allow():
+            self._count('rejected')
+            return None
+        if self.limiter and not self.limiter.try_acquire():
+            if self.breaker:
+                self.breaker.cancel_trial()
+            self._count('rate_limited')
+            return None
+        with self._lock:
+            future = self._inflight.get(location)
+            if future is None:
+                future = self._executor.submit(self._load, location)
+                self._inflight[location] = future
+        return future
+
+    def _wait(self, future, timeout):
+        if future is None or timeout <= 0:
+            return None
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeout:
+            return None
+
+    def get(self, location, wait=False, timeout=None):
+        """
+        取天气数据
+        命中新鲜数据直接返回；旧数据照常返回并在后台刷新；最近获取失败时直接返回 None；
+        未命中时发起拉取，wait 为 True 时最多等待 timeout（默认 wait_timeout）秒，否则立即返回 None
+        """
+        value, state = self._lookup(location)
+        if state == 'fresh':
+            self._count('hit')
+            return value
+        if state in ('stale', 'stale_failed'):
+            self._count('stale_hit')
+            if state == 'stale':
+                self._start(location)
+            return value
+        if state == 'failed':
+            self._count('negative_hit')
+            return None
+
+        self._count('miss')
+        future = self._start(location)
+        if not wait:
+            return None
+        return self._wait(future, self.wait_timeout if timeout is None else timeout)
+
+    def refresh(self, location, wait=True, timeout=None):
+        """忽略缓存重新拉取（与进行中的拉取合并），失败或不等待时返回旧值"""
+        future = self._start(location)
+        value = self._wait(future, self.wait_timeout if timeout is None else timeout) if wait else None
+        return value or self._lookup(location)[0]
+
+    def expires_in(self, location):
+        """距新鲜期结束的秒数（已过期为负数），没有可用缓存时返回 None"""
+        with self._lock:
+            entry = self._entries.get(location)
+        if entry is None or entry[0] is _FAILED:
+            return None
+        return entry[1] + self.fresh_seconds - time.monotonic()
+
+    def is_loading(self, location):
+        with self._lock:
+            return location in self._inflight
+
+    def recently_failed(self, location):
+        """该位置最近一次拉取失败且仍在负缓存期内"""
+        with self._lock:
+            entry = self._entries.get(location)
+        if entry is None:
+            return False
+        value, fetched_at, failed_at = entry
+        failed_at = fetched_at if value is _FAILED else failed_at
+        return failed_at is not None and time.monotonic() - failed_at <= self.negative_seconds
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """运行指标"""
+        with self._lock:
+            stats = dict(self._metrics)
+            stats['entries'] = len(self._entries)
+            stats['inflight'] = len(self._inflight)
+        if self.breaker:
+            stats['circuit'] = self.breaker.state
+        return stats
+
+
+def _build_limiter():
+    config = _config()
+    return RateLimiter(config['RATE_LIMIT_PER_MINUTE'], config['RATE_LIMIT_BURST'])
+
+
+rate_limiter = _build_limiter()
+
+
+def _build_cache():
+    config = _config()
+    return WeatherCache(
+        _fetch,
+        fresh_seconds=config['FRESH_SECONDS'],
+        stale_seconds=config['STALE_SECONDS'],
+        negative_seconds=config['NEGATIVE_SECONDS'],
+        max_entries=config['MAX_ENTRIES'],
+        workers=config['WORKERS'],
+        wait_timeout=config['WAIT_TIMEOUT'],
+        limiter=rate_limiter,
+        breaker=CircuitBreaker(config['FAILURE_THRESHOLD'], config['RESET_SECONDS']),
+    )
+
+
+weather_cache = _build_cache()
+
+
+def client_location(request):
+    """
+    请求对应的天气位置
+    配置了 IP 归属地表（见 blog/ip_location.py）时为表中的城市，同城访客共用一个缓存条目，查不到时返回 None；
+    未配置时为客户端 IP（心知天气支持按 IP 定位）
+    """
+    from . import ip_location
+    from .utils import get_client_ip
+    ip = get_client_ip(request)
+    if not ip_location.enabled():
+        return ip
+    return ip_location.lookup_city(ip)
+
+
+def get_client_weather(request, wait=False):
+    """
+    客户端所在位置的天气，IP 定位没有数据时使用默认城市
+    wait 为 False 时不等待天气接口，两者都未命中则返回 None（后台已开始拉取）；
+    wait 为 True 时两次查询共用 wait_timeout 的等待时长
+    """
+    from .weather_prefetch import track
+
+    deadline = time.monotonic() + weather_cache.wait_timeout
+    location = client_location(request)
+    weather = None
+    if location:
+        track(location)
+        weather = weather_cache.get(location, wait=wait, timeout=deadline - time.monotonic())
+    if not weather:
+        track(default_city())
+        weather = weather_cache.get(default_city(), wait=wait, timeout=deadline - time.monotonic())
+    return weather
@@ -0,0 +1,175 @@
+"""
+天气预取
+记录各位置被请求的次数（按周期衰减），由后台线程在缓存过期前刷新最热门位置的天气，
+使热门城市的访客总是命中新鲜缓存。
+- 只预取已有缓存（曾成功获取过）的位置，获取失败的位置不会反复占用配额
+- 每个位置的提前量带随机抖动，检查周期本身也带抖动，刷新不会集中在同一时刻
+- 刷新经由天气缓存的线程池（并发有上限）发出，并为页面请求保留一部分令牌桶配额
+"""
+
+import logging
+import random
+import threading
+from collections import Counter
+
+from django.conf import settings
+
+from .weather import rate_limiter, weather_cache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONFIG = {
+    'ENABLED': True,
+    'TOP_N': 20,             # 预取最热门的位置数
+    'INTERVAL': 60,          # 检查周期（秒），实际为 0.8~1.2 倍
+    'LEAD_SECONDS': 5 * 60,  # 在新鲜期结束前多久刷新
+    'JITTER_SECONDS': 60,    # 提前量的随机抖动上限
+    'RESERVED_TOKENS': 2,    # 为页面请求保留的令牌数
+    'MAX_TRACKED': 1000,     # 最多记录的位置数
+    'DECAY': 0.9,            # 每轮热度衰减系数
+}
+
+
+def get_config():
+    config = dict(DEFAULT_CONFIG)
+    config.update(getattr(settings, 'WEATHER_PREFETCH', {}))
+    return config
+
+
+class WeatherPrefetcher:
+    """热门位置统计与后台预取线程"""
+
+    def __init__(self, cache, limiter, top_n=20, interval=60, lead_seconds=300,
+                 jitter_seconds=60, reserved_tokens=2, max_tracked=1000, decay=0.9):
+        self.cache = cache
+        self.limiter = limiter
+        self.top_n = top_n
+        self.interval = interval
+        self.lead_seconds = lead_seconds
+        self.jitter_seconds = jitter_seconds
+        self.reserved_tokens = reserved_tokens
+        self.max_tracked = max_tracked
+        self.decay = decay
+        self._hits = Counter()
+        self._jitter = {}  # 位置 -> 本轮的随机提前量
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+        self._thread_lock = threading.Lock()
+
+        # 运行指标
+        self.cycles = 0
+        self.prefetched = 0
+        self.deferred = 0
+
+    def track(self, location):
+        """记录一次请求"""
+        with self._lock:
+            self._hits[location] += 1
+        self._ensure_worker()
+
+    def hot_locations(self):
+        """按热度降序排列的全部位置"""
+        with self._lock:
+            return [location for location, _ in self._hits.most_common()]
+
+    def _decay(self):
+        """每轮按 decay 衰减热度，只反映最近的请求；同时限制记录的位置数"""
+        with self._lock:
+            decayed = Counter({location: hits * self.decay for location, hits in
+                               self._hits.most_common(self.max_tracked) if hits * self.decay >= 0.1})
+            self._hits = decayed
+            for location in list(self._jitter):
+                if location not in decayed:
+                    del self._jitter[location]
+
+    def _lead(self, location):
+        if location not in self._jitter:
+            self._jitter[location] = random.uniform(0, self.jitter_seconds)
+        return self.lead_seconds + self._jitter[location]
+
+    def run_once(self):
+        """检查一轮，返回本轮发起刷新的位置列表"""
+        started = []
+        candidates = 0
+        for location in self.hot_locations():
+            remaining = self.cache.expires_in(location)
+            if remaining is None:
+                # 没有缓存（从未成功获取），不计入热门位置
+                continue
+            candidates += 1
+            if candidates > self.top_n:
+                break
+            if remaining > self._lead(location) or self.cache.is_loading(location):
+                continue
+            if self.cache.recently_failed(location):
+                # 最近刷新失败，负缓存期过后再试
+                continue
+            if self.limiter.available() < 1 + self.reserved_tokens:
+                # 配额不足，留到下一轮
+                self.deferred += 1
+                break
+            self.cache.refresh(location, wait=False)
+            self._jitter.pop(location, None)
+            started.append(location)
+        self.prefetched += len(started)
+        self.cycles += 1
+        self._decay()
+        return started
+
+    # ---------- 后台线程 ----------
+    def _ensure_worker(self):
+        """惰性启动后台线程（兼容 fork 后的子进程）"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._thread_lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._run, name='weather-prefetch', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval * random.uniform(0.8, 1.2)):
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"天气预取线程异常: {e}")
+
+    def shutdown(self):
+        self._stopped.set()
+
+    def stats(self):
+        with self._lock:
+            tracked = len(self._hits)
+        return {
+            'tracked': tracked,
+            'cycles': self.cycles,
+            'prefetched': self.prefetched,
+            'deferred': self.deferred,
+        }
+
+
+def _build_prefetcher():
+    config = get_config()
+    return WeatherPrefetcher(
+        weather_cache,
+        rate_limiter,
+        top_n=config['TOP_N'],
+        interval=config['INTERVAL'],
+        lead_seconds=config['LEAD_SECONDS'],
+        jitter_seconds=config['JITTER_SECONDS'],
+        reserved_tokens=config['RESERVED_TOKENS'],
+        max_tracked=config['MAX_TRACKED'],
+        decay=config['DECAY'],
+    )
+
+
+prefetcher = _build_prefetcher()
+_enabled = get_config()['ENABLED']
+
+
+def track(location):
+    """记录一次对该位置天气的请求（预取关闭时不做任何事）"""
+    if _enabled:
+        prefetcher.track(location)
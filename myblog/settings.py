@@ -59,9 +59,8 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
-                'blog.utils.weather_context',  # 天气信息上下文处理器
                 'blog.context_processors.static_template_context',
-                'blog.utils.weather_context',
+                'blog.context_processors.sidebar_context',  # 侧边栏分类/标签/热门文章
             ],
         },
     },
@@ -130,9 +129,136 @@ CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
         'LOCATION': 'unique-snowflake',
+        'OPTIONS': {
+            # 文章渲染结果等数据也存放在缓存中，默认的300条上限太小
+            'MAX_ENTRIES': 10000,
+        },
     }
 }
 
+# 预先构建的 Markdown 渲染器数量（见 blog/templatetags/markdown_extras.py）
+MARKDOWN_RENDERER_POOL_SIZE = 4
+
+# 可作为模板渲染的静态文件白名单（相对 blog/static，见 blog/static_templates.py），启动时预编译
+ALLOWED_STATIC_TEMPLATES = [
+    'pages/about.html',
+    'pages/contact.html',
+    'pages/privacy.html',
+    'pages/terms.html',
+    'components/header.html',
+    'components/footer.html',
+    'layouts/base.html',
+    'about_develop/developer_note.html',
+    'about_develop/Developer.html',
+]
+# 编译后的静态模板最多缓存的个数
+STATIC_TEMPLATE_CACHE_SIZE = 64
+
+# 文章浏览数写回配置（见 blog/view_counter.py）
+VIEW_COUNTER = {
+    'FLUSH_INTERVAL': 30,  # 后台线程写回周期（秒）
+    # 暂存增量的缓存，应为 Redis 等多进程共享且不淘汰条目的缓存；本地内存缓存时改为进程内计数
+    'CACHE': 'default',
+}
+
+# 天气数据进程内缓存（见 blog/weather.py）
+WEATHER_CACHE = {
+    'FRESH_SECONDS': 30 * 60,
+    'STALE_SECONDS': 6 * 60 * 60,
+    'NEGATIVE_SECONDS': 5 * 60,   # 获取失败的位置暂停请求的时长
+    'MAX_ENTRIES': 1024,
+    'WORKERS': 4,
+    'REQUEST_TIMEOUT': 3,         # 单次上游请求超时
+    'WAIT_TIMEOUT': 3,            # 接口视图等待的总时长
+    'RATE_LIMIT_PER_MINUTE': 30,  # 上游接口调用频率上限（令牌桶）
+    'RATE_LIMIT_BURST': 10,
+    'FAILURE_THRESHOLD': 5,       # 连续失败多少次后熔断
+    'RESET_SECONDS': 60,          # 熔断后多久放行试探请求
+    'BROWSER_MAX_AGE': 5 * 60,    # 天气接口响应的 Cache-Control max-age
+}
+
+# IP 归属地表（见 blog/ip_location.py），天气按表中的城市查询与缓存；未配置时按客户端 IP 查询
+IP_LOCATION = {
+    # CSV（起始IP,结束IP,城市）或 build_ip_table 命令生成的二进制表
+    'PATH': os.getenv('IP_LOCATION_DB', ''),
+}
+
+# 热门位置天气预取（见 blog/weather_prefetch.py）
+WEATHER_PREFETCH = {
+    'ENABLED': True,
+    'TOP_N': 20,
+    'INTERVAL': 60,
+    'LEAD_SECONDS': 5 * 60,
+    'JITTER_SECONDS': 60,
+    'RESERVED_TOKENS': 2,
+}
+
+# 文章全文检索配置（见 blog/search.py）
+SEARCH_INDEX = {
+    'BACKEND': 'auto',      # auto: SQLite 支持 FTS5 时使用 FTS5，否则使用纯 Python 倒排表
+    'MAX_RESULTS': 200,
+    'TITLE_WEIGHT': 5,
+    'SNIPPET_LENGTH': 120,
+}
+
+# 相关文章配置（见 blog/related_posts.py）
+RELATED_POSTS = {
+    'TOP_K': 5,                     # 每篇文章保存的相关文章数
+    'CATEGORY_WEIGHT': 0.2,         # 同分类加分
+    'RECENCY_WEIGHT': 0.1,          # 发布时间接近加分的上限
+    'RECENCY_HALF_LIFE_DAYS': 180,
+}
+
+# 文章分析器配置（见 blog/post_analysis.py），修改后运行 rerender_posts 回填
+POST_ANALYSIS = {
+    'ANALYZERS': [
+        'blog.post_analysis.count_words',
+        'blog.post_analysis.read_time',
+        'blog.post_analysis.excerpt',
+        'blog.post_analysis.outline',
+    ],
+    'WORDS_PER_MINUTE': 200,
+}
+
+# 访问统计写入管道配置（见 blog/visit_recorder.py）
+VISIT_RECORDER = {
+    'ENABLED': True,
+    'BATCH_SIZE': 200,
+    'FLUSH_INTERVAL': 2.0,
+    'MAX_QUEUE_SIZE': 10000,
+}
+
+# 访问记录策略（见 blog/recording_policy.py），规则按顺序匹配，第一条命中的生效
+VISIT_RECORDING_POLICY = {
+    'RULES': [
+        {'prefix': '/admin/', 'action': 'exclude'},
+        {'prefix': '/static/', 'action': 'exclude'},
+        {'prefix': '/media/', 'action': 'exclude'},
+        {'prefix': '/api/', 'action': 'exclude'},
+        {'prefix': '/ws/', 'action': 'exclude'},
+        {'regex': r'^/(healthz?|ping|favicon\.ico|robots\.txt)/?$', 'action': 'exclude'},
+        {'prefix': '/markdown-preview/', 'sample_rate': 0.1},
+    ],
+    'DEFAULT_SAMPLE_RATE': 1.0,
+    'BOT_SAMPLE_RATE': 0.1,
+    'IP_RATE_LIMIT': 120,
+    'IP_RATE_WINDOW': 60,
+}
+
+# 访问统计汇总配置（见 blog/rollups.py）
+VISIT_ROLLUP = {
+    'SETTLE_SECONDS': 5 * 60,  # 只汇总这段时间之前的记录，等待并发写入的事务提交
+    'MAX_PENDING': 20000,      # 未汇总记录超过此数时，统计请求先补做一块汇总
+    'CATCH_UP_CHUNK_SIZE': 10000,
+    'CATCH_UP_INTERVAL': 60,
+}
+
+# 访问记录保留与归档配置（见 blog/visit_archive.py）
+VISIT_RETENTION = {
+    'DAYS': int(os.getenv('VISIT_RETENTION_DAYS', '90')),
+    'ARCHIVE_DIR': os.getenv('VISIT_ARCHIVE_DIR', os.path.join(BASE_DIR, 'archive', 'visits')),
+}
+
 # CHANNEL配置
 CHANNEL_LAYERS = {
     'default': {